@@ -69,6 +69,8 @@ class VideoLessonAdmin(ImportExportModelAdmin):
     resource_class = VideoLessonResource
     list_display = ('id', 'title', 'level', 'duration', 'views_count', 'status', 'order', 'created_by', 'created_at')
     list_filter = ('level', 'status', 'created_at')
+    # Maintained by apps.center.view_counts; editing it here would race the flush
+    readonly_fields = ('views_count',)
     search_fields = ('title', 'description')
     raw_id_fields = ('created_by',)
 
@@ -0,0 +1,107 @@
+"""
+Helpers shared by the vocabulary benchmark management commands.
+
+Benchmarks seed synthetic words inside a transaction that is rolled back
+afterwards, so they can be pointed at a development database safely.
+"""
+import random
+import statistics
+import time
+
+from apps.center.enums import Level
+from apps.users.enums import LessonStatus
+
+SYLLABLES = [
+    'ba', 'ça', 'da', 'gä', 'ýa', 'ka', 'la', 'ma', 'na', 'ňo', 'pa', 'ra',
+    'sa', 'şe', 'ta', 'ü', 'wa', 'ýo', 'za', 'že', 'ö', 'ke', 'li', 'mi',
+]
+ENGLISH_SYLLABLES = [
+    'an', 'be', 'co', 'de', 'el', 'fo', 'ga', 'ho', 'in', 'jo', 'ka', 'lo',
+    'me', 'no', 'op', 'pe', 'qu', 're', 'st', 'te', 'un', 've', 'wo', 'ye',
+]
+
+
+def _word(rng, syllables):
+    return ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+
+def populate_vocabulary(size, seed=42, batch_size=5000):
+    """Bulk-insert ``size`` synthetic words with realistic text fields."""
+    from apps.center.models import TurkmenEnglishWord
+
+    rng = random.Random(seed)
+    levels = [choice for choice, _ in Level.choices]
+    batch = []
+    for i in range(size):
+        turkmen_word = f"{_word(rng, SYLLABLES)}{i}"
+        english_word = f"{_word(rng, ENGLISH_SYLLABLES)}{i}"
+        batch.append(TurkmenEnglishWord(
+            turkmen_word=turkmen_word,
+            english_word=english_word,
+            definition=' '.join(_word(rng, ENGLISH_SYLLABLES) for _ in range(8)),
+            example_sentence=' '.join(_word(rng, ENGLISH_SYLLABLES) for _ in range(10)),
+            level=rng.choice(levels),
+            status=LessonStatus.PUBLISHED,
+        ))
+        if len(batch) >= batch_size:
+            TurkmenEnglishWord.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TurkmenEnglishWord.objects.bulk_create(batch)
+
+
+def populate_lessons(size, seed=42, batch_size=5000):
+    """Bulk-insert ``size`` grammar lessons and ``size`` video lessons, about half with images."""
+    from apps.center.models import Category, Grammar, VideoLesson
+    from apps.users.models import User
+
+    rng = random.Random(seed)
+    levels = [choice for choice, _ in Level.choices]
+    author = User.objects.create_user(username='benchmark-author', email='benchmark-author@example.com')
+    categories = [Category.objects.create(name=name) for name in ('Tenses', 'Articles', 'Modals', 'Conditionals')]
+    grammar, videos = [], []
+    for i in range(size):
+        text = ' '.join(_word(rng, ENGLISH_SYLLABLES) for _ in range(40))
+        grammar.append(Grammar(
+            created_by=author,
+            category=rng.choice(categories),
+            title=f"{_word(rng, ENGLISH_SYLLABLES)} {i}",
+            content=text,
+            examples=text[:80],
+            status=LessonStatus.PUBLISHED,
+            cover_image=f"grammar/covers/{i}.png" if i % 2 else None,
+            order=i,
+        ))
+        videos.append(VideoLesson(
+            created_by=author,
+            title=f"{_word(rng, ENGLISH_SYLLABLES)} {i}",
+            description=text,
+            video_url=f"videos/lessons/{i}.mp4",
+            thumbnail=f"videos/thumbnails/{i}.jpg" if i % 2 else None,
+            level=rng.choice(levels),
+            duration=rng.randint(60, 3600),
+            status=LessonStatus.PUBLISHED,
+        ))
+        if len(grammar) >= batch_size:
+            Grammar.objects.bulk_create(grammar)
+            VideoLesson.objects.bulk_create(videos)
+            grammar, videos = [], []
+    Grammar.objects.bulk_create(grammar)
+    VideoLesson.objects.bulk_create(videos)
+
+
+def time_calls(func, arguments):
+    """Call ``func`` once per argument and return per-call timings in ms."""
+    timings = []
+    for argument in arguments:
+        start = time.perf_counter()
+        func(argument)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    """Return (mean, p95) in milliseconds."""
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return statistics.mean(ordered), p95
@@ -0,0 +1,176 @@
+"""
+Fast list serialization for read-only content endpoints.
+
+``CompactSerializer`` reads a DRF ``ModelSerializer`` once and turns it
+into a flat plan over ``.values()`` columns, including nested serializers
+(``GrammarSerializer.category``) as ``category__*`` columns. List pages
+are then built straight from value dicts, with no model instances and no
+field-by-field DRF machinery, and render to the same JSON as the
+serializer: same keys in the same order, same values. File URLs are built
+from a prefix, and datetimes converted to a timezone, looked up once per
+request.
+
+Serializers using fields the plan cannot reproduce exactly (method fields,
+``many`` relations, dotted sources, ...) get no compact form, and
+``CompactListMixin`` falls back to the regular serializer for them.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Fields whose representation of a database value is the value itself
+PLAIN_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.SlugField,
+    serializers.URLField,
+)
+# Fields converted with their own ``to_representation``
+CONVERTED_FIELDS = (
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.FloatField,
+    serializers.TimeField,
+    serializers.UUIDField,
+)
+
+
+class Unsupported(Exception):
+    """A serializer field the compact plan cannot reproduce exactly."""
+
+
+def file_url(storage, request):
+    """``FileField`` representation of a stored name, as DRF builds it for ``request``."""
+    if request is None:
+        return lambda name: storage.url(name) if name else None
+    if isinstance(storage, FileSystemStorage) and storage.__class__.url is FileSystemStorage.url:
+        # ``storage.url`` joins the quoted name to ``base_url``; make that absolute once
+        prefix = request.build_absolute_uri(storage.base_url)
+        return lambda name: prefix + filepath_to_uri(name).lstrip('/') if name else None
+    return lambda name: request.build_absolute_uri(storage.url(name)) if name else None
+
+
+def iso_datetime(field):
+    """
+    ``DateTimeField.to_representation`` for aware ISO 8601 output with the
+    field's timezone looked up once, or the field's own method otherwise.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    zone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if zone is None:
+        return field.to_representation
+
+    def to_representation(value):
+        if value.tzinfo is None:  # Stored naive; let DRF make it aware
+            return field.to_representation(value)
+        text = value.astimezone(zone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return to_representation
+
+
+class CompactSerializer:
+    """Serializes ``.values(*columns)`` rows exactly like ``serializer_class(many=True)``."""
+
+    def __init__(self, serializer_class):
+        self.columns = []
+        self.plan = self.compile(serializer_class(), '')
+
+    def compile(self, serializer, prefix):
+        """``[(name, column, kind, extra)]`` for ``serializer``'s readable fields."""
+        model = serializer.Meta.model
+        plan = []
+        for field in serializer._readable_fields:
+            if '.' in field.source or field.source == '*':
+                raise Unsupported(field.field_name)
+            column = prefix + field.source
+            if isinstance(field, serializers.ModelSerializer):
+                # Keyed on the foreign key column: ``None`` when it is unset, like DRF
+                nested = self.compile(field, column + '__')
+                plan.append((field.field_name, self.add(column), 'nested', nested))
+            elif isinstance(field, serializers.FileField):
+                storage = model._meta.get_field(field.source).storage
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                plan.append((field.field_name, self.add(column), 'file' if use_url else 'file_name', storage))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                plan.append((field.field_name, self.add(column), 'plain', None))
+            elif isinstance(field, serializers.DateTimeField):
+                plan.append((field.field_name, self.add(column), 'datetime', field))
+            elif isinstance(field, CONVERTED_FIELDS):
+                plan.append((field.field_name, self.add(column), 'convert', field.to_representation))
+            elif isinstance(field, PLAIN_FIELDS) and not isinstance(field, serializers.MultipleChoiceField):
+                plan.append((field.field_name, self.add(column), 'plain', None))
+            else:
+                raise Unsupported(field.field_name)
+        return plan
+
+    def add(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+        return column
+
+    def bind(self, context):
+        """A function turning one values row into the serializer's output for ``context``."""
+        return self.row_function(self.plan, context.get('request'))
+
+    def row_function(self, plan, request):
+        steps = []
+        for name, column, kind, extra in plan:
+            if kind == 'nested':
+                steps.append((name, column, self.row_function(extra, request), True))
+            elif kind == 'file':
+                steps.append((name, column, file_url(extra, request), False))
+            elif kind == 'datetime':
+                steps.append((name, column, iso_datetime(extra), False))
+            elif kind == 'file_name':
+                steps.append((name, column, lambda value: value or None, False))
+            else:
+                steps.append((name, column, extra, False))
+
+        def serialize(row):
+            data = {}
+            for name, column, convert, nested in steps:
+                value = row[column]
+                if value is None or convert is None:
+                    data[name] = value
+                elif nested:
+                    data[name] = convert(row)
+                else:
+                    data[name] = convert(value)
+            return data
+        return serialize
+
+
+@lru_cache(maxsize=None)
+def compact_serializer(serializer_class):
+    """The ``CompactSerializer`` for ``serializer_class``, or None if it has none."""
+    try:
+        return CompactSerializer(serializer_class)
+    except Unsupported:
+        return None
+
+
+class CompactListMixin:
+    """``list`` from ``.values()`` rows through ``compact_serializer``; same JSON, less CPU."""
+
+    def list(self, request, *args, **kwargs):
+        compact = compact_serializer(self.get_serializer_class())
+        if compact is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*compact.columns)
+        serialize = compact.bind(self.get_serializer_context())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([serialize(row) for row in page])
+        return Response([serialize(row) for row in queryset])
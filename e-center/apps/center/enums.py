@@ -10,3 +10,10 @@ class Level(TextChoices):
     ADVANCED = 'advanced', 'Advanced'
 
 
+
+
+class ProgressEventType(TextChoices):
+    OPENED = 'opened', 'Opened'
+    COMPLETED = 'completed', 'Completed'
+    WATCHED = 'watched', 'Watched'
+    REVIEWED = 'reviewed', 'Reviewed'
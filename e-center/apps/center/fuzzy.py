@@ -0,0 +1,168 @@
+"""
+Typo-tolerant vocabulary lookup.
+
+Headwords are folded to plain ASCII (``ş`` -> ``sh``, ``ä`` -> ``a`` ...) so
+learners typing without a Turkmen keyboard still match, and split into
+character trigrams.  A query first collects candidates that share enough
+trigrams to possibly be within the allowed edit distance, then only those
+candidates pay for a bounded Levenshtein check.
+"""
+import threading
+import unicodedata
+from collections import defaultdict
+
+from .generation import GenerationMixin
+from .prefix_index import fold
+from .search import GENERATION_CACHE_KEY, annotate_ranked, filter_ranked
+
+# How Turkmen letters are commonly typed on a Latin keyboard
+TRANSLITERATION = str.maketrans({
+    'ä': 'a',
+    'ç': 'ch',
+    'ň': 'ng',
+    'ö': 'o',
+    'ş': 'sh',
+    'ü': 'u',
+    'ý': 'y',
+    'ž': 'zh',
+})
+
+MAX_CANDIDATES = 200
+
+
+def fold_diacritics(text):
+    """Casefold, transliterate Turkmen letters and strip any other accents."""
+    text = fold(text).translate(TRANSLITERATION)
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def trigrams(text):
+    """Padded character trigrams, pg_trgm style."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance_for(text):
+    """Edit budget that grows with the length of what was typed."""
+    if len(text) <= 5:
+        return 1
+    if len(text) <= 10:
+        return 2
+    return 3
+
+
+def bounded_levenshtein(a, b, limit):
+    """
+    Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` as soon as
+    it is certain to exceed ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class TrigramIndex(GenerationMixin):
+    """
+    Per-process trigram index over folded Turkmen and English headwords.
+
+    Shares the vocabulary search generation token, so any word write makes
+    every process rebuild it lazily.
+    """
+    generation_key = GENERATION_CACHE_KEY
+
+    def __init__(self):
+        self._keys = []
+        self._word_ids = []
+        self._postings = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        from .models import TurkmenEnglishWord
+
+        generation = self._current_generation()
+        keys, word_ids = [], []
+        postings = defaultdict(list)
+        rows = TurkmenEnglishWord.objects.values_list('id', 'turkmen_word', 'english_word')
+        for word_id, turkmen_word, english_word in rows.iterator(chunk_size=5000):
+            for headword in {fold_diacritics(turkmen_word), fold_diacritics(english_word)}:
+                if not headword:
+                    continue
+                position = len(keys)
+                keys.append(headword)
+                word_ids.append(word_id)
+                for gram in trigrams(headword):
+                    postings[gram].append(position)
+
+        with self._lock:
+            self._keys, self._word_ids = keys, word_ids
+            self._postings = dict(postings)
+            self._generation = generation
+
+    def match(self, query, limit=None):
+        """Return ``[(word_id, distance), ...]`` closest first."""
+        folded = fold_diacritics(query)
+        if not folded:
+            return []
+
+        self.ensure_fresh()
+        keys, word_ids, postings = self._keys, self._word_ids, self._postings
+        limit_distance = max_distance_for(folded)
+        query_grams = trigrams(folded)
+
+        # q-gram lemma: each edit destroys at most three trigrams, so a match
+        # shares at least ``min_shared`` of them and must therefore appear in
+        # one of the ``len - min_shared + 1`` rarest query trigram lists
+        min_shared = len(query_grams) - 3 * limit_distance
+        by_rarity = sorted(query_grams, key=lambda gram: len(postings.get(gram, ())))
+        if min_shared > 0:
+            by_rarity = by_rarity[:len(by_rarity) - min_shared + 1]
+
+        candidates = set()
+        for gram in by_rarity:
+            candidates.update(postings.get(gram, ()))
+
+        best = {}
+        for position in candidates:
+            key = keys[position]
+            if abs(len(key) - len(folded)) > limit_distance:
+                continue
+            if min_shared > 0 and len(query_grams & trigrams(key)) < min_shared:
+                continue
+            distance = bounded_levenshtein(folded, key, limit_distance)
+            if distance > limit_distance:
+                continue
+            word_id = word_ids[position]
+            if distance < best.get(word_id, limit_distance + 1):
+                best[word_id] = distance
+
+        ranked = sorted(best.items(), key=lambda item: (item[1], item[0]))
+        return ranked[:limit]
+
+
+trigram_index = TrigramIndex()
+
+
+def fuzzy_search(queryset, query):
+    """
+    Filter ``queryset`` to headwords within a small edit distance of
+    ``query`` and annotate ``search_rank`` (exact matches rank highest).
+    """
+    matches = filter_ranked(queryset, trigram_index.match(query), limit=MAX_CANDIDATES)
+    return annotate_ranked(
+        queryset,
+        [(word_id, 1.0 / (1 + distance)) for word_id, distance in matches],
+    )
@@ -0,0 +1,47 @@
+"""
+Shared staleness tokens for the per-process vocabulary indexes.
+
+The prefix, search, trigram and sampling indexes are built in every worker
+process from the database. Each is tied to a cache key holding a random
+token: a write replaces the token, and a process rebuilds its copy when the
+token differs from the one it built against. Tokens are uuid4s rather than
+a counter, so they never repeat: if the cache is cleared or the key is
+evicted, the next lookup sees a token no process has built against and
+every process rebuilds, instead of one restarting at a value it has
+already seen and serving a stale index.
+"""
+import uuid
+
+from django.core.cache import cache
+
+
+def current_generation(key):
+    """The token stored under ``key``, creating one if there is none."""
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(key, generation, None):
+            generation = cache.get(key, generation)  # Another process set it first
+    return generation
+
+
+def invalidate(key):
+    """Mark every process's index tied to ``key`` as stale."""
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+class GenerationMixin:
+    """
+    Lazy rebuilds for an index tied to ``generation_key``. ``build()`` reads
+    ``self._current_generation()`` before loading and stores it as
+    ``self._generation`` with the new data.
+    """
+    generation_key = None
+
+    def _current_generation(self):
+        return current_generation(self.generation_key)
+
+    def ensure_fresh(self):
+        """Rebuild the index if a write has happened since the last build."""
+        if self._generation != self._current_generation():
+            self.build()
@@ -0,0 +1,98 @@
+"""
+Benchmark the content list serializers: DRF ModelSerializer vs the compact values path.
+Usage: python manage.py benchmark_list_serializers [--objects 1000] [--rounds 5]
+
+Reports microseconds per object for serialization alone (rows already
+fetched) and end to end (query plus serialization), and checks that both
+paths render the same JSON.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.center.benchmarking import populate_lessons, populate_vocabulary
+from apps.center.compact import compact_serializer
+from apps.center.views import GrammarViewSet, TurkmenEnglishWordViewSet, VideoLessonViewSet
+
+
+def best_of(rounds, func):
+    """Fastest of ``rounds`` calls, in seconds."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF and compact serialization of the grammar, video and vocabulary lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--objects',
+            type=int,
+            default=1000,
+            help='Objects serialized per list (default: 1000)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Timed rounds per measurement; the best is reported (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        size, rounds = options['objects'], options['rounds']
+        request = Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))
+        renderer = JSONRenderer()
+
+        header = f"{'List':<12} {'DRF':>9} {'Compact':>9} {'Speedup':>8} {'DRF e2e':>9} {'Compact e2e':>12} {'JSON':>6}"
+        self.stdout.write(self.style.SUCCESS(header + '   (µs per object)'))
+        self.stdout.write('-' * len(header))
+
+        with transaction.atomic():
+            populate_lessons(size)
+            populate_vocabulary(size)
+
+            for label, viewset in (
+                ('grammar', GrammarViewSet),
+                ('videos', VideoLessonViewSet),
+                ('vocabulary', TurkmenEnglishWordViewSet),
+            ):
+                serializer_class = viewset.serializer_class
+                queryset = viewset.queryset.order_by('id')[:size]
+                compact = compact_serializer(serializer_class)
+                context = {'request': request}
+
+                instances = list(queryset)
+                rows = list(queryset.values(*compact.columns))
+
+                def drf(objects):
+                    return serializer_class(objects, many=True, context=context).data
+
+                def fast(values):
+                    serialize = compact.bind(context)
+                    return [serialize(row) for row in values]
+
+                same = renderer.render(drf(instances)) == renderer.render(fast(rows))
+                timings = [
+                    best_of(rounds, lambda: drf(instances)),
+                    best_of(rounds, lambda: fast(rows)),
+                    best_of(rounds, lambda: drf(list(queryset))),
+                    best_of(rounds, lambda: fast(list(queryset.values(*compact.columns)))),
+                ]
+                drf_us, fast_us, drf_e2e, fast_e2e = [seconds * 1e6 / len(instances) for seconds in timings]
+                self.stdout.write(
+                    f"{label:<12} {drf_us:>9.1f} {fast_us:>9.1f} {drf_us / fast_us:>7.1f}x "
+                    f"{drf_e2e:>9.1f} {fast_e2e:>12.1f} {'same' if same else 'DIFF':>6}"
+                )
+                if not same:
+                    self.stdout.write(self.style.WARNING(f'⚠️  {label}: compact JSON differs from the serializer'))
+
+            transaction.set_rollback(True)
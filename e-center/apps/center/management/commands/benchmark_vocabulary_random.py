@@ -0,0 +1,88 @@
+"""
+Benchmark random practice decks: dense id sampler vs loading every id.
+Usage: python manage.py benchmark_vocabulary_random [--sizes 1000 10000 100000 1000000] [--count 10]
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.center import search
+from apps.center.benchmarking import populate_vocabulary, summarize, time_calls
+from apps.center.enums import Level
+from apps.center.models import TurkmenEnglishWord
+from apps.center.sampling import random_words, sampler
+
+
+def legacy_random(queryset, count):
+    """The previous implementation, kept here for comparison."""
+    word_ids = list(queryset.values_list('id', flat=True))
+    random_ids = random.sample(word_ids, min(count, len(word_ids)))
+    return list(queryset.filter(id__in=random_ids))
+
+
+class Command(BaseCommand):
+    help = 'Compare O(k) vocabulary sampling with loading the full id column'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000, 1000000],
+            help='Vocabulary sizes to benchmark (default: 1k 10k 100k 1M)',
+        )
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=10,
+            help='Words per deck (default: 10)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Decks drawn per size (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        levels = [choice for choice, _ in Level.choices]
+        rng = random.Random(3)
+        deck_levels = [rng.choice(levels + [None]) for _ in range(options['requests'])]
+
+        header = f"{'Words':>10} {'Legacy mean':>12} {'Legacy p95':>11} {'Sampler mean':>13} {'Sampler p95':>12} {'Array build':>12}"
+        self.stdout.write(self.style.SUCCESS(header))
+        self.stdout.write('-' * len(header))
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                TurkmenEnglishWord.objects.all().delete()
+                populate_vocabulary(size)
+                search.invalidate()
+                queryset = TurkmenEnglishWord.objects.all()
+
+                build_start = time.perf_counter()
+                sampler.ensure_fresh()
+                build_ms = (time.perf_counter() - build_start) * 1000
+
+                legacy = time_calls(
+                    lambda level: legacy_random(queryset.filter(level=level) if level else queryset, count),
+                    deck_levels,
+                )
+                sampled = time_calls(
+                    lambda level: random_words(queryset, count, level=level),
+                    deck_levels,
+                )
+
+                legacy_mean, legacy_p95 = summarize(legacy)
+                sampled_mean, sampled_p95 = summarize(sampled)
+                self.stdout.write(
+                    f"{size:>10,} {legacy_mean:>10.2f}ms {legacy_p95:>9.2f}ms "
+                    f"{sampled_mean:>11.2f}ms {sampled_p95:>10.2f}ms {build_ms:>10.0f}ms"
+                )
+                transaction.set_rollback(True)
+
+        search.invalidate()
@@ -0,0 +1,101 @@
+"""
+Benchmark ranked vocabulary search against the legacy OR-of-icontains query.
+Usage: python manage.py benchmark_vocabulary_search [--sizes 10000 100000 1000000] [--queries 50]
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from apps.center import search
+from apps.center.benchmarking import (
+    ENGLISH_SYLLABLES, populate_vocabulary, summarize, time_calls
+)
+from apps.center.models import TurkmenEnglishWord
+
+PAGE_SIZE = 20
+
+
+def paginated(queryset):
+    """Mimic one list request: a COUNT for the paginator plus the first page."""
+    return queryset.count(), list(queryset[:PAGE_SIZE])
+
+
+def legacy_search(queryset, query):
+    """The pre-ranking implementation, kept here for comparison."""
+    q_objects = Q()
+    for term in query.split():
+        q_objects |= (
+            Q(turkmen_word__icontains=term) |
+            Q(english_word__icontains=term) |
+            Q(definition__icontains=term) |
+            Q(example_sentence__icontains=term)
+        )
+    return queryset.filter(q_objects).distinct()
+
+
+class Command(BaseCommand):
+    help = 'Compare ranked vocabulary search with the legacy icontains search'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 1000000],
+            help='Vocabulary sizes to benchmark (default: 10k 100k 1M)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=50,
+            help='Number of queries per size (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        queries = [
+            ' '.join(
+                ''.join(rng.choice(ENGLISH_SYLLABLES) for _ in range(rng.randint(2, 3)))
+                for _ in range(rng.randint(1, 2))
+            )
+            for _ in range(options['queries'])
+        ]
+
+        self.stdout.write(f"Backend: {type(search.get_backend()).__name__}")
+        header = f"{'Words':>10} {'Legacy mean':>12} {'Legacy p95':>11} {'Ranked mean':>12} {'Ranked p95':>11} {'Index build':>12}"
+        self.stdout.write(self.style.SUCCESS(header))
+        self.stdout.write('-' * len(header))
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                TurkmenEnglishWord.objects.all().delete()
+                populate_vocabulary(size)
+                search.invalidate()
+                queryset = TurkmenEnglishWord.objects.all()
+
+                build_start = time.perf_counter()
+                search.search_vocabulary(queryset, queries[0]).exists()
+                build_ms = (time.perf_counter() - build_start) * 1000
+
+                legacy = time_calls(
+                    lambda query: paginated(legacy_search(queryset, query).order_by('turkmen_word')),
+                    queries,
+                )
+                ranked = time_calls(
+                    lambda query: paginated(search.search_vocabulary(queryset, query).order_by('-search_rank')),
+                    queries,
+                )
+
+                legacy_mean, legacy_p95 = summarize(legacy)
+                ranked_mean, ranked_p95 = summarize(ranked)
+                self.stdout.write(
+                    f"{size:>10,} {legacy_mean:>10.2f}ms {legacy_p95:>9.2f}ms "
+                    f"{ranked_mean:>10.2f}ms {ranked_p95:>9.2f}ms {build_ms:>10.0f}ms"
+                )
+                transaction.set_rollback(True)
+
+        search.invalidate()
@@ -0,0 +1,21 @@
+"""
+Management command to apply cached video views to VideoLesson.views_count.
+Usage: python manage.py flush_video_views
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.center.models import VideoLesson
+from apps.center.view_counts import flush_views
+
+
+class Command(BaseCommand):
+    help = 'Apply pending cache-counted video views to VideoLesson.views_count'
+
+    def handle(self, *args, **options):
+        # Every video, so views whose log entry was lost are applied too
+        applied = flush_views(VideoLesson.objects.values_list('id', flat=True))
+        if applied is None:
+            self.stdout.write(self.style.WARNING('⚠️  Another flush is applying views; run again shortly'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'✓ Applied {applied} pending video views'))
@@ -0,0 +1,50 @@
+"""
+Management command to backfill and verify the per-author content counters.
+Usage: python manage.py rebuild_author_content_stats [--model grammar|video|vocabulary] [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.center.stats import TRACKED_MODELS, rebuild_author_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute AuthorContentStat counters from the content tables and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            type=str,
+            choices=[key for key, _ in TRACKED_MODELS.values()],
+            help='Only rebuild counters for this content type',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Verify only: report drift without saving the recomputed counters',
+        )
+
+    def handle(self, *args, **options):
+        models = [
+            model for model, (key, _) in TRACKED_MODELS.items()
+            if options['model'] in (None, key)
+        ]
+
+        with transaction.atomic():
+            drift = rebuild_author_stats(models)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        for content_type, changes in drift.items():
+            if not changes:
+                self.stdout.write(self.style.SUCCESS(f'✓ {content_type}: author counters in sync'))
+                continue
+            self.stdout.write(self.style.WARNING(f'⚠️  {content_type}: {len(changes)} author counters drifted'))
+            for user_id, status, old, new in changes:
+                self.stdout.write(f'   user={user_id} status={status}: {old} -> {new}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - no changes saved.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Author content statistics rebuilt!'))
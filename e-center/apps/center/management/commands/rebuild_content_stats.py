@@ -0,0 +1,50 @@
+"""
+Management command to reconcile the materialized content statistics.
+Usage: python manage.py rebuild_content_stats [--model grammar|video|vocabulary] [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.center.stats import TRACKED_MODELS, rebuild_content_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute ContentStat counters from the content tables and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            type=str,
+            choices=[key for key, _ in TRACKED_MODELS.values()],
+            help='Only rebuild counters for this model',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without saving the recomputed counters',
+        )
+
+    def handle(self, *args, **options):
+        models = [
+            model for model, (key, _) in TRACKED_MODELS.items()
+            if options['model'] in (None, key)
+        ]
+
+        with transaction.atomic():
+            drift = rebuild_content_stats(models)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        for stats_key, changes in drift.items():
+            if not changes:
+                self.stdout.write(self.style.SUCCESS(f'✓ {stats_key}: counters in sync'))
+                continue
+            self.stdout.write(self.style.WARNING(f'⚠️  {stats_key}: {len(changes)} counters drifted'))
+            for dimension, value, old, new in changes:
+                self.stdout.write(f'   {dimension}={value or "-"}: {old} -> {new}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - no changes saved.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Content statistics rebuilt!'))
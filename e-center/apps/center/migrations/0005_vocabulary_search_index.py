@@ -0,0 +1,49 @@
+"""
+GIN index backing ranked vocabulary search on PostgreSQL.
+
+The indexed expression must match ``apps.center.search.build_search_vector``
+exactly for the planner to use it. Other databases use the in-process
+inverted index instead, so this migration is a no-op there.
+"""
+
+from django.db import migrations
+
+INDEX_NAME = 'vocabulary_search_gin'
+
+
+def _search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    vector = (
+        SearchVector('turkmen_word', weight='A', config='simple')
+        + SearchVector('english_word', weight='A', config='simple')
+        + SearchVector('definition', weight='B', config='simple')
+        + SearchVector('example_sentence', weight='C', config='simple')
+    )
+    return GinIndex(vector, name=INDEX_NAME)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    TurkmenEnglishWord = apps.get_model('center', 'TurkmenEnglishWord')
+    schema_editor.add_index(TurkmenEnglishWord, _search_index())
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    TurkmenEnglishWord = apps.get_model('center', 'TurkmenEnglishWord')
+    schema_editor.remove_index(TurkmenEnglishWord, _search_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center', '0004_category_alter_grammar_options_remove_grammar_level_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
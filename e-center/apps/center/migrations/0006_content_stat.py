@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:34
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# (stats key, model name, {dimension: group-by field})
+TRACKED = [
+    ('grammar', 'Grammar', {'status': 'status', 'category': 'category__name'}),
+    ('video', 'VideoLesson', {'status': 'status', 'level': 'level'}),
+    ('vocabulary', 'TurkmenEnglishWord', {'status': 'status', 'level': 'level'}),
+]
+
+
+def backfill_content_stats(apps, schema_editor):
+    ContentStat = apps.get_model('center', 'ContentStat')
+    rows = []
+    for stats_key, model_name, dimensions in TRACKED:
+        queryset = apps.get_model('center', model_name).objects.all()
+        counts = Counter({('total', ''): queryset.count()})
+        for dimension, field in dimensions.items():
+            for item in queryset.values(field).annotate(count=Count('id')).order_by():
+                counts[(dimension, item[field] or '')] += item['count']
+        rows.extend(
+            ContentStat(model=stats_key, dimension=dimension, value=value, count=count)
+            for (dimension, value), count in counts.items()
+        )
+    ContentStat.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center', '0005_vocabulary_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=30)),
+                ('dimension', models.CharField(max_length=30)),
+                ('value', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'content_stats',
+                'db_table': 'content_stat',
+                'constraints': [models.UniqueConstraint(fields=('model', 'dimension', 'value'), name='content_stat_key')],
+            },
+        ),
+        migrations.RunPython(backfill_content_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# (content type, model name)
+TRACKED = [
+    ('grammar', 'Grammar'),
+    ('video', 'VideoLesson'),
+    ('vocabulary', 'TurkmenEnglishWord'),
+]
+
+
+def backfill_author_content_stats(apps, schema_editor):
+    AuthorContentStat = apps.get_model('center', 'AuthorContentStat')
+    rows = []
+    for content_type, model_name in TRACKED:
+        queryset = apps.get_model('center', model_name).objects.filter(created_by__isnull=False)
+        for item in queryset.values('created_by_id', 'status').annotate(count=Count('id')).order_by():
+            rows.append(AuthorContentStat(
+                user_id=item['created_by_id'], content_type=content_type, status=item['status'], count=item['count']
+            ))
+    AuthorContentStat.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center', '0006_content_stat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorContentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=30)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='content_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'author_content_stats',
+                'db_table': 'author_content_stat',
+                'constraints': [models.UniqueConstraint(fields=('user', 'content_type', 'status'), name='author_content_stat_key')],
+            },
+        ),
+        migrations.RunPython(backfill_author_content_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center', '0007_author_content_stat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=30)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('completed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completed_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'completed_items',
+                'db_table': 'completed_item',
+                'constraints': [models.UniqueConstraint(fields=('user', 'content_type', 'object_id'), name='completed_item_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProgressEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=30)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('event', models.CharField(choices=[('opened', 'Opened'), ('completed', 'Completed'), ('watched', 'Watched'), ('reviewed', 'Reviewed')], max_length=20)),
+                ('score', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'progress_events',
+                'db_table': 'progress_event',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='progress_event_user_time')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=30)),
+                ('completed', models.IntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'user_progress',
+                'db_table': 'user_progress',
+                'constraints': [models.UniqueConstraint(fields=('user', 'content_type'), name='user_progress_key')],
+            },
+        ),
+    ]
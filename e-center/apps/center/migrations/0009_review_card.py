@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center', '0008_progress_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ease', models.FloatField(default=2.5)),
+                ('interval', models.PositiveIntegerField(default=0, help_text='Days until the next review')),
+                ('repetitions', models.PositiveIntegerField(default=0)),
+                ('lapses', models.PositiveIntegerField(default=0)),
+                ('due_at', models.DateTimeField()),
+                ('last_reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_cards', to=settings.AUTH_USER_MODEL)),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_cards', to='center.turkmenenglishword')),
+            ],
+            options={
+                'verbose_name_plural': 'review_cards',
+                'db_table': 'review_card',
+                'indexes': [models.Index(fields=['user', 'due_at'], name='review_card_due')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'word'), name='review_card_key')],
+            },
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from .enums import Level
+from .enums import Level, ProgressEventType
 from apps.core.models import BaseModel
 from apps.users.enums import LessonStatus
 from ..users.models import User
@@ -121,4 +121,147 @@ class TurkmenEnglishWord(BaseModel):
         unique_together = ['turkmen_word', 'english_word']
 
     def __str__(self):
-        return f"{self.turkmen_word} - {self.english_word}"
\ No newline at end of file
+        return f"{self.turkmen_word} - {self.english_word}"
+
+class ContentStat(models.Model):
+    """
+    Incrementally maintained row counts for content models, keyed by
+    (model, dimension, value). Kept in sync by signal handlers in
+    ``apps.center.stats``; ``rebuild_content_stats`` reconciles drift.
+    """
+    model = models.CharField(max_length=30)
+    dimension = models.CharField(max_length=30)
+    value = models.CharField(max_length=100, blank=True, default='')
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'content_stat'
+        verbose_name_plural = 'content_stats'
+        app_label = 'center'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'dimension', 'value'], name='content_stat_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}.{self.dimension}={self.value}: {self.count}"
+
+
+class AuthorContentStat(models.Model):
+    """
+    Per-author row counts by content type and status, maintained alongside
+    ``ContentStat`` so a teacher's dashboard is a single indexed read.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='content_stats')
+    content_type = models.CharField(max_length=30)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'author_content_stat'
+        verbose_name_plural = 'author_content_stats'
+        app_label = 'center'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content_type', 'status'], name='author_content_stat_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.content_type}.{self.status}: {self.count}"
+
+
+class ProgressEvent(models.Model):
+    """
+    Append-only log of learning activity. Written in batches by
+    ``apps.center.progress``; never updated in place.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress_events')
+    content_type = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    event = models.CharField(max_length=20, choices=ProgressEventType.choices)
+    score = models.PositiveSmallIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'progress_event'
+        verbose_name_plural = 'progress_events'
+        app_label = 'center'
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='progress_event_user_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.event} {self.content_type}#{self.object_id}"
+
+
+class CompletedItem(models.Model):
+    """
+    One row per item a user has completed (grammar lesson finished, video
+    watched, word mastered), so repeated events never count twice.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='completed_items')
+    content_type = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    completed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'completed_item'
+        verbose_name_plural = 'completed_items'
+        app_label = 'center'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content_type', 'object_id'], name='completed_item_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.content_type}#{self.object_id}"
+
+
+class UserProgress(models.Model):
+    """
+    Per-user rollup of completed items by content type, updated incrementally
+    whenever a batch of progress events is flushed.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
+    content_type = models.CharField(max_length=30)
+    completed = models.IntegerField(default=0)
+    last_activity_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'user_progress'
+        verbose_name_plural = 'user_progress'
+        app_label = 'center'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content_type'], name='user_progress_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.content_type}: {self.completed}"
+
+
+class ReviewCard(models.Model):
+    """
+    Spaced-repetition state of one word for one learner (SM-2). The
+    (user, due_at) index serves the review queue as a single range scan.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_cards')
+    word = models.ForeignKey(TurkmenEnglishWord, on_delete=models.CASCADE, related_name='review_cards')
+    ease = models.FloatField(default=2.5)
+    interval = models.PositiveIntegerField(default=0, help_text="Days until the next review")
+    repetitions = models.PositiveIntegerField(default=0)
+    lapses = models.PositiveIntegerField(default=0)
+    due_at = models.DateTimeField()
+    last_reviewed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'review_card'
+        verbose_name_plural = 'review_cards'
+        app_label = 'center'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'word'], name='review_card_key'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='review_card_due'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.word_id} due {self.due_at}"
@@ -0,0 +1,108 @@
+"""
+In-memory prefix index for vocabulary autocomplete.
+
+Published Turkmen and English headwords are kept in a single sorted array of
+casefolded keys so that a prefix lookup is a ``bisect`` plus a short scan
+instead of an ``istartswith`` table scan.  The index lives in each worker
+process; writes replace its generation token in the Django cache (see
+``apps.center.generation``) so that every process notices and rebuilds
+lazily on its next lookup.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from apps.users.enums import LessonStatus
+
+from . import generation
+from .generation import GenerationMixin
+
+GENERATION_CACHE_KEY = 'center:vocabulary_prefix_index:generation'
+
+
+def fold(text):
+    """
+    Normalize text for case-insensitive prefix matching.
+
+    NFC composition first, so that a decomposed "s" + combining cedilla
+    compares equal to "ş", then full Unicode casefolding, which maps the
+    Turkmen capitals Ä Ç Ň Ö Ş Ü Ý Ž onto their lowercase forms.
+    """
+    return unicodedata.normalize('NFC', text or '').casefold().strip()
+
+
+class VocabularyPrefixIndex(GenerationMixin):
+    """
+    Sorted-array prefix index over published TurkmenEnglishWord headwords.
+    """
+    generation_key = GENERATION_CACHE_KEY
+
+    def __init__(self):
+        self._keys = []
+        self._entries = []
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        """Load published words and rebuild the sorted key arrays."""
+        from .models import TurkmenEnglishWord
+
+        generation = self._current_generation()
+        rows = TurkmenEnglishWord.objects.filter(
+            status=LessonStatus.PUBLISHED,
+            is_deleted=False,
+        ).values_list('id', 'turkmen_word', 'english_word', 'level')
+
+        pairs = []
+        for word_id, turkmen_word, english_word, level in rows:
+            entry = {
+                'id': word_id,
+                'turkmen_word': turkmen_word,
+                'english_word': english_word,
+                'level': level,
+            }
+            pairs.append((fold(turkmen_word), word_id, entry))
+            pairs.append((fold(english_word), word_id, entry))
+        pairs.sort(key=lambda pair: (pair[0], pair[1]))
+
+        keys = [pair[0] for pair in pairs]
+        entries = [pair[2] for pair in pairs]
+        with self._lock:
+            self._keys, self._entries = keys, entries
+            self._generation = generation
+
+    def lookup(self, prefix, limit=10):
+        """
+        Return up to ``limit`` words whose Turkmen or English headword starts
+        with ``prefix``, ordered by matched key.
+        """
+        folded = fold(prefix)
+        if not folded or limit <= 0:
+            return []
+
+        self.ensure_fresh()
+        keys, entries = self._keys, self._entries
+
+        results = []
+        seen = set()
+        position = bisect_left(keys, folded)
+        while position < len(keys) and keys[position].startswith(folded):
+            entry = entries[position]
+            if entry['id'] not in seen:
+                seen.add(entry['id'])
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+            position += 1
+        return results
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def invalidate():
+    """Mark every process's prefix index as stale."""
+    generation.invalidate(GENERATION_CACHE_KEY)
+
+
+prefix_index = VocabularyPrefixIndex()
@@ -0,0 +1,283 @@
+"""
+Student progress tracking.
+
+Learning activity (lesson opened/completed, video watched, word reviewed) is
+appended to ``ProgressEvent``. Events are buffered per process and written
+with ``bulk_create`` once the buffer fills up or a short interval passes, so
+a whole class finishing a quiz at once costs a handful of statements rather
+than one transaction per event.
+
+Each flush also turns completing events into ``CompletedItem`` rows (at most
+one per user and item) and bumps the matching ``UserProgress`` rollups, so
+the dashboard reads one row per content type instead of scanning events.
+
+A failed write puts its events back in the buffer to be retried later (up
+to ``PROGRESS_MAX_PENDING`` events; beyond that the oldest are dropped and
+logged), so the progress endpoint still answers 202. A batch rejected by the
+database itself is split in halves until the offending events are isolated
+and dropped, so one bad event cannot hold back the rest forever. The buffer lives in
+the worker's memory, though: events not yet flushed are lost if the
+process crashes or is killed, and only a clean shutdown flushes them.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .enums import ProgressEventType
+from .models import CompletedItem, Grammar, ProgressEvent, TurkmenEnglishWord, UserProgress, VideoLesson
+
+# content type -> model, matching the keys used by ``apps.center.stats``
+CONTENT_MODELS = {
+    'grammar': Grammar,
+    'video': VideoLesson,
+    'vocabulary': TurkmenEnglishWord,
+}
+
+# SM-2 style review quality (0-5) at which a word counts as mastered
+MASTERY_SCORE = 4
+
+# content type -> event that completes an item of that type
+COMPLETING_EVENTS = {
+    'grammar': ProgressEventType.COMPLETED,
+    'video': ProgressEventType.WATCHED,
+    'vocabulary': ProgressEventType.REVIEWED,
+}
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 2.0  # seconds
+DEFAULT_MAX_PENDING = 50000
+
+
+def completes(event):
+    """Whether ``event`` marks its item as completed."""
+    if COMPLETING_EVENTS.get(event.content_type) != event.event:
+        return False
+    if event.content_type == 'vocabulary':
+        return event.score is not None and event.score >= MASTERY_SCORE
+    return True
+
+
+def write_events(events):
+    """
+    Persist ``events`` and fold them into the completion and rollup tables in
+    one transaction. Returns the number of newly completed items.
+    """
+    if not events:
+        return 0
+
+    activity = {}
+    candidates = {}
+    for event in events:
+        key = (event.user_id, event.content_type)
+        if activity.get(key) is None or event.created_at > activity[key]:
+            activity[key] = event.created_at
+        if completes(event):
+            candidates.setdefault((event.user_id, event.content_type, event.object_id), event.created_at)
+
+    # Completions only count for items that exist
+    ids_by_type = defaultdict(set)
+    for _, content_type, object_id in candidates:
+        ids_by_type[content_type].add(object_id)
+    existing = {
+        (content_type, object_id)
+        for content_type, ids in ids_by_type.items()
+        for object_id in CONTENT_MODELS[content_type].objects.filter(id__in=ids).values_list('id', flat=True)
+    }
+
+    user_ids = sorted({user_id for user_id, _ in activity})
+    with transaction.atomic():
+        ProgressEvent.objects.bulk_create(events, batch_size=1000)
+
+        UserProgress.objects.bulk_create(
+            [UserProgress(user_id=user_id, content_type=content_type) for user_id, content_type in activity],
+            ignore_conflicts=True,
+        )
+        # Locking the rollups serializes concurrent flushes for the same users,
+        # so the "already completed" check below cannot race
+        list(UserProgress.objects.select_for_update().filter(user_id__in=user_ids).values_list('id'))
+
+        already = set()
+        for content_type, ids in ids_by_type.items():
+            already.update(
+                CompletedItem.objects.filter(
+                    user_id__in=user_ids, content_type=content_type, object_id__in=ids
+                ).values_list('user_id', 'content_type', 'object_id')
+            )
+
+        new_items = [
+            CompletedItem(user_id=user_id, content_type=content_type, object_id=object_id, completed_at=completed_at)
+            for (user_id, content_type, object_id), completed_at in candidates.items()
+            if (content_type, object_id) in existing and (user_id, content_type, object_id) not in already
+        ]
+        CompletedItem.objects.bulk_create(new_items, batch_size=1000)
+
+        deltas = Counter((item.user_id, item.content_type) for item in new_items)
+        for (user_id, content_type), last_activity_at in activity.items():
+            UserProgress.objects.filter(user_id=user_id, content_type=content_type).update(
+                completed=F('completed') + deltas[(user_id, content_type)],
+                last_activity_at=Coalesce(Greatest('last_activity_at', Value(last_activity_at)), Value(last_activity_at)),
+            )
+    return len(new_items)
+
+
+class ProgressBuffer:
+    """
+    In-process event buffer. Flushes when it holds ``PROGRESS_BUFFER_SIZE``
+    events, ``PROGRESS_FLUSH_INTERVAL`` seconds after the first buffered
+    event, and at interpreter exit.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @property
+    def buffer_size(self):
+        return getattr(settings, 'PROGRESS_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'PROGRESS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, 'PROGRESS_MAX_PENDING', DEFAULT_MAX_PENDING)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _schedule(self):
+        # Caller holds the lock
+        if self._timer is None and self.flush_interval:
+            self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def add(self, events):
+        with self._lock:
+            self._pending.extend(events)
+            full = len(self._pending) >= self.buffer_size
+            if not full:
+                self._schedule()
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                # The events are back in the buffer; the request was still accepted
+                logger.exception("Failed to flush buffered progress events")
+
+    def flush(self):
+        """
+        Write every buffered event. Returns the number of events written.
+        Events that cannot be stored (an integrity or data error, such as a
+        deleted user) are dropped and logged; on any other failure the events
+        go back in the buffer and the error is raised.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            write_events(pending)
+        except (DataError, IntegrityError):
+            return self._write_in_halves(pending)
+        except Exception:
+            self.requeue(pending)
+            raise
+        return len(pending)
+
+    def _write_in_halves(self, events):
+        """
+        Write a batch one bad event failed, splitting it in halves until each
+        bad event is alone; those are dropped and logged. A different error
+        requeues everything not yet written and is raised.
+        """
+        written = 0
+        chunks = [events]
+        while chunks:
+            chunk = chunks.pop()
+            for event in chunk:
+                event.pk = None
+            try:
+                write_events(chunk)
+            except (DataError, IntegrityError):
+                if len(chunk) == 1:
+                    event = chunk[0]
+                    logger.exception(
+                        "Dropped progress event %s %s %s of user %s that cannot be written",
+                        event.event, event.content_type, event.object_id, event.user_id,
+                    )
+                    continue
+                middle = len(chunk) // 2
+                chunks += [chunk[middle:], chunk[:middle]]
+            except Exception:
+                self.requeue(chunk + [event for rest in reversed(chunks) for event in rest])
+                raise
+            else:
+                written += len(chunk)
+        return written
+
+    def requeue(self, events):
+        """Put events from a failed write back in front of the buffer and retry later."""
+        for event in events:
+            event.pk = None  # ``bulk_create`` may have set it before the rollback
+        with self._lock:
+            self._pending[:0] = events
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                logger.error("Progress buffer full; dropped the %d oldest events", overflow)
+            self._schedule()
+
+    def _timed_flush(self):
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush buffered progress events")
+        finally:
+            close_old_connections()
+
+
+progress_buffer = ProgressBuffer()
+atexit.register(progress_buffer.flush)
+
+
+def record(user, content_type, object_id, event, score=None, at=None):
+    """Buffer one progress event for ``user``."""
+    record_many([{
+        'user': user, 'content_type': content_type, 'object_id': object_id,
+        'event': event, 'score': score, 'created_at': at,
+    }])
+
+
+def record_many(items):
+    """Buffer several progress events given as dicts of ``record`` arguments."""
+    now = timezone.now()
+    progress_buffer.add([
+        ProgressEvent(
+            user=item['user'],
+            content_type=item['content_type'],
+            object_id=item['object_id'],
+            event=item['event'],
+            score=item.get('score'),
+            created_at=item.get('created_at') or now,
+        )
+        for item in items
+    ])
+
+
+def read_progress(user):
+    """Return ``{content type: completed count}`` for ``user`` in one query."""
+    return dict(UserProgress.objects.filter(user=user).values_list('content_type', 'completed'))
@@ -0,0 +1,126 @@
+"""
+Spaced-repetition scheduling for vocabulary practice.
+
+Every word a learner has seen gets a ``ReviewCard`` holding its SM-2 state
+(ease factor, interval in days, repetition count) and the moment it is due
+again. The review queue is a range scan over the (user, due_at) index, so
+its cost does not grow with the number of cards a student holds; unseen
+published words top the queue up when fewer cards are due, read from above
+the learner's highest carded word id.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.users.enums import LessonStatus
+
+from .models import ReviewCard, TurkmenEnglishWord
+from .progress import record_many
+
+MIN_EASE = 1.3
+PASSING_QUALITY = 3
+
+
+def schedule(card, quality, now):
+    """Apply one SM-2 grade (0-5) to ``card`` in place."""
+    if quality < PASSING_QUALITY:
+        if card.repetitions:
+            card.lapses += 1
+        card.repetitions = 0
+        card.interval = 1
+    else:
+        if card.repetitions == 0:
+            card.interval = 1
+        elif card.repetitions == 1:
+            card.interval = 6
+        else:
+            card.interval = max(card.interval + 1, round(card.interval * card.ease))
+        card.repetitions += 1
+
+    miss = 5 - quality
+    card.ease = max(MIN_EASE, card.ease + 0.1 - miss * (0.08 + miss * 0.02))
+    card.due_at = now + timedelta(days=card.interval)
+    card.last_reviewed_at = now
+    return card
+
+
+def review_queue(user, limit, level=None, include_new=True, now=None):
+    """
+    Return ``(due_cards, new_words)``: up to ``limit`` cards due now, oldest
+    first, topped up with words the learner has never reviewed.
+    """
+    now = now or timezone.now()
+    cards = ReviewCard.objects.filter(user=user, due_at__lte=now)
+    if level:
+        cards = cards.filter(word__level=level)
+    due = list(cards.select_related('word').order_by('due_at')[:limit])
+
+    new_words = []
+    if include_new and len(due) < limit:
+        new_words = unseen_words(user, limit - len(due), level=level)
+    return due, new_words
+
+
+def unseen_words(user, count, level=None):
+    """
+    Up to ``count`` published words ``user`` has no card for, lowest id first.
+
+    New words are introduced in id order, so everything above the learner's
+    highest carded word id is unseen and is read as a plain range scan. Only
+    when that tail runs short are the ids below it checked against the
+    learner's cards, for words published late or skipped out of order.
+    """
+    words = TurkmenEnglishWord.objects.filter(status=LessonStatus.PUBLISHED, is_deleted=False)
+    if level:
+        words = words.filter(level=level)
+    # Served by the (user, word) unique index
+    cursor = ReviewCard.objects.filter(user=user).aggregate(cursor=Max('word_id'))['cursor']
+    if cursor is None:
+        return list(words.order_by('id')[:count])
+
+    tail = list(words.filter(id__gt=cursor).order_by('id')[:count])
+    if len(tail) == count:
+        return tail
+    skipped = words.filter(id__lt=cursor).exclude(review_cards__user=user)
+    return list(skipped.order_by('id')[:count - len(tail)]) + tail
+
+
+def grade(user, answers, now=None):
+    """
+    Apply graded answers ``[(word_id, quality), ...]`` in one transaction and
+    return the updated cards. Repeated words keep their last grade; unknown
+    word ids are ignored.
+    """
+    now = now or timezone.now()
+    qualities = dict(answers)
+    if not qualities:
+        return []
+
+    with transaction.atomic():
+        word_ids = list(TurkmenEnglishWord.objects.filter(id__in=qualities).values_list('id', flat=True))
+        # Insert blank cards for unseen words first; a concurrent grade of the
+        # same word inserts the same (user, word) row and is skipped, then
+        # waits on the row lock below instead of failing
+        ReviewCard.objects.bulk_create(
+            [ReviewCard(user=user, word_id=word_id, due_at=now) for word_id in word_ids],
+            ignore_conflicts=True,
+        )
+        cards = list(
+            ReviewCard.objects.select_for_update(of=('self',)).select_related('word').filter(
+                user=user, word_id__in=word_ids
+            )
+        )
+        for card in cards:
+            schedule(card, qualities[card.word_id], now)
+        ReviewCard.objects.bulk_update(
+            cards, ['ease', 'interval', 'repetitions', 'lapses', 'due_at', 'last_reviewed_at']
+        )
+
+    record_many([
+        {'user': user, 'content_type': 'vocabulary', 'object_id': card.word_id,
+         'event': 'reviewed', 'score': qualities[card.word_id], 'created_at': now}
+        for card in cards
+    ])
+    return cards
@@ -0,0 +1,90 @@
+"""
+Constant-cost random sampling of vocabulary words.
+
+Each worker keeps a dense, sorted array of word ids per level. Drawing a
+practice deck is a ``random.sample`` over that array plus one
+``id__in`` query for ``k`` rows, instead of pulling the whole id column
+from the database on every request. The arrays share the vocabulary
+generation token and are rebuilt lazily after any write.
+
+Decks narrowed by a search cannot use the arrays directly. They start at a
+seeded pivot id and read at most ``MAX_CANDIDATES`` matching ids from there
+(wrapping around to the lowest ids), which is an index range scan however
+many words match.
+"""
+import random
+import threading
+from array import array
+from collections import defaultdict
+
+from .generation import GenerationMixin
+from .search import GENERATION_CACHE_KEY
+
+ALL_LEVELS = None
+MAX_CANDIDATES = 1000
+
+
+class VocabularySampler(GenerationMixin):
+    """Per-level dense id arrays for O(k) random draws."""
+    generation_key = GENERATION_CACHE_KEY
+
+    def __init__(self):
+        self._ids_by_level = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        from .models import TurkmenEnglishWord
+
+        generation = self._current_generation()
+        ids_by_level = defaultdict(lambda: array('q'))
+        everything = array('q')
+        rows = TurkmenEnglishWord.objects.order_by('id').values_list('id', 'level')
+        for word_id, level in rows.iterator(chunk_size=10000):
+            ids_by_level[level].append(word_id)
+            everything.append(word_id)
+        ids_by_level[ALL_LEVELS] = everything
+
+        with self._lock:
+            self._ids_by_level = dict(ids_by_level)
+            self._generation = generation
+
+    def sample_ids(self, count, level=ALL_LEVELS, seed=None):
+        """
+        Draw up to ``count`` distinct ids, optionally restricted to ``level``.
+        The same ``seed`` over the same data always yields the same deck.
+        """
+        self.ensure_fresh()
+        ids = self._ids_by_level.get(level, ())
+        rng = random.Random(seed)
+        return rng.sample(ids, min(count, len(ids)))
+
+
+sampler = VocabularySampler()
+
+
+def random_words(queryset, count, level=ALL_LEVELS, seed=None):
+    """Return up to ``count`` random words from ``queryset`` in draw order."""
+    ids = sampler.sample_ids(count, level=level, seed=seed)
+    words = {word.id: word for word in queryset.filter(id__in=ids)}
+    return [words[word_id] for word_id in ids if word_id in words]
+
+
+def random_matching_words(queryset, count, level=ALL_LEVELS, seed=None):
+    """
+    Return up to ``count`` random words from a narrowed ``queryset``, drawn
+    from at most ``MAX_CANDIDATES`` matches starting at a random pivot.
+    """
+    sampler.ensure_fresh()
+    ids = sampler._ids_by_level.get(level, ())
+    if not ids:
+        return []
+    rng = random.Random(seed)
+    pivot = ids[rng.randrange(len(ids))]
+    matching = queryset.order_by('id').values_list('id', flat=True)
+    candidates = list(matching.filter(id__gte=pivot)[:MAX_CANDIDATES])
+    if len(candidates) < MAX_CANDIDATES:
+        candidates += matching.filter(id__lt=pivot)[:MAX_CANDIDATES - len(candidates)]
+    random_ids = rng.sample(candidates, min(count, len(candidates)))
+    words = {word.id: word for word in queryset.filter(id__in=random_ids)}
+    return [words[word_id] for word_id in random_ids if word_id in words]
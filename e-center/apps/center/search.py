@@ -0,0 +1,255 @@
+"""
+Ranked full-text search for vocabulary.
+
+Two interchangeable backends sit behind ``search_vocabulary``:
+
+* ``PostgresSearchBackend`` ranks with a weighted ``SearchVector`` that is
+  served by the GIN expression index created in migration 0005.
+* ``InvertedIndexBackend`` is a pure-Python inverted index used on SQLite so
+  development and tests return the same relevance order.
+
+Headwords weigh more than definitions, which weigh more than example
+sentences.  Every query term is matched as a word prefix and terms are OR-ed,
+like the ``icontains`` loop this replaces.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils.html import escape
+
+from . import generation
+from .generation import GenerationMixin
+from .prefix_index import fold
+
+GENERATION_CACHE_KEY = 'center:vocabulary_search_index:generation'
+
+# Postgres text search configuration. 'simple' avoids English stemming, which
+# would mangle Turkmen words.
+SEARCH_CONFIG = 'simple'
+
+# Field weights, highest first. The numbers mirror ts_rank's defaults for
+# the A/B/C labels so both backends order results the same way.
+FIELD_WEIGHTS = (
+    ('turkmen_word', 'A', 1.0),
+    ('english_word', 'A', 1.0),
+    ('definition', 'B', 0.4),
+    ('example_sentence', 'C', 0.2),
+)
+
+# Upper bound on ranked ids handed back to the ORM by the Python backend,
+# applied after the queryset's own filters (see ``filter_ranked``).
+MAX_RESULTS = 500
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into folded word tokens."""
+    return TOKEN_RE.findall(fold(text))
+
+
+def build_search_vector():
+    """Weighted search vector shared by queries and the GIN index."""
+    from django.contrib.postgres.search import SearchVector
+
+    vector = None
+    for field, label, _ in FIELD_WEIGHTS:
+        part = SearchVector(field, weight=label, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+class PostgresSearchBackend:
+    """Rank with ts_rank over the weighted, GIN-indexed search vector."""
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        # Prefix match every term and OR them together: "ab:* | cd:*"
+        raw_query = ' | '.join(f"{term}:*" for term in terms)
+        query = SearchQuery(raw_query, search_type='raw', config=SEARCH_CONFIG)
+        # Filtering on the vector itself compiles to "@@", which the GIN
+        # expression index can serve; ranking only touches the matches
+        return queryset.alias(
+            search_document=build_search_vector()
+        ).filter(
+            search_document=query
+        ).annotate(
+            search_rank=SearchRank(F('search_document'), query)
+        )
+
+
+class InvertedIndexBackend(GenerationMixin):
+    """
+    Per-process inverted index mapping folded tokens to weighted postings.
+
+    Like the prefix index, it is rebuilt lazily whenever the shared
+    generation token changes.
+    """
+    generation_key = GENERATION_CACHE_KEY
+
+    def __init__(self):
+        self._postings = {}
+        self._tokens = []
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        from .models import TurkmenEnglishWord
+
+        generation = self._current_generation()
+        fields = [field for field, _, _ in FIELD_WEIGHTS]
+        postings = defaultdict(dict)
+        for row in TurkmenEnglishWord.objects.values_list('id', *fields).iterator(chunk_size=5000):
+            word_id = row[0]
+            for value, (_, _, weight) in zip(row[1:], FIELD_WEIGHTS):
+                for token in set(tokenize(value)):
+                    token_postings = postings[token]
+                    token_postings[word_id] = token_postings.get(word_id, 0.0) + weight
+
+        with self._lock:
+            self._postings = dict(postings)
+            self._tokens = sorted(self._postings)
+            self._generation = generation
+
+    def _expand(self, term):
+        """Yield indexed tokens starting with ``term``."""
+        tokens = self._tokens
+        position = bisect_left(tokens, term)
+        while position < len(tokens) and tokens[position].startswith(term):
+            yield tokens[position]
+            position += 1
+
+    def rank(self, terms, limit=None):
+        """Return ``[(word_id, score), ...]`` ordered by descending score."""
+        self.ensure_fresh()
+        scores = defaultdict(float)
+        for term in terms:
+            # A term scores once per document, by its best-matching token
+            term_scores = {}
+            for token in self._expand(term):
+                for word_id, weight in self._postings[token].items():
+                    if weight > term_scores.get(word_id, 0.0):
+                        term_scores[word_id] = weight
+            for word_id, weight in term_scores.items():
+                scores[word_id] += weight
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def search(self, queryset, terms):
+        return annotate_ranked(queryset, filter_ranked(queryset, self.rank(terms)))
+
+
+def filter_ranked(queryset, ranked, limit=MAX_RESULTS):
+    """
+    The best ``limit`` entries of ``ranked`` whose words are in ``queryset``.
+    The cap applies after the queryset's filters, so a narrowed search still
+    finds matches that rank below the first ``limit`` overall.
+    """
+    if len(ranked) <= limit:
+        return ranked  # ``annotate_ranked`` intersects with the queryset itself
+    kept = []
+    for start in range(0, len(ranked), limit):
+        chunk = ranked[start:start + limit]
+        present = set(
+            queryset.order_by().filter(id__in=[word_id for word_id, _ in chunk]).values_list('id', flat=True)
+        )
+        kept.extend(item for item in chunk if item[0] in present)
+        if len(kept) >= limit:
+            break
+    return kept[:limit]
+
+
+def annotate_ranked(queryset, ranked):
+    """
+    Restrict ``queryset`` to the ids in ``ranked`` (``[(id, score), ...]``)
+    and annotate each row's score as ``search_rank``.
+    """
+    if not ranked:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    # Scores take only a handful of distinct values, so grouping ids by
+    # score keeps the CASE expression to a few branches
+    ids_by_score = defaultdict(list)
+    for word_id, score in ranked:
+        ids_by_score[round(score, 4)].append(word_id)
+
+    return queryset.filter(id__in=[word_id for word_id, _ in ranked]).annotate(
+        search_rank=Case(
+            *[When(id__in=ids, then=Value(score)) for score, ids in ids_by_score.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+inverted_index = InvertedIndexBackend()
+postgres_backend = PostgresSearchBackend()
+
+
+def get_backend():
+    """Pick the search backend for the active database."""
+    if connection.vendor == 'postgresql':
+        return postgres_backend
+    return inverted_index
+
+
+def parse_query(query):
+    """Turn a raw ``q`` value into de-duplicated search terms."""
+    terms = []
+    for term in tokenize(query):
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def search_vocabulary(queryset, query):
+    """
+    Filter ``queryset`` to words matching ``query`` and annotate each with
+    ``search_rank``. The caller is responsible for ordering.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return queryset
+    return get_backend().search(queryset, terms)
+
+
+def highlight(text, terms):
+    """Wrap words starting with any of ``terms`` in ``<mark>`` tags."""
+    if not text or not terms:
+        return escape(text or '')
+
+    pattern = re.compile(
+        r'(?<!\w)(?:%s)\w*' % '|'.join(re.escape(term) for term in terms),
+        re.IGNORECASE,
+    )
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        parts.append(escape(text[last:match.start()]))
+        parts.append(f'<mark>{escape(match.group(0))}</mark>')
+        last = match.end()
+    parts.append(escape(text[last:]))
+    return ''.join(parts)
+
+
+def highlight_results(results, query):
+    """Attach a ``highlight`` dict to each serialized word."""
+    terms = parse_query(query)
+    fields = [field for field, _, _ in FIELD_WEIGHTS]
+    for item in results:
+        item['highlight'] = {
+            field: highlight(item.get(field), terms)
+            for field in fields
+            if item.get(field)
+        }
+    return results
+
+
+def invalidate():
+    """Mark every process's inverted index as stale."""
+    generation.invalidate(GENERATION_CACHE_KEY)
@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from .models import Center, Grammar, VideoLesson, TurkmenEnglishWord, Category
+from .models import Center, Grammar, VideoLesson, TurkmenEnglishWord, Category, ReviewCard
 from apps.users.serializers import UserSerializer
 from apps.users.enums import LessonStatus
+from .enums import ProgressEventType
+from .progress import CONTENT_MODELS
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -38,4 +40,27 @@ class TurkmenEnglishWordSerializer(serializers.ModelSerializer):
     class Meta:
         model = TurkmenEnglishWord
         fields = "__all__"
-        
\ No newline at end of file
+        
+
+class ProgressEventSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=list(CONTENT_MODELS))
+    object_id = serializers.IntegerField(min_value=1)
+    event = serializers.ChoiceField(choices=ProgressEventType.choices)
+    score = serializers.IntegerField(min_value=0, max_value=5, required=False, allow_null=True)
+
+
+class ReviewCardSerializer(serializers.ModelSerializer):
+    word = TurkmenEnglishWordSerializer(read_only=True)
+    is_new = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReviewCard
+        fields = ['word', 'is_new', 'ease', 'interval', 'repetitions', 'lapses', 'due_at', 'last_reviewed_at']
+
+    def get_is_new(self, obj):
+        return obj.pk is None
+
+
+class ReviewAnswerSerializer(serializers.Serializer):
+    word_id = serializers.IntegerField(min_value=1)
+    quality = serializers.IntegerField(min_value=0, max_value=5)
@@ -0,0 +1,68 @@
+"""
+Signal handlers that keep derived content data in sync with writes.
+"""
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Category, Grammar, TurkmenEnglishWord, VideoLesson
+from . import prefix_index, search, stats
+
+
+@receiver(post_save, sender=TurkmenEnglishWord)
+@receiver(post_delete, sender=TurkmenEnglishWord)
+def invalidate_vocabulary_indexes(sender, instance, **kwargs):
+    """Force the autocomplete and search indexes to rebuild after any word change."""
+    prefix_index.invalidate()
+    search.invalidate()
+
+
+@receiver(pre_save, sender=Grammar)
+@receiver(pre_save, sender=VideoLesson)
+@receiver(pre_save, sender=TurkmenEnglishWord)
+def remember_content_stat_values(sender, instance, raw=False, **kwargs):
+    """Capture the stored status/level/category before the row changes."""
+    if raw:
+        return
+    instance._content_stat_previous = stats.stored_snapshot(instance)
+
+
+@receiver(post_save, sender=Grammar)
+@receiver(post_save, sender=VideoLesson)
+@receiver(post_save, sender=TurkmenEnglishWord)
+def update_content_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move the row's counters from its previous values to the new ones."""
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_content_stat_previous', None)
+    current = stats.snapshot(instance)
+    stats.apply_deltas(sender, stats.row_changed(sender, previous, current))
+    stats.apply_author_deltas(sender, stats.author_row_changed(previous, current))
+
+
+@receiver(post_delete, sender=Grammar)
+@receiver(post_delete, sender=VideoLesson)
+@receiver(post_delete, sender=TurkmenEnglishWord)
+def update_content_stats_on_delete(sender, instance, **kwargs):
+    """Remove the deleted row from its counters."""
+    previous = stats.snapshot(instance)
+    stats.apply_deltas(sender, stats.row_changed(sender, previous, None))
+    stats.apply_author_deltas(sender, stats.author_row_changed(previous, None))
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_name(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._content_stat_previous_name = (
+        Category.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Category)
+def rename_category_stats(sender, instance, created, raw=False, **kwargs):
+    """Re-key grammar category counters when a category is renamed."""
+    previous_name = getattr(instance, '_content_stat_previous_name', None)
+    if raw or created or previous_name is None or previous_name == instance.name:
+        return
+    stats.recount_category(previous_name)
+    stats.recount_category(instance.name)
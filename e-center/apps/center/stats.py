@@ -0,0 +1,258 @@
+"""
+Materialized content statistics.
+
+Every tracked content model contributes counter rows to ``ContentStat``:
+one ``total`` row plus one row per status and per category (grammar) or
+level (videos, vocabulary). Signal handlers in ``apps.center.signals`` apply
++1/-1 deltas as rows are created, edited and deleted, so the ``stats``
+endpoints read a single indexed slice instead of running three aggregates.
+
+The same deltas also feed ``AuthorContentStat``, keyed by (author, content
+type, status), which backs the teacher dashboard.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorContentStat, Category, ContentStat, Grammar, TurkmenEnglishWord, VideoLesson
+
+TOTAL = 'total'
+
+AUTHOR_FIELD = 'created_by_id'
+
+# model -> (stats key, {dimension: source field})
+TRACKED_MODELS = {
+    Grammar: ('grammar', {'status': 'status', 'category': 'category_id'}),
+    VideoLesson: ('video', {'status': 'status', 'level': 'level'}),
+    TurkmenEnglishWord: ('vocabulary', {'status': 'status', 'level': 'level'}),
+}
+
+# Dimensions whose source field is a foreign key, resolved to a display value
+RESOLVERS = {
+    'category': lambda pk: Category.objects.filter(pk=pk).values_list('name', flat=True).first(),
+}
+
+# Dimensions aggregated through a relation when rebuilding
+AGGREGATE_FIELDS = {
+    'category': 'category__name',
+}
+
+
+def tracked_fields(model):
+    return list(TRACKED_MODELS[model][1].values()) + [AUTHOR_FIELD]
+
+
+def snapshot(instance):
+    """Current values of the tracked fields on an instance."""
+    return {field: getattr(instance, field) for field in tracked_fields(type(instance))}
+
+
+def stored_snapshot(instance):
+    """Tracked field values as currently stored, or None for new rows."""
+    if instance.pk is None or instance._state.adding:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values(*tracked_fields(type(instance))).first()
+
+
+def _keys(model, values):
+    """Counter keys ``(dimension, value)`` contributed by one row."""
+    _, dimensions = TRACKED_MODELS[model]
+    keys = [(TOTAL, '')]
+    for dimension, field in dimensions.items():
+        value = values[field]
+        resolver = RESOLVERS.get(dimension)
+        if resolver is not None and value is not None:
+            value = resolver(value)
+        keys.append((dimension, value or ''))
+    return keys
+
+
+def _author_key(values):
+    if values is None or values[AUTHOR_FIELD] is None:
+        return None
+    return (values[AUTHOR_FIELD], values['status'])
+
+
+def row_changed(model, old_values, new_values):
+    """Counter deltas for a row moving from ``old_values`` to ``new_values``."""
+    deltas = Counter()
+    _, dimensions = TRACKED_MODELS[model]
+    fields = dimensions.values()
+    if old_values is not None and new_values is not None and all(
+        old_values[field] == new_values[field] for field in fields
+    ):
+        return deltas
+    if new_values is not None:
+        deltas.update(_keys(model, new_values))
+    if old_values is not None:
+        deltas.subtract(_keys(model, old_values))
+    return deltas
+
+
+def author_row_changed(old_values, new_values):
+    """Per-author deltas ``{(user_id, status): delta}`` for one row change."""
+    deltas = Counter()
+    old_key, new_key = _author_key(old_values), _author_key(new_values)
+    if old_key == new_key:
+        return deltas
+    if new_key is not None:
+        deltas[new_key] += 1
+    if old_key is not None:
+        deltas[old_key] -= 1
+    return deltas
+
+
+def apply_deltas(model, deltas):
+    """Add ``deltas`` to the counter rows of ``model`` with F() updates."""
+    stats_key = TRACKED_MODELS[model][0]
+    with transaction.atomic():
+        for (dimension, value), delta in deltas.items():
+            if not delta:
+                continue
+            rows = ContentStat.objects.filter(model=stats_key, dimension=dimension, value=value)
+            if not rows.update(count=F('count') + delta) and delta > 0:
+                ContentStat.objects.get_or_create(model=stats_key, dimension=dimension, value=value)
+                rows.update(count=F('count') + delta)
+
+
+def apply_author_deltas(model, deltas):
+    """Add per-author ``deltas`` to ``AuthorContentStat`` with F() updates."""
+    content_type = TRACKED_MODELS[model][0]
+    with transaction.atomic():
+        for (user_id, status), delta in deltas.items():
+            if not delta:
+                continue
+            rows = AuthorContentStat.objects.filter(user_id=user_id, content_type=content_type, status=status)
+            # A missing row on a decrement means the author is being deleted
+            # along with their counters; never recreate it
+            if not rows.update(count=F('count') + delta) and delta > 0:
+                AuthorContentStat.objects.get_or_create(user_id=user_id, content_type=content_type, status=status)
+                rows.update(count=F('count') + delta)
+
+
+def recount_category(name):
+    """Recompute the grammar counter for one category name after a rename."""
+    ContentStat.objects.update_or_create(
+        model=TRACKED_MODELS[Grammar][0],
+        dimension='category',
+        value=name,
+        defaults={'count': Grammar.objects.filter(category__name=name).count()},
+    )
+
+
+def read_stats(model):
+    """
+    Return ``{'total': n, '<dimension>': {value: count}}`` for ``model`` in a
+    single query. Zero counters are left out, like an empty GROUP BY bucket.
+    """
+    stats = defaultdict(dict)
+    stats[TOTAL] = 0
+    rows = ContentStat.objects.filter(
+        model=TRACKED_MODELS[model][0]
+    ).order_by('dimension', 'value').values_list('dimension', 'value', 'count')
+    for dimension, value, count in rows:
+        if dimension == TOTAL:
+            stats[TOTAL] = count
+        elif count:
+            stats[dimension][value] = count
+    return stats
+
+
+def read_totals():
+    """Return ``{stats key: total rows}`` for every tracked model in one query."""
+    totals = {stats_key: 0 for stats_key, _ in TRACKED_MODELS.values()}
+    totals.update(ContentStat.objects.filter(dimension=TOTAL).values_list('model', 'count'))
+    return totals
+
+
+def compute_stats(model):
+    """Recompute the counter rows for ``model`` from the source table."""
+    stats_key, dimensions = TRACKED_MODELS[model]
+    queryset = model.objects.all()
+    counts = Counter({(TOTAL, ''): queryset.count()})
+    for dimension, field in dimensions.items():
+        group_field = AGGREGATE_FIELDS.get(dimension, field)
+        for item in queryset.values(group_field).annotate(count=Count('id')).order_by():
+            counts[(dimension, item[group_field] or '')] += item['count']
+    return [
+        ContentStat(model=stats_key, dimension=dimension, value=value, count=count)
+        for (dimension, value), count in counts.items()
+    ]
+
+
+def rebuild_content_stats(models=None):
+    """
+    Replace the counter rows of ``models`` (default: all tracked models) with
+    freshly aggregated ones. Returns ``{stats key: [(dimension, value, old, new)]}``
+    listing every counter that had drifted.
+    """
+    drift = {}
+    for model in models or TRACKED_MODELS:
+        stats_key = TRACKED_MODELS[model][0]
+        with transaction.atomic():
+            existing = {
+                (row.dimension, row.value): row.count
+                for row in ContentStat.objects.select_for_update().filter(model=stats_key)
+            }
+            fresh = compute_stats(model)
+            fresh_counts = {(row.dimension, row.value): row.count for row in fresh}
+
+            drift[stats_key] = [
+                (dimension, value, existing.get((dimension, value), 0), fresh_counts.get((dimension, value), 0))
+                for dimension, value in sorted(set(existing) | set(fresh_counts))
+                if existing.get((dimension, value), 0) != fresh_counts.get((dimension, value), 0)
+            ]
+
+            ContentStat.objects.filter(model=stats_key).delete()
+            ContentStat.objects.bulk_create(fresh)
+    return drift
+
+
+def read_author_stats(user):
+    """Return ``{content type: {status: count}}`` for one author in one query."""
+    stats = defaultdict(dict)
+    rows = AuthorContentStat.objects.filter(user=user).values_list('content_type', 'status', 'count')
+    for content_type, status, count in rows:
+        stats[content_type][status] = count
+    return stats
+
+
+def compute_author_stats(model):
+    """Recompute the per-author counter rows for ``model`` from the source table."""
+    content_type = TRACKED_MODELS[model][0]
+    rows = model.objects.filter(created_by__isnull=False).values(
+        AUTHOR_FIELD, 'status'
+    ).annotate(count=Count('id')).order_by()
+    return [
+        AuthorContentStat(user_id=row[AUTHOR_FIELD], content_type=content_type, status=row['status'], count=row['count'])
+        for row in rows
+    ]
+
+
+def rebuild_author_stats(models=None):
+    """
+    Replace the per-author counters of ``models`` (default: all tracked
+    models). Returns ``{content type: [(user_id, status, old, new)]}`` listing
+    every counter that had drifted.
+    """
+    drift = {}
+    for model in models or TRACKED_MODELS:
+        content_type = TRACKED_MODELS[model][0]
+        with transaction.atomic():
+            existing = {
+                (row.user_id, row.status): row.count
+                for row in AuthorContentStat.objects.select_for_update().filter(content_type=content_type)
+            }
+            fresh = compute_author_stats(model)
+            fresh_counts = {(row.user_id, row.status): row.count for row in fresh}
+
+            drift[content_type] = [
+                (user_id, status, existing.get((user_id, status), 0), fresh_counts.get((user_id, status), 0))
+                for user_id, status in sorted(set(existing) | set(fresh_counts))
+                if existing.get((user_id, status), 0) != fresh_counts.get((user_id, status), 0)
+            ]
+
+            AuthorContentStat.objects.filter(content_type=content_type).delete()
+            AuthorContentStat.objects.bulk_create(fresh)
+    return drift
@@ -1,3 +1,523 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.users.models import User
+from .models import Category, ContentStat, Grammar, ReviewCard, TurkmenEnglishWord, VideoLesson
+from .progress import progress_buffer
+from .review import grade, review_queue, schedule
+from .view_counts import PENDING_KEY, flush_views, pending_views
+from . import search
+from .prefix_index import fold
+from .fuzzy import trigram_index
+from .search import MAX_RESULTS
+from .stats import rebuild_content_stats
+
+
+class VocabularyAutocompleteTests(TestCase):
+    """
+    Test case for the in-memory vocabulary prefix index.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/v1/center/vocabulary/autocomplete/'
+        self.user = User.objects.create_user(
+            username='teacher',
+            email='teacher@example.com',
+            password='testpassword123'
+        )
+        TurkmenEnglishWord.objects.create(turkmen_word='Şäher', english_word='City', created_by=self.user)
+        TurkmenEnglishWord.objects.create(turkmen_word='Ýol', english_word='Road', created_by=self.user)
+        TurkmenEnglishWord.objects.create(
+            turkmen_word='Şol', english_word='That', created_by=self.user, status='draft'
+        )
+
+    def test_fold_handles_turkmen_letters(self):
+        """Test Turkmen capitals and decomposed characters fold to one key"""
+        self.assertEqual(fold('ŞÄHER'), 'şäher')
+        self.assertEqual(fold('ÝŇÖÜŽÇ'), 'ýňöüžç')
+        self.assertEqual(fold('S\u0327a'), 'şa')
+
+    def test_autocomplete_matches_both_languages(self):
+        """Test that prefixes match Turkmen and English headwords"""
+        response = self.client.get(self.url, {'prefix': 'şä'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['english_word'] for r in response.data['results']], ['City'])
+
+        response = self.client.get(self.url, {'prefix': 'RO'})
+        self.assertEqual([r['turkmen_word'] for r in response.data['results']], ['Ýol'])
+
+    def test_autocomplete_skips_unpublished_and_tracks_writes(self):
+        """Test drafts are excluded and new words appear after save"""
+        response = self.client.get(self.url, {'prefix': 'şo'})
+        self.assertEqual(response.data['results'], [])
+
+        TurkmenEnglishWord.objects.filter(turkmen_word='Şol').first().delete()
+        TurkmenEnglishWord.objects.create(turkmen_word='Şöhle', english_word='Ray', created_by=self.user)
+        response = self.client.get(self.url, {'prefix': 'ŞÖ'})
+        self.assertEqual([r['english_word'] for r in response.data['results']], ['Ray'])
+
+
+class VocabularySearchTests(TestCase):
+    """
+    Test case for ranked vocabulary search.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/v1/center/vocabulary/search_advanced/'
+        TurkmenEnglishWord.objects.create(
+            turkmen_word='Kitaphana', english_word='Library', example_sentence='A book lover visits the library.'
+        )
+        TurkmenEnglishWord.objects.create(
+            turkmen_word='Okamak', english_word='Read', definition='To look at a book and understand it.'
+        )
+        TurkmenEnglishWord.objects.create(turkmen_word='Kitap', english_word='Book')
+
+    def test_results_are_ranked_by_field_weight(self):
+        """Test headword matches outrank definition and example matches"""
+        response = self.client.get(self.url, {'q': 'book'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['english_word'] for r in response.data['results']],
+            ['Book', 'Read', 'Library']
+        )
+
+    def test_results_include_highlighting(self):
+        """Test matched words are wrapped in mark tags"""
+        response = self.client.get(self.url, {'q': 'kitap'})
+        highlights = {r['english_word']: r['highlight'] for r in response.data['results']}
+        self.assertEqual(highlights['Book']['turkmen_word'], '<mark>Kitap</mark>')
+        self.assertEqual(highlights['Library']['turkmen_word'], '<mark>Kitaphana</mark>')
+
+    def test_cleared_cache_rebuilds_the_index(self):
+        """Test a lost generation token makes every index rebuild"""
+        cache.clear()
+        search.inverted_index.ensure_fresh()
+        trigram_index.ensure_fresh()
+        # bulk_create sends no signals, so only the cleared cache marks the indexes stale
+        TurkmenEnglishWord.objects.bulk_create([TurkmenEnglishWord(turkmen_word='Sahypa', english_word='Page')])
+        cache.clear()
+        response = self.client.get(self.url, {'q': 'page'})
+        self.assertEqual([r['turkmen_word'] for r in response.data['results']], ['Sahypa'])
+        response = self.client.get('/api/v1/center/vocabulary/', {'q': 'sahypa', 'fuzzy': '1'})
+        self.assertEqual([r['english_word'] for r in response.data['results']], ['Page'])
+
+
+class VocabularyFuzzySearchTests(TestCase):
+    """
+    Test case for typo-tolerant vocabulary search.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/v1/center/vocabulary/'
+        TurkmenEnglishWord.objects.create(turkmen_word='Almak', english_word='Receive')
+        TurkmenEnglishWord.objects.create(turkmen_word='Şäher', english_word='City')
+        TurkmenEnglishWord.objects.create(turkmen_word='Gül', english_word='Flower')
+
+    def test_misspelled_english_word(self):
+        """Test that a common misspelling finds the intended word"""
+        response = self.client.get(self.url, {'q': 'recieve', 'fuzzy': '1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['turkmen_word'] for r in response.data['results']], ['Almak'])
+
+    def test_turkmen_word_typed_without_diacritics(self):
+        """Test that 'shaher' matches 'Şäher'"""
+        response = self.client.get(self.url, {'q': 'shaher', 'fuzzy': '1'})
+        self.assertEqual([r['english_word'] for r in response.data['results']], ['City'])
+
+    def test_unrelated_query_returns_nothing(self):
+        """Test that distant strings are pruned"""
+        response = self.client.get(self.url, {'q': 'mountain', 'fuzzy': '1'})
+        self.assertEqual(response.data['results'], [])
+
+
+class VocabularySearchCapTests(TestCase):
+    """
+    Test case for the result caps of the Python search backends.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        TurkmenEnglishWord.objects.bulk_create([
+            TurkmenEnglishWord(turkmen_word='kitap', english_word=f'book {i}', level='beginner')
+            for i in range(MAX_RESULTS + 10)
+        ])
+        # Ties rank by id, so this word comes after the cap
+        TurkmenEnglishWord.objects.create(turkmen_word='kitap', english_word='book last', level='advanced')
+
+    def test_cap_applies_after_filters(self):
+        """Test a filtered search finds matches ranked below the cap"""
+        response = self.client.get('/api/v1/center/vocabulary/', {'q': 'book', 'level': 'advanced'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['english_word'], 'book last')
+
+        response = self.client.get('/api/v1/center/vocabulary/', {'q': 'kitap', 'fuzzy': '1', 'level': 'advanced'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_unmatched_query_keeps_default_ordering(self):
+        """Test a query without search terms lists words instead of failing"""
+        response = self.client.get('/api/v1/center/vocabulary/', {'q': '!!', 'level': 'advanced'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+
+class VocabularyRandomTests(TestCase):
+    """
+    Test case for random practice decks.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/v1/center/vocabulary/random/'
+        for i in range(30):
+            TurkmenEnglishWord.objects.create(
+                turkmen_word=f'Söz{i}', english_word=f'Word{i}',
+                level='beginner' if i % 2 else 'advanced'
+            )
+
+    def test_seed_makes_deck_reproducible(self):
+        """Test that the same seed returns the same words in the same order"""
+        first = self.client.get(self.url, {'count': 5, 'seed': 'deck-1'})
+        second = self.client.get(self.url, {'count': 5, 'seed': 'deck-1'})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first.data), 5)
+        self.assertEqual([w['id'] for w in first.data], [w['id'] for w in second.data])
+
+    def test_level_filter(self):
+        """Test that decks respect the level filter"""
+        response = self.client.get(self.url, {'count': 50, 'level': 'beginner'})
+        self.assertEqual(len(response.data), 15)
+        self.assertTrue(all(w['level'] == 'beginner' for w in response.data))
+
+    def test_count_must_be_a_non_negative_integer(self):
+        """Test that a bad count is a client error rather than a crash"""
+        for count in ('-1', 'ten', '2.5'):
+            response = self.client.get(self.url, {'count': count})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_narrowed_deck_reads_a_bounded_window(self):
+        """Test that a filtered deck samples at most MAX_CANDIDATES matches"""
+        with patch('apps.center.sampling.MAX_CANDIDATES', 4):
+            first = self.client.get(self.url, {'count': 10, 'starts_with': 'söz', 'seed': 'deck-2'})
+            second = self.client.get(self.url, {'count': 10, 'starts_with': 'söz', 'seed': 'deck-2'})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first.data), 4)
+        self.assertEqual([w['id'] for w in first.data], [w['id'] for w in second.data])
+
+        response = self.client.get(self.url, {'count': 50, 'starts_with': 'söz', 'level': 'beginner'})
+        self.assertEqual(len(response.data), 15)
+        self.assertTrue(all(w['level'] == 'beginner' for w in response.data))
+
+
+class ContentStatsTests(TestCase):
+    """
+    Test case for the materialized content statistics.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='testpassword123'
+        )
+        self.tenses = Category.objects.create(name='Tenses')
+        self.articles = Category.objects.create(name='Articles')
+        self.lesson = Grammar.objects.create(
+            created_by=self.user, category=self.tenses, title='Present Simple', content='...'
+        )
+        Grammar.objects.create(
+            created_by=self.user, category=self.articles, title='A and The', content='...', status='published'
+        )
+
+    def test_counters_follow_status_and_category_changes(self):
+        """Test that edits move counts between buckets"""
+        self.lesson.status = 'published'
+        self.lesson.category = self.articles
+        self.lesson.save()
+
+        response = self.client.get('/api/v1/center/grammar/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['by_status'], {'published': 2})
+        self.assertEqual(response.data['by_category'], {'articles': 2})
+
+    def test_counters_follow_deletes_and_renames(self):
+        """Test that deletes and category renames are reflected"""
+        self.tenses.name = 'Verb Tenses'
+        self.tenses.save()
+        Grammar.objects.filter(category=self.articles).delete()
+
+        response = self.client.get('/api/v1/center/grammar/stats/')
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(response.data['by_category'], {'verb tenses': 1})
+        self.assertEqual(response.data['by_status'], {'draft': 1})
+
+    def test_stats_are_a_single_query(self):
+        """Test that reading stats costs one query"""
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/center/videos/stats/')
+
+    def test_rebuild_reports_and_fixes_drift(self):
+        """Test that rebuilding reconciles counters changed behind our back"""
+        ContentStat.objects.filter(model='grammar', dimension='total').update(count=99)
+        drift = rebuild_content_stats([Grammar])
+        self.assertEqual(drift['grammar'], [('total', '', 99, 2)])
+        self.assertEqual(ContentStat.objects.get(model='grammar', dimension='total').count, 2)
+
+
+@override_settings(PROGRESS_FLUSH_INTERVAL=0)
+class VocabularyReviewTests(TestCase):
+    """
+    Test case for the spaced-repetition review queue.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='learner', email='learner@example.com', password='testpassword123', role='student'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.words = [
+            TurkmenEnglishWord.objects.create(turkmen_word=f'Söz {i}', english_word=f'Word {i}', status='published')
+            for i in range(5)
+        ]
+
+    def tearDown(self):
+        progress_buffer.flush()
+
+    def test_schedule_follows_sm2(self):
+        """Test intervals grow 1, 6, then by ease, and a lapse resets them"""
+        card = ReviewCard(ease=2.5, due_at=timezone.now())
+        now = timezone.now()
+        self.assertEqual([schedule(card, 5, now).interval for _ in range(3)], [1, 6, 16])
+        self.assertAlmostEqual(card.ease, 2.8)
+
+        schedule(card, 1, now)
+        self.assertEqual((card.interval, card.repetitions, card.lapses), (1, 0, 1))
+        self.assertEqual(card.due_at, now + timedelta(days=1))
+
+    def test_grading_a_new_word_another_request_created(self):
+        """Test a card inserted concurrently for an unseen word is graded, not duplicated"""
+        word = self.words[0]
+        # The other request's blank card, committed before this grade inserts its own
+        ReviewCard.objects.create(user=self.user, word=word, due_at=timezone.now())
+        cards = grade(self.user, [(word.id, 5)])
+        self.assertEqual([(card.word_id, card.repetitions) for card in cards], [(word.id, 1)])
+        self.assertEqual(ReviewCard.objects.filter(user=self.user, word=word).count(), 1)
+
+    def test_batch_grading_and_queue(self):
+        """Test graded words leave the queue until due and new words fill it"""
+        response = self.client.get('/api/v1/center/vocabulary/review-queue/', {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(card['is_new'] for card in response.data))
+        self.assertEqual(len(response.data), 3)
+
+        answers = [{'word_id': word.id, 'quality': 4} for word in self.words[:3]]
+        response = self.client.post('/api/v1/center/vocabulary/review/', answers, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ReviewCard.objects.filter(user=self.user).count(), 3)
+
+        response = self.client.get('/api/v1/center/vocabulary/review-queue/', {'limit': 5})
+        self.assertEqual([card['word']['id'] for card in response.data], [w.id for w in self.words[3:]])
+
+        ReviewCard.objects.filter(word=self.words[0]).update(due_at=timezone.now() - timedelta(days=1))
+        response = self.client.get('/api/v1/center/vocabulary/review-queue/', {'limit': 5, 'new': 0})
+        self.assertEqual([card['word']['id'] for card in response.data], [self.words[0].id])
+        self.assertFalse(response.data[0]['is_new'])
+
+    def test_queue_reads_due_cards_in_one_query(self):
+        """Test the due queue is a single index range scan with its words"""
+        for word in self.words:
+            ReviewCard.objects.create(user=self.user, word=word, due_at=timezone.now() - timedelta(hours=1))
+        with self.assertNumQueries(1):
+            due, new_words = review_queue(self.user, 5)
+        self.assertEqual((len(due), new_words), (5, []))
+
+    def test_new_words_are_read_above_the_highest_card(self):
+        """Test new words come from above the learner's cards without an anti-join"""
+        grade(self.user, [(self.words[0].id, 4), (self.words[1].id, 4)])
+        ReviewCard.objects.filter(user=self.user).update(due_at=timezone.now() + timedelta(days=1))
+        with CaptureQueriesContext(connection) as queries:
+            due, new_words = review_queue(self.user, 2)
+        self.assertEqual(new_words, self.words[2:4])
+        self.assertNotIn('review_card', queries[-1]['sql'])
+
+    def test_words_skipped_below_the_highest_card_are_still_new(self):
+        """Test words passed over by an out-of-order grade still reach the queue"""
+        grade(self.user, [(self.words[3].id, 4)])
+        ReviewCard.objects.filter(user=self.user).update(due_at=timezone.now() + timedelta(days=1))
+        due, new_words = review_queue(self.user, 5)
+        self.assertEqual(new_words, self.words[:3] + self.words[4:])
+
+    def test_review_requires_authentication(self):
+        """Test anonymous users cannot read a review queue"""
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/v1/center/vocabulary/review-queue/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(VIDEO_VIEW_FLUSH_INTERVAL=0)
+class VideoViewCountTests(TestCase):
+    """
+    Test case for cache-batched video view counting.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='testpassword123', role='teacher'
+        )
+        self.video = VideoLesson.objects.create(
+            created_by=teacher, title='Greetings', description='...', video_url='videos/lessons/g.mp4',
+            level='beginner', duration=60, status='published'
+        )
+        self.url = f'/api/v1/center/videos/{self.video.id}/'
+
+    def test_views_are_deduplicated_and_flushed(self):
+        """Test repeat views are ignored and a flush applies the rest"""
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.1')
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.1')
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.2')
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.views_count, 0)
+        self.assertEqual(pending_views(), {self.video.id: 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_views(), 2)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.views_count, 2)
+        self.assertEqual(pending_views(), {})
+
+        # The next view logs the video again
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(pending_views(), {self.video.id: 1})
+
+    def test_failed_update_keeps_views(self):
+        """Test views stay pending when applying them fails"""
+        self.client.get(self.url)
+        with patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError('down')):
+            with self.assertRaises(DatabaseError):
+                flush_views()
+        self.assertEqual(pending_views(), {self.video.id: 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_views(), 1)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.views_count, 1)
+
+    def test_flush_reads_only_pending_videos(self):
+        """Test the request-path flush does not scan every video id"""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            flush_views()
+        self.assertEqual([q['sql'].split()[0] for q in queries if 'video_lesson' in q['sql']], ['UPDATE'])
+
+    def test_flushes_do_not_overlap(self):
+        """Test the command skips while a request-path flush is applying the same views"""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(flush_views(), 1)
+            out = StringIO()
+            call_command('flush_video_views', stdout=out)
+            self.assertIn('Another flush', out.getvalue())
+        self.assertEqual(len(callbacks), 1)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.views_count, 1)
+        self.assertEqual(pending_views([self.video.id]), {})
+
+        call_command('flush_video_views', stdout=StringIO())
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.views_count, 1)
+
+    def test_evicted_counter_does_not_break_the_flush(self):
+        """Test a counter evicted before the decrement is skipped"""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            flush_views()
+        cache.delete(PENDING_KEY.format(self.video.id))
+        callbacks[0]()
+        self.assertEqual(pending_views([self.video.id]), {})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_views(), 0)
+
+    def test_view_costs_no_writes(self):
+        """Test counting a view issues no database writes"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([q for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+
+
+class CompactListTests(TestCase):
+    """
+    Test case for the values-based fast path of the content list endpoints.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='testpassword123', role='teacher'
+        )
+        tenses = Category.objects.create(name='Tenses')
+        Grammar.objects.create(
+            created_by=teacher, category=tenses, title='Present perfect', content='Have + past participle',
+            status='published', cover_image='grammar/covers/şekil 1.png', order=2
+        )
+        Grammar.objects.create(
+            created_by=teacher, category=Category.objects.create(name='Articles'), title='A or the',
+            content='...', examples=None, is_deleted=True, deleted_at=timezone.now()
+        )
+        VideoLesson.objects.create(
+            created_by=teacher, title='Greetings', description='...', video_url='videos/lessons/g 1.mp4',
+            thumbnail='videos/thumbnails/g.jpg', level='beginner', duration=60, status='published'
+        )
+        VideoLesson.objects.create(
+            created_by=teacher, title='Small talk', description='...', video_url='videos/lessons/t.mp4',
+            level='intermediate', duration=95
+        )
+        TurkmenEnglishWord.objects.create(
+            turkmen_word='kitap', english_word='book', level='beginner', audio_file='vocabulary/audio/kitap.mp3'
+        )
+        TurkmenEnglishWord.objects.create(turkmen_word='öý', english_word='house', level='beginner', created_by=teacher)
+
+    def assertSameAsSerializer(self, url, params=None):
+        """The compact response matches the DRF serializer's byte for byte."""
+        response = self.client.get(url, params)
+        with patch('apps.center.compact.compact_serializer', return_value=None):
+            expected = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        return response.json()
+
+    def test_grammar_list_matches_serializer(self):
+        """Test grammar pages, with the nested category and cover URLs, are unchanged"""
+        data = self.assertSameAsSerializer('/api/v1/center/grammar/')
+        self.assertEqual(data['results'][1]['category']['name'], 'Tenses')
+        self.assertTrue(data['results'][1]['cover_image'].startswith('http://testserver/media/'))
+        self.assertSameAsSerializer('/api/v1/center/grammar/', {'search': 'perfect', 'ordering': 'order'})
+
+    def test_video_list_matches_serializer(self):
+        """Test video pages, with and without thumbnails, are unchanged"""
+        self.assertSameAsSerializer('/api/v1/center/videos/')
+        self.assertSameAsSerializer('/api/v1/center/videos/', {'level': 'beginner'})
+        with self.settings(TIME_ZONE='Asia/Ashgabat'):
+            data = self.assertSameAsSerializer('/api/v1/center/videos/')
+        self.assertTrue(data['results'][0]['created_at'].endswith('+05:00'))
+
+    def test_vocabulary_list_matches_serializer(self):
+        """Test vocabulary pages, including ranked search, are unchanged"""
+        self.assertSameAsSerializer('/api/v1/center/vocabulary/')
+        self.assertSameAsSerializer('/api/v1/center/vocabulary/', {'q': 'book'})
+        self.assertSameAsSerializer('/api/v1/center/vocabulary/', {'starts_with': 'ö'})
+
+    def test_list_skips_model_instances(self):
+        """Test the fast path reads only the serialized columns in one page query"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/center/grammar/')
+        selects = [q['sql'] for q in queries if 'FROM "grammar"' in q['sql']]
+        self.assertEqual(len(selects), 2)  # COUNT and the page
+        self.assertNotIn('"users"', selects[1])
@@ -10,6 +10,7 @@ router.register(r'categories', views.CategoryViewSet)
 router.register(r'grammar', views.GrammarViewSet)
 router.register(r'videos', views.VideoLessonViewSet)
 router.register(r'vocabulary', views.TurkmenEnglishWordViewSet, basename='vocabulary')
+router.register(r'progress', views.ProgressEventViewSet, basename='progress')
 
 urlpatterns = [
     # ViewSet URLs
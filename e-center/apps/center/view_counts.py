@@ -0,0 +1,156 @@
+"""
+Batched view counting for video lessons.
+
+Opening a lesson only touches the cache: a dedup key per (video, viewer)
+makes repeat views inside ``VIDEO_VIEW_DEDUP_WINDOW`` free, and counted
+views go to a per-video cache counter. ``flush_views`` moves the pending
+counts into ``VideoLesson.views_count`` with one ``F()`` update per
+distinct delta. It runs at most every ``VIDEO_VIEW_FLUSH_INTERVAL`` seconds
+from the request path and can also be driven by ``flush_video_views``.
+
+The first pending view of a video since the last flush appends its id to a
+log in the cache (an ``incr``-numbered sequence of keys), so the request
+path only looks at videos that actually have pending views. Counters are
+decremented only after the ``views_count`` update commits: a failed
+update keeps the views for the next flush. One flush runs at a time
+(``FLUSH_RUNNING_KEY``, request path and command alike), so two flushes
+never apply the same pending views.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from apps.core.utils import get_client_ip
+
+from .models import VideoLesson
+
+PENDING_KEY = 'center:video_views:pending:{}'
+SEEN_KEY = 'center:video_views:seen:{}:{}'
+FLUSH_LOCK_KEY = 'center:video_views:flush_lock'  # rate-limits request-path flushes
+FLUSH_RUNNING_KEY = 'center:video_views:flush_running'
+FLUSH_RUNNING_TIMEOUT = 60  # seconds; released once the counters are decremented
+DIRTY_KEY = 'center:video_views:dirty:{}'
+LOG_KEY = 'center:video_views:log:{}'
+LOG_SEQ_KEY = 'center:video_views:log_seq'
+LOG_DONE_KEY = 'center:video_views:log_done'
+
+DEFAULT_DEDUP_WINDOW = 30 * 60  # seconds
+DEFAULT_FLUSH_INTERVAL = 60  # seconds
+
+
+def viewer_key(request):
+    """Identify the viewer by user id, falling back to the client IP."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{get_client_ip(request)}'
+
+
+def record_view(video_id, viewer):
+    """
+    Count one view of ``video_id`` by ``viewer`` unless they already viewed
+    it within the dedup window. Returns whether the view was counted.
+    """
+    window = getattr(settings, 'VIDEO_VIEW_DEDUP_WINDOW', DEFAULT_DEDUP_WINDOW)
+    if not cache.add(SEEN_KEY.format(video_id, viewer), 1, window):
+        return False
+
+    key = PENDING_KEY.format(video_id)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Flushed and deleted between add() and incr()
+            cache.add(key, 1, None)
+    mark_pending(video_id)
+
+    interval = getattr(settings, 'VIDEO_VIEW_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    if interval and cache.add(FLUSH_LOCK_KEY, 1, interval):
+        flush_views()
+    return True
+
+
+def mark_pending(video_id):
+    """Log ``video_id`` as having pending views, once until its next flush."""
+    if not cache.add(DIRTY_KEY.format(video_id), 1, None):
+        return
+    cache.add(LOG_SEQ_KEY, 0, None)
+    position = cache.incr(LOG_SEQ_KEY)
+    cache.set(LOG_KEY.format(position), video_id, None)
+
+
+def logged_videos():
+    """
+    ``(video ids, position)``: videos logged since the last flush, and how
+    far the log can be marked done once they are applied.
+    """
+    done = cache.get(LOG_DONE_KEY, 0)
+    last = cache.get(LOG_SEQ_KEY, 0)
+    keys = [LOG_KEY.format(position) for position in range(done + 1, last + 1)]
+    entries = cache.get_many(keys)
+    position = done
+    for key in keys:
+        if key not in entries:
+            break  # Numbered but not written yet; read it again next time
+        position += 1
+    return set(entries.values()), position
+
+
+def pending_views(video_ids=None):
+    """Return ``{video id: pending views}`` for videos with uncounted views."""
+    if video_ids is None:
+        video_ids, _ = logged_videos()
+    keys = {PENDING_KEY.format(video_id): video_id for video_id in video_ids}
+    return {keys[key]: count for key, count in cache.get_many(keys).items() if count}
+
+
+def flush_views(video_ids=None):
+    """
+    Apply pending views to ``views_count``: those of the logged videos, or
+    of ``video_ids`` if given (``flush_video_views`` passes every video).
+    Counters are decremented by exactly what was applied, and only once the
+    update commits, so views recorded during the flush or lost to a failed
+    update are kept for the next one. Returns the number of views applied,
+    or None if another flush is running.
+    """
+    if not cache.add(FLUSH_RUNNING_KEY, 1, FLUSH_RUNNING_TIMEOUT):
+        return None
+    try:
+        position = None
+        if video_ids is None:
+            video_ids, position = logged_videos()
+        # Views from here on log their video again
+        cache.delete_many([DIRTY_KEY.format(video_id) for video_id in video_ids])
+        pending = pending_views(video_ids)
+        ids_by_delta = defaultdict(list)
+        for video_id, count in pending.items():
+            ids_by_delta[count].append(video_id)
+
+        with transaction.atomic():
+            for delta, ids in ids_by_delta.items():
+                VideoLesson.objects.filter(id__in=ids).update(views_count=F('views_count') + delta)
+            # Holds the flush lock until then; a rolled back outer transaction leaves it to expire
+            transaction.on_commit(lambda: applied(pending, position))
+    except Exception:
+        cache.delete(FLUSH_RUNNING_KEY)
+        raise
+    return sum(pending.values())
+
+
+def applied(pending, position):
+    """Take committed views off the counters, drop the flushed log entries and end the flush."""
+    try:
+        for video_id, count in pending.items():
+            try:
+                cache.decr(PENDING_KEY.format(video_id), count)
+            except ValueError:
+                pass  # Evicted meanwhile; nothing left to take the views off
+        if position is not None:
+            done = cache.get(LOG_DONE_KEY, 0)
+            if position > done:
+                cache.delete_many([LOG_KEY.format(n) for n in range(done + 1, position + 1)])
+                cache.set(LOG_DONE_KEY, position, None)
+    finally:
+        cache.delete(FLUSH_RUNNING_KEY)
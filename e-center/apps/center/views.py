@@ -1,9 +1,9 @@
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
+from rest_framework import filters, status
 from django.db.models import Q
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
@@ -12,9 +12,22 @@ from .serializers import (
     CategorySerializer,
     GrammarSerializer,
     VideoLessonSerializer,
-    TurkmenEnglishWordSerializer
+    TurkmenEnglishWordSerializer,
+    ProgressEventSerializer,
+    ReviewCardSerializer,
+    ReviewAnswerSerializer
 )
-from .models import Center, Category, Grammar, VideoLesson, TurkmenEnglishWord
+from .models import Center, Category, Grammar, VideoLesson, TurkmenEnglishWord, ReviewCard
+from .compact import CompactListMixin
+from .prefix_index import prefix_index
+from .search import search_vocabulary, highlight_results
+from .fuzzy import fuzzy_search
+from .sampling import random_matching_words, random_words as random_words_from
+from .stats import read_stats
+from .progress import record_many
+from .review import grade, review_queue
+from .view_counts import record_view, viewer_key
+from django.utils import timezone
 
 class CategoryViewSet(ModelViewSet):
     queryset = Category.objects.all()
@@ -33,7 +46,7 @@ class CenterViewSet(ModelViewSet):
     permission_classes = []
     http_method_names = ['get']
 
-class GrammarViewSet(ModelViewSet):
+class GrammarViewSet(CompactListMixin, ModelViewSet):
     queryset = Grammar.objects.select_related('category', 'created_by').all()
     serializer_class = GrammarSerializer
     permission_classes = []
@@ -54,36 +67,24 @@ class GrammarViewSet(ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get statistics about grammar lessons"""
-        from django.db.models import Count
-        
-        total = self.get_queryset().count()
-        by_category = self.get_queryset().values('category__name').annotate(
-            count=Count('id')
-        ).order_by('category__name')
-        by_status = self.get_queryset().values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
+        stats = read_stats(Grammar)
         
         # Convert to the format expected by frontend
         category_stats = {}
-        for item in by_category:
-            if item['category__name']:
-                key = item['category__name'].lower()
-                category_stats[key] = item['count']
-        
-        status_stats = {}
-        for item in by_status:
-            status_stats[item['status']] = item['count']
+        for name, count in stats['category'].items():
+            if name:
+                key = name.lower()
+                category_stats[key] = category_stats.get(key, 0) + count
         
         return Response({
-            'total': total,
+            'total': stats['total'],
             'by_category': category_stats,
-            'by_status': status_stats,
-            'total_lessons': total  # For backward compatibility
+            'by_status': stats['status'],
+            'total_lessons': stats['total']  # For backward compatibility
         })
 
 
-class VideoLessonViewSet(ModelViewSet):
+class VideoLessonViewSet(CompactListMixin, ModelViewSet):
     queryset = VideoLesson.objects.select_related('created_by').all()
     serializer_class = VideoLessonSerializer
     permission_classes = []
@@ -96,37 +97,27 @@ class VideoLessonViewSet(ModelViewSet):
         'duration': ['exact', 'gte', 'lte', 'range'],
         'created_at': ['exact', 'gte', 'lte', 'date'],
     }
-    ordering_fields = ['title', 'created_at', 'duration', 'level', 'order']
+    ordering_fields = ['title', 'created_at', 'duration', 'level', 'order', 'views_count']
     ordering = ['-created_at']
 
+    def retrieve(self, request, *args, **kwargs):
+        """Count the view in the cache; views_count catches up on the next flush"""
+        response = super().retrieve(request, *args, **kwargs)
+        record_view(response.data['id'], viewer_key(request))
+        return response
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get statistics about video lessons"""
-        from django.db.models import Count
-        
-        total = self.get_queryset().count()
-        by_level = self.get_queryset().values('level').annotate(
-            count=Count('id')
-        ).order_by('level')
-        by_status = self.get_queryset().values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-        
-        level_stats = {}
-        for item in by_level:
-            level_stats[item['level']] = item['count']
-        
-        status_stats = {}
-        for item in by_status:
-            status_stats[item['status']] = item['count']
+        stats = read_stats(VideoLesson)
         
         return Response({
-            'total': total,
-            'by_level': level_stats,
-            'by_status': status_stats
+            'total': stats['total'],
+            'by_level': stats['level'],
+            'by_status': stats['status']
         })
 
-class TurkmenEnglishWordViewSet(ModelViewSet):
+class TurkmenEnglishWordViewSet(CompactListMixin, ModelViewSet):
     queryset = TurkmenEnglishWord.objects.select_related('created_by').all()
     serializer_class = TurkmenEnglishWordSerializer
     permission_classes = []
@@ -147,29 +138,6 @@ class TurkmenEnglishWordViewSet(ModelViewSet):
         Enhanced queryset with advanced search capabilities
         """
         queryset = super().get_queryset()
-        query = self.request.query_params.get('q', '')
-        
-        if query:
-            # Split search terms for more precise matching
-            search_terms = query.split()
-            
-            # Start with an empty Q object
-            q_objects = Q()
-            
-            # Build advanced search filter
-            for term in search_terms:
-                # Match against turkmen_word, english_word, definition, and example_sentence
-                # With different weights/priority
-                term_filter = (
-                    Q(turkmen_word__icontains=term) | 
-                    Q(english_word__icontains=term) | 
-                    Q(definition__icontains=term) | 
-                    Q(example_sentence__icontains=term)
-                )
-                q_objects |= term_filter
-                
-            # Apply filters to queryset
-            queryset = queryset.filter(q_objects).distinct()
             
         # Additional search filters
         starts_with = self.request.query_params.get('starts_with', '')
@@ -186,10 +154,31 @@ class TurkmenEnglishWordViewSet(ModelViewSet):
             
         return queryset
 
+    def filter_queryset(self, queryset):
+        """Search last, so the Python backends rank only words that pass every filter"""
+        return self.search(super().filter_queryset(queryset))
+
+    def search(self, queryset):
+        """
+        Ranked full-text (or typo-tolerant) search for ``q``; relevance wins
+        over the default ordering unless the client asked for an explicit one
+        """
+        query = self.request.query_params.get('q', '')
+        if not query:
+            return queryset
+        if self.request.query_params.get('fuzzy') in ('1', 'true'):
+            queryset = fuzzy_search(queryset, query)
+        else:
+            queryset = search_vocabulary(queryset, query)
+        if 'search_rank' in queryset.query.annotations and not self.request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', 'turkmen_word')
+        return queryset
+
     @action(detail=False, methods=['get'])
     @extend_schema(
         parameters=[
             OpenApiParameter(name="q", description="Search term for querying words", required=False, type=str),
+            OpenApiParameter(name="fuzzy", description="Set to 1 to match misspelled or diacritic-free headwords", required=False, type=bool),
             OpenApiParameter(name="starts_with", description="Filter words starting with this prefix", required=False, type=str),
             OpenApiParameter(name="part_of_speech", description="Filter by part of speech (noun, verb, etc.)", required=False, type=str),
         ],
@@ -206,22 +195,46 @@ class TurkmenEnglishWordViewSet(ModelViewSet):
     )
     def search_advanced(self, request):
         """Advanced search with more options and better response format"""
-        queryset = self.get_queryset()
+        query = request.query_params.get('q', '')
+        queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            response = self.get_paginated_response(serializer.data)
-            response.data['query'] = request.query_params.get('q', '')
+            response = self.get_paginated_response(highlight_results(serializer.data, query))
+            response.data['query'] = query
             return response
             
         serializer = self.get_serializer(queryset, many=True)
+        results = highlight_results(serializer.data, query)
         return Response({
-            'results': serializer.data,
-            'count': len(serializer.data),
-            'query': request.query_params.get('q', '')
+            'results': results,
+            'count': len(results),
+            'query': query
         })
         
+    @action(detail=False, methods=['get'])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="prefix", description="Turkmen or English prefix to complete", required=True, type=str),
+            OpenApiParameter(name="limit", description="Maximum number of suggestions", required=False, type=int, default=10),
+        ],
+        description="Autocomplete published vocabulary words from the in-memory prefix index",
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    def autocomplete(self, request):
+        """Prefix suggestions served from memory, without touching the vocabulary table"""
+        prefix = request.query_params.get('prefix', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+
+        return Response({
+            'prefix': prefix,
+            'results': prefix_index.lookup(prefix, limit=limit)
+        })
+
     @action(detail=False, methods=['get'])
     @extend_schema(
         description="Get statistics about vocabulary words",
@@ -231,28 +244,12 @@ class TurkmenEnglishWordViewSet(ModelViewSet):
     )
     def stats(self, request):
         """Get statistics about vocabulary words"""
-        from django.db.models import Count
-        
-        total = self.get_queryset().count()
-        by_level = self.get_queryset().values('level').annotate(
-            count=Count('id')
-        ).order_by('level')
-        by_status = self.get_queryset().values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-        
-        level_stats = {}
-        for item in by_level:
-            level_stats[item['level']] = item['count']
-        
-        status_stats = {}
-        for item in by_status:
-            status_stats[item['status']] = item['count']
+        stats = read_stats(TurkmenEnglishWord)
         
         return Response({
-            'total': total,
-            'by_level': level_stats,
-            'by_status': status_stats
+            'total': stats['total'],
+            'by_level': stats['level'],
+            'by_status': stats['status']
         })
 
     @action(detail=False, methods=['get'])
@@ -260,25 +257,96 @@ class TurkmenEnglishWordViewSet(ModelViewSet):
         parameters=[
             OpenApiParameter(name="count", description="Number of random words to return", required=False, type=int, default=10),
             OpenApiParameter(name="level", description="Filter by vocabulary level", required=False, type=str),
+            OpenApiParameter(name="seed", description="Seed for a reproducible deck", required=False, type=str),
         ],
-        description="Get random vocabulary words for practice",
+        description="Get random vocabulary words. For spaced-repetition practice use review-queue instead",
         responses={200: TurkmenEnglishWordSerializer(many=True)}
     )
     def random(self, request):
         """Get random vocabulary words for practice"""
-        import random
-        
-        count = int(request.query_params.get('count', 10))
-        level = request.query_params.get('level')
+        try:
+            count = int(request.query_params.get('count', 10))
+        except ValueError:
+            count = -1
+        if count < 0:
+            return Response(
+                {"error": "count must be a non-negative integer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        count = min(count, 100)
+        level = request.query_params.get('level') or None
+        seed = request.query_params.get('seed')
         
         queryset = self.get_queryset()
-        if level:
-            queryset = queryset.filter(level=level)
-        
-        # Get random words
-        word_ids = list(queryset.values_list('id', flat=True))
-        random_ids = random.sample(word_ids, min(count, len(word_ids)))
-        random_words = queryset.filter(id__in=random_ids)
+        if any(request.query_params.get(param) for param in ('q', 'starts_with', 'part_of_speech')):
+            if level:
+                queryset = queryset.filter(level=level)
+            queryset = self.search(queryset)
+            random_words = random_matching_words(queryset, count, level=level, seed=seed)
+        else:
+            random_words = random_words_from(queryset, count, level=level, seed=seed)
         
         serializer = self.get_serializer(random_words, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+    @action(detail=False, methods=['get'], url_path='review-queue', permission_classes=[IsAuthenticated])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name="limit", description="Number of cards to return", required=False, type=int, default=20),
+            OpenApiParameter(name="level", description="Only review words of this level", required=False, type=str),
+            OpenApiParameter(name="new", description="Set to 0 to leave out words never reviewed", required=False, type=bool),
+        ],
+        description="Next cards due for spaced-repetition review, oldest first, topped up with unseen words",
+        responses={200: ReviewCardSerializer(many=True)}
+    )
+    def review_queue(self, request):
+        """Next due cards for the current learner"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        level = request.query_params.get('level') or None
+        include_new = request.query_params.get('new') not in ('0', 'false')
+
+        now = timezone.now()
+        due, new_words = review_queue(request.user, limit, level=level, include_new=include_new, now=now)
+        cards = due + [ReviewCard(word=word, due_at=now) for word in new_words]
+        return Response(ReviewCardSerializer(cards, many=True).data)
+
+    @action(
+        detail=False, methods=['post'], url_path='review',
+        permission_classes=[IsAuthenticated], http_method_names=['post', 'options']
+    )
+    @extend_schema(
+        request=ReviewAnswerSerializer(many=True),
+        description="Grade many reviewed words (quality 0-5) in one request and reschedule them",
+        responses={200: ReviewCardSerializer(many=True)}
+    )
+    def review(self, request):
+        """Apply a batch of graded answers"""
+        serializer = ReviewAnswerSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        cards = grade(request.user, [(answer['word_id'], answer['quality']) for answer in serializer.validated_data])
+        return Response(ReviewCardSerializer(cards, many=True).data)
+
+class ProgressEventViewSet(ViewSet):
+    """
+    Accepts learning activity from the authenticated student. Events are
+    buffered and bulk-inserted, so the response only acknowledges receipt.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Record progress events",
+        description="Record one event object, or a list of them (e.g. a whole quiz), for the current user",
+        request=ProgressEventSerializer(many=True),
+        tags=["Statistics"]
+    )
+    def create(self, request):
+        many = isinstance(request.data, list)
+        serializer = ProgressEventSerializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        events = serializer.validated_data if many else [serializer.validated_data]
+        record_many([{**event, 'user': request.user} for event in events])
+        return Response({'accepted': len(events)}, status=status.HTTP_202_ACCEPTED)
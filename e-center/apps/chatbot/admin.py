@@ -1,7 +1,7 @@
 from django.contrib import admin
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
-from .models import ChatSession, ChatMessage
+from .models import ChatArchive, ChatJob, ChatSession, ChatMessage
 
 
 class ChatMessageInline(admin.TabularInline):
@@ -13,7 +13,7 @@ class ChatMessageInline(admin.TabularInline):
 class ChatSessionResource(resources.ModelResource):
     class Meta:
         model = ChatSession
-        fields = ('id', 'title', 'user__username', 'user__email', 'created_at', 'updated_at')
+        fields = ('id', 'title', 'user__username', 'user__email', 'message_count', 'created_at', 'updated_at')
         export_order = fields
 
 
@@ -30,9 +30,10 @@ class ChatMessageResource(resources.ModelResource):
 @admin.register(ChatSession)
 class ChatSessionAdmin(ImportExportModelAdmin):
     resource_class = ChatSessionResource
-    list_display = ('title', 'user', 'created_at', 'updated_at')
+    list_display = ('title', 'user', 'message_count', 'last_message_at', 'created_at', 'updated_at')
     list_filter = ('user', 'created_at')
     search_fields = ('title', 'user__username', 'user__email')
+    readonly_fields = ('summary', 'summary_through', 'message_count', 'last_message_at', 'last_message_preview')
     inlines = [ChatMessageInline]
 
 
@@ -46,3 +47,21 @@ class ChatMessageAdmin(ImportExportModelAdmin):
     def content_preview(self, obj):
         return obj.content[:50] + ('...' if len(obj.content) > 50 else '')
     content_preview.short_description = 'Content'
+
+
+@admin.register(ChatArchive)
+class ChatArchiveAdmin(admin.ModelAdmin):
+    list_display = ('session', 'message_count', 'raw_size', 'last_message_at', 'archived_at')
+    search_fields = ('session__title', 'session__user__username')
+    raw_id_fields = ('session',)
+    exclude = ('data',)
+    readonly_fields = ('codec', 'message_count', 'raw_size', 'last_message_at', 'archived_at')
+
+
+@admin.register(ChatJob)
+class ChatJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'provider', 'user', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'provider', 'created_at')
+    search_fields = ('id', 'user__username', 'message')
+    raw_id_fields = ('user', 'session', 'assistant_message')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.chatbot'
\ No newline at end of file
+    name = 'apps.chatbot'
+
+    def ready(self):
+        # Each worker process builds its model clients at boot, not on the first chat
+        if getattr(settings, 'LLM_WARM_ON_BOOT', True):
+            from .llm import warm_backend
+            warm_backend()
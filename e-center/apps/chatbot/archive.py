@@ -0,0 +1,137 @@
+"""
+Cold storage for the messages of idle chat sessions.
+
+``python manage.py archive_chat_messages`` moves every message of sessions
+idle for ``CHAT_ARCHIVE_IDLE_DAYS`` out of ``ChatMessage`` into one
+``ChatArchive`` row per session: the messages as compact JSON, compressed
+with zlib. Sessions are archived in batches, each in its own transaction,
+so an interrupted run simply resumes with the sessions still left.
+
+An archive always holds the oldest messages of its session, up to
+``ChatSession.archived_through``; a session that becomes active again
+gets new hot rows after it, which are appended to the archive the next
+time it goes idle. ``archived_messages`` reads them back as unsaved
+``ChatMessage`` instances for the ``messages`` endpoint and for the
+context window of a session that is resumed. The decoded rows are cached
+for ``CHAT_ARCHIVE_CACHE_TIMEOUT`` seconds under the session and its
+``archived_through``, so paging through an archive decompresses it once
+and appending to the archive changes the key.
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatArchive, ChatMessage, ChatSession
+
+DEFAULT_IDLE_DAYS = 90
+CODEC = 'zlib'
+COMPRESSION_LEVEL = 6
+DELETE_CHUNK = 1000  # message IDs per DELETE
+ROWS_CACHE_KEY = 'chatbot:archive:{}:{}'
+DEFAULT_CACHE_TIMEOUT = 10 * 60  # seconds
+
+
+def pack(messages):
+    """``(blob, raw size)`` for ``messages``, oldest first."""
+    raw = json.dumps(
+        [[msg.id, msg.role, msg.content, msg.created_at.isoformat()] for msg in messages],
+        ensure_ascii=False, separators=(',', ':'),
+    ).encode()
+    return zlib.compress(raw, COMPRESSION_LEVEL), len(raw)
+
+
+def decode(archive):
+    """The ``[id, role, content, created_at]`` rows of ``archive``, oldest first."""
+    if archive.codec != CODEC:
+        raise ValueError(f"Unknown chat archive codec: {archive.codec}")
+    return json.loads(zlib.decompress(bytes(archive.data)))
+
+
+def to_messages(session_id, rows):
+    """Archived ``rows`` as unsaved ``ChatMessage`` instances."""
+    return [
+        ChatMessage(id=pk, session_id=session_id, role=role, content=content, created_at=parse_datetime(created_at))
+        for pk, role, content, created_at in rows
+    ]
+
+
+def unpack(archive):
+    """The archived messages of ``archive`` as unsaved ``ChatMessage`` instances, oldest first."""
+    return to_messages(archive.session_id, decode(archive))
+
+
+def archived_messages(session):
+    """Archived messages of ``session``, oldest first; no query if it has none or they are cached."""
+    if not session.archived_through:
+        return []
+    key = ROWS_CACHE_KEY.format(session.id, session.archived_through)
+    rows = cache.get(key)
+    if rows is None:
+        archive = ChatArchive.objects.filter(session=session).first()
+        if archive is None:
+            return []
+        rows = decode(archive)
+        cache.set(key, rows, getattr(settings, 'CHAT_ARCHIVE_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return to_messages(session.id, rows)
+
+
+def idle_sessions(idle_days=None):
+    """Sessions idle for ``idle_days`` that still have messages in the hot table."""
+    idle_days = idle_days if idle_days is not None else getattr(settings, 'CHAT_ARCHIVE_IDLE_DAYS', DEFAULT_IDLE_DAYS)
+    cutoff = timezone.now() - timedelta(days=idle_days)
+    return ChatSession.objects.filter(
+        last_message_at__lt=cutoff,
+    ).filter(Exists(ChatMessage.objects.filter(session=OuterRef('pk')))).order_by('id')
+
+
+def archive_sessions(session_ids):
+    """
+    Move the hot messages of ``session_ids`` into their archives in one
+    transaction. Returns ``(messages archived, raw bytes, stored bytes)``.
+    """
+    with transaction.atomic():
+        messages = list(ChatMessage.objects.filter(session_id__in=session_ids).order_by('session_id', 'created_at', 'id'))
+        if not messages:
+            return 0, 0, 0
+        by_session = {}
+        for msg in messages:
+            by_session.setdefault(msg.session_id, []).append(msg)
+        archives = {
+            archive.session_id: archive
+            for archive in ChatArchive.objects.select_for_update().filter(session_id__in=by_session)
+        }
+
+        new, changed, raw_total, stored_total = [], [], 0, 0
+        for session_id, session_messages in by_session.items():
+            archive = archives.get(session_id)
+            if archive is None:
+                archive = ChatArchive(session_id=session_id, codec=CODEC)
+                new.append(archive)
+            else:
+                session_messages = unpack(archive) + session_messages
+                changed.append(archive)
+            archive.data, archive.raw_size = pack(session_messages)
+            archive.message_count = len(session_messages)
+            archive.last_message_at = session_messages[-1].created_at
+            archive.archived_at = timezone.now()
+            raw_total += archive.raw_size
+            stored_total += len(archive.data)
+
+        ChatArchive.objects.bulk_create(new)
+        ChatArchive.objects.bulk_update(
+            changed, ['data', 'message_count', 'raw_size', 'last_message_at', 'archived_at']
+        )
+        for session_id, session_messages in by_session.items():
+            ChatSession.objects.filter(id=session_id).update(archived_through=session_messages[-1].id)
+        # Delete exactly the rows read, so a turn stored meanwhile stays hot
+        ids = [msg.id for msg in messages]
+        for start in range(0, len(ids), DELETE_CHUNK):
+            ChatMessage.objects.filter(id__in=ids[start:start + DELETE_CHUNK]).delete()
+    return len(messages), raw_total, stored_total
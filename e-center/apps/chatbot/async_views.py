@@ -0,0 +1,235 @@
+"""
+Async views for the chat endpoints.
+
+Served under ``/api/v1/chat/async/`` alongside the DRF viewset. On an ASGI
+server (``config.asgi`` with uvicorn workers) a request waiting on Gemini
+only parks a coroutine, so a few slow chats no longer pin every worker.
+Sessions and messages go through Django's async ORM; authentication reuses
+the DRF authenticators configured in ``REST_FRAMEWORK``.
+"""
+import asyncio
+import json
+import math
+import time
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .jobs import job_payload
+from .limits import LLMBusy, allm_slot, check_rate, retry_after
+from .models import ChatJob, ChatSession
+from .serializers import ChatRequestSerializer, SimpleChatContextSerializer
+from .turns import ChatTurn
+from .utils import agenerate_response, agenerate_simple_response, atest_gemini_connection
+
+
+def authenticate(request):
+    """Run the configured DRF authenticators against a plain Django request."""
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    return drf_request.user or AnonymousUser()
+
+
+def too_many_requests(wait, detail):
+    """429 with ``Retry-After``, shaped like DRF's throttled response."""
+    response = JsonResponse({'detail': detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after(wait))
+    return response
+
+
+async def throttled(request, user):
+    """A 429 response if ``request`` is over the chat rate limits, else None."""
+    # A check may wait briefly for a bucket lock; keep that off the event loop
+    wait = await sync_to_async(check_rate)(request, user)
+    if wait:
+        return too_many_requests(wait, f'Request was throttled. Expected available in {retry_after(wait)} seconds.')
+    return None
+
+
+def parse_json(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+async def get_chat_user(user):
+    """The authenticated user, or a shared test user for anonymous chats."""
+    from apps.users.models import User
+    if user.is_authenticated:
+        return user
+
+    test_user, created = await User.objects.aget_or_create(
+        username='test_user',
+        defaults={
+            'email': 'test@example.com',
+            'first_name': 'Test',
+            'last_name': 'User'
+        }
+    )
+    if created:
+        test_user.set_password('testpassword123')
+        await test_user.asave()
+    return test_user
+
+
+async def get_chat_session(user, data):
+    """
+    Return ``(session, created)`` for the requested session, retuned to the
+    requested level and focus (saved with the turn), or a new one.
+    ``(None, False)`` if not found.
+    """
+    session_id = data.get('session_id')
+    proficiency_level = data.get('proficiency_level')
+    learning_focus = data.get('learning_focus')
+
+    if session_id:
+        try:
+            session = await ChatSession.objects.aget(id=session_id, user=user)
+        except ChatSession.DoesNotExist:
+            return None, False
+
+        if proficiency_level:
+            session.proficiency_level = proficiency_level
+        if learning_focus:
+            session.learning_focus = learning_focus
+        return session, False
+
+    session_data = {'user': user}
+    if proficiency_level:
+        session_data['proficiency_level'] = proficiency_level
+    if learning_focus:
+        session_data['learning_focus'] = learning_focus
+    return await ChatSession.objects.acreate(**session_data), True
+
+
+@csrf_exempt
+@require_POST
+async def chat(request):
+    """Async twin of ``ChatSessionViewSet.chat`` (without streaming)."""
+    try:
+        user = await sync_to_async(authenticate)(request)
+    except exceptions.APIException as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+    limited = await throttled(request, user)
+    if limited is not None:
+        return limited
+
+    data = parse_json(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ChatRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    user_message = serializer.validated_data['message']
+    user = await get_chat_user(user)
+    try:
+        # Take the slot first, so a refused chat creates no session
+        async with allm_slot():
+            session, created = await get_chat_session(user, serializer.validated_data)
+            if session is None:
+                return JsonResponse({'error': 'Chat session not found'}, status=status.HTTP_404_NOT_FOUND)
+            turn = await ChatTurn.aload(session, user_message, created)
+            ai_response = await agenerate_response(turn.prompt, session, history=turn.history(after_commit=False))
+    except LLMBusy as e:
+        return too_many_requests(e.retry_after, str(e))
+    assistant_message = await turn.asave(ai_response)
+
+    return JsonResponse({
+        'response': ai_response,
+        'session_id': session.id,
+        'message_id': assistant_message.id if assistant_message else None,
+        'proficiency_level': session.proficiency_level,
+        'learning_focus': session.learning_focus
+    })
+
+
+@csrf_exempt
+@require_POST
+async def simple_chat(request):
+    """Async twin of ``ChatSessionViewSet.simple_chat``."""
+    try:
+        user = await sync_to_async(authenticate)(request)
+    except exceptions.APIException as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+    limited = await throttled(request, user)
+    if limited is not None:
+        return limited
+
+    data = parse_json(request)
+    user_message = str((data or {}).get('message', '')).strip()
+    if not user_message:
+        return JsonResponse({'error': 'Message is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    context = SimpleChatContextSerializer(data=data or {})
+    if not context.is_valid():
+        return JsonResponse(context.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        ai_response = await agenerate_simple_response(user_message, **context.validated_data)
+    except LLMBusy as e:
+        return too_many_requests(e.retry_after, str(e))
+    except Exception as e:
+        return JsonResponse(
+            {'error': f'Failed to generate response: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    return JsonResponse({
+        'response': ai_response,
+        'message': user_message,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@require_GET
+async def test(request):
+    """Async twin of ``ChatSessionViewSet.test``."""
+    result = await atest_gemini_connection()
+    return JsonResponse({
+        'status': 'success' if 'API is working' in result else 'error',
+        'message': result
+    })
+
+
+MAX_JOB_WAIT = 30  # seconds
+JOB_POLL_INTERVAL = 0.5  # seconds
+
+
+@require_GET
+async def job_detail(request, job_id):
+    """
+    Status of a queued chat turn. ``?wait=N`` long-polls for up to N
+    seconds (at most 30) until the job has finished.
+    """
+    try:
+        user = await get_chat_user(await sync_to_async(authenticate)(request))
+    except exceptions.APIException as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    if not math.isfinite(wait):  # ``nan`` would never reach the deadline
+        return JsonResponse({'error': 'wait must be a number of seconds'}, status=status.HTTP_400_BAD_REQUEST)
+    wait = min(max(wait, 0), MAX_JOB_WAIT)
+
+    jobs = ChatJob.objects.filter(id=job_id, user=user)
+    deadline = time.monotonic() + wait
+    while True:
+        job = await jobs.afirst()
+        if job is None:
+            return JsonResponse({'error': 'Chat job not found'}, status=status.HTTP_404_NOT_FOUND)
+        if job.status in (ChatJob.DONE, ChatJob.FAILED) or time.monotonic() >= deadline:
+            return JsonResponse(job_payload(job))
+        await asyncio.sleep(JOB_POLL_INTERVAL)
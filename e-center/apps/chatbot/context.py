@@ -0,0 +1,201 @@
+"""
+Token-budgeted conversation context for chat sessions.
+
+Each turn reads at most ``CHAT_HISTORY_MAX_MESSAGES`` (+1) of the newest
+messages and keeps as many of them, newest first, as fit in
+``CHAT_HISTORY_TOKEN_BUDGET`` estimated tokens. Turns that fall out of the
+window are folded into ``ChatSession.summary`` by a background worker
+after the request commits, and the summary is sent with the system prompt
+so the model keeps the gist of the whole conversation while the prompt
+size and the per-turn reads stay bounded. When a resumed session has
+fewer hot rows than the window holds, the window reaches back into its
+archive (see ``apps.chatbot.archive``), and the summary folds archived
+messages in the same way.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .archive import archived_messages
+from .resilience import guarded_generate
+from .models import ChatMessage, ChatSession
+
+DEFAULT_TOKEN_BUDGET = 3000
+DEFAULT_MAX_MESSAGES = 40
+DEFAULT_SUMMARY_WORDS = 150
+SUMMARY_BATCH = 100  # messages folded in per summary run
+SUMMARY_LOCK_KEY = 'chatbot:summary:{}'
+SUMMARY_LOCK_TIMEOUT = 5 * 60  # seconds
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4  # role and separators
+
+SUMMARY_PROMPT = (
+    "You keep notes on an English lesson between a student and their tutor. "
+    "Update the notes with the new part of the conversation below. Keep the student's level, goals, "
+    "recurring mistakes and the topics covered. Answer with the notes only, in at most {words} words.\n\n"
+    "Current notes:\n{summary}\n\nNew conversation:\n{transcript}"
+)
+
+summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-summary')
+
+
+def estimate_tokens(text):
+    """Rough token count: about four characters per token for English text."""
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD
+
+
+def history_entry(msg):
+    """One stored message in the format expected by Gemini."""
+    # Convert 'assistant' role to 'model' as required by Gemini
+    role = "model" if msg.role == "assistant" else "user"
+    return {
+        "role": role,
+        "parts": [msg.content]
+    }
+
+
+def window_queryset(session):
+    limit = getattr(settings, 'CHAT_HISTORY_MAX_MESSAGES', DEFAULT_MAX_MESSAGES)
+    # One extra row tells whether anything older exists
+    return ChatMessage.objects.filter(session=session).order_by('-created_at', '-id')[:limit + 1]
+
+
+def fit_window(session, newest_first):
+    """
+    Return ``(window, dropped_through)``: the newest messages that fit the
+    token budget, oldest first, and the ID of the newest message left out
+    (0 if nothing was).
+    """
+    limit = getattr(settings, 'CHAT_HISTORY_MAX_MESSAGES', DEFAULT_MAX_MESSAGES)
+    budget = getattr(settings, 'CHAT_HISTORY_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)
+    budget -= estimate_tokens(session.summary) if session.summary else 0
+
+    window, used = [], 0
+    for index, msg in enumerate(newest_first):
+        cost = estimate_tokens(msg.content)
+        # Always keep the newest message, even if it alone is over budget
+        if index >= limit or (window and used + cost > budget):
+            return window[::-1], msg.id
+        window.append(msg)
+        used += cost
+    return window[::-1], 0
+
+
+def with_summary(system_message, session):
+    """The system prompt entry, carrying the rolling summary if there is one."""
+    if not session.summary:
+        return system_message
+    return {
+        "role": system_message["role"],
+        "parts": [
+            system_message["parts"][0]
+            + "\n\nSummary of the earlier part of this conversation:\n" + session.summary
+        ],
+    }
+
+
+def reaches_archive(session, newest_first):
+    """Whether the window, having read ``newest_first`` hot rows, continues into the archive."""
+    limit = getattr(settings, 'CHAT_HISTORY_MAX_MESSAGES', DEFAULT_MAX_MESSAGES)
+    return bool(session.archived_through) and len(newest_first) <= limit
+
+
+def load_window(session):
+    """``(window, dropped_through)`` for the next turn of ``session``; one query, plus the archive if it reaches back there."""
+    newest_first = list(window_queryset(session))
+    if reaches_archive(session, newest_first):
+        newest_first += archived_messages(session)[::-1]
+    return fit_window(session, newest_first)
+
+
+async def aload_window(session):
+    """Async ``load_window`` using the async ORM."""
+    newest_first = [msg async for msg in window_queryset(session)]
+    if reaches_archive(session, newest_first):
+        newest_first += (await sync_to_async(archived_messages)(session))[::-1]
+    return fit_window(session, newest_first)
+
+
+def history_from(session, system_message, window, dropped_through, after_commit=True):
+    """History entries for a loaded window; queues a summary of anything dropped."""
+    if dropped_through > session.summary_through:
+        schedule_summary(session.id, dropped_through, after_commit=after_commit)
+    return [with_summary(system_message, session)] + [history_entry(msg) for msg in window]
+
+
+def build_history(session, system_message):
+    """History for the next turn of ``session``: system prompt and summary, then the window."""
+    return history_from(session, system_message, *load_window(session))
+
+
+async def abuild_history(session, system_message):
+    """Async ``build_history`` using the async ORM."""
+    return history_from(session, system_message, *await aload_window(session), after_commit=False)
+
+
+def schedule_summary(session_id, through_id, after_commit=True):
+    """
+    Fold messages up to ``through_id`` into the summary in the background,
+    once this request's writes are committed. Async callers pass
+    ``after_commit=False``: the async ORM has no open transaction to wait on.
+    """
+    if not cache.add(SUMMARY_LOCK_KEY.format(session_id), 1, SUMMARY_LOCK_TIMEOUT):
+        return  # A run for this session is already queued
+    if after_commit:
+        transaction.on_commit(lambda: summary_executor.submit(run_summary, session_id, through_id))
+    else:
+        summary_executor.submit(run_summary, session_id, through_id)
+
+
+def run_summary(session_id, through_id):
+    """Worker entry point: summarize, then release the lock and this thread's connection."""
+    try:
+        summarize_session(session_id, through_id)
+    except Exception as e:
+        import traceback
+        print(f"Error summarizing chat session {session_id}: {e}")
+        print(traceback.format_exc())
+    finally:
+        cache.delete(SUMMARY_LOCK_KEY.format(session_id))
+        connection.close()
+
+
+def summarize_session(session_id, through_id):
+    """
+    Fold the messages after ``summary_through`` and up to ``through_id``
+    into the session summary. Returns whether the summary changed.
+    """
+    session = ChatSession.objects.filter(id=session_id).only('summary', 'summary_through', 'archived_through').first()
+    if session is None or session.summary_through >= through_id:
+        return False
+
+    messages = []
+    if session.archived_through > session.summary_through:
+        messages = [
+            msg for msg in archived_messages(session)
+            if session.summary_through < msg.id <= through_id
+        ][:SUMMARY_BATCH]
+    messages += ChatMessage.objects.filter(
+        session_id=session_id, id__gt=session.summary_through, id__lte=through_id
+    ).order_by('id')[:SUMMARY_BATCH - len(messages)]
+    if not messages:
+        return False
+
+    transcript = "\n".join(
+        f"{'Tutor' if msg.role == 'assistant' else 'Student'}: {msg.content}" for msg in messages
+    )
+    prompt = SUMMARY_PROMPT.format(
+        words=getattr(settings, 'CHAT_SUMMARY_WORDS', DEFAULT_SUMMARY_WORDS),
+        summary=session.summary or "(none yet)",
+        transcript=transcript,
+    )
+    summary = guarded_generate([], prompt).strip()
+
+    # Only advance from the state we read, so concurrent runs cannot go backwards
+    return bool(ChatSession.objects.filter(
+        id=session_id, summary_through=session.summary_through
+    ).update(summary=summary, summary_through=messages[-1].id))
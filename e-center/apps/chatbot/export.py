@@ -0,0 +1,144 @@
+"""
+Streaming export of chat messages as NDJSON, one JSON object per line.
+
+Used by ``python manage.py export_chat_messages`` and the staff-only
+``sessions/export/`` endpoint. Hot messages are read with
+``values_list(...).iterator(chunk_size)``, joined to their session and
+user in the same query, and archived sessions are unpacked one archive at
+a time. Nothing is collected in memory, so the export runs in constant
+memory however many messages match.
+"""
+import json
+import zlib
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .archive import unpack
+from .models import ChatArchive, ChatMessage, ChatSession
+
+CHUNK_SIZE = 2000  # rows fetched per round trip
+ARCHIVE_CHUNK_SIZE = 20  # archives fetched per round trip; each holds a whole session
+BUFFER_SIZE = 64 * 1024  # bytes of NDJSON per streamed chunk
+
+MESSAGE_FIELDS = (
+    'id', 'session_id', 'session__user_id', 'session__user__username',
+    'session__proficiency_level', 'session__learning_focus', 'role', 'content', 'created_at',
+)
+SESSION_FIELDS = (
+    'session_id', 'session__user_id', 'session__user__username',
+    'session__proficiency_level', 'session__learning_focus',
+)
+
+
+def parse_moment(value, name):
+    """An aware datetime from an ISO date or datetime; raises ValueError if invalid."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{name} must be an ISO date or datetime, got '{value}'")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_filters(since=None, until=None, user_id=None, focus=None):
+    """
+    Validate export filters given as strings; raises ValueError. Messages
+    are exported from ``since`` (inclusive) up to ``until`` (exclusive).
+    """
+    filters = {'since': parse_moment(since, 'since'), 'until': parse_moment(until, 'until')}
+    if user_id:
+        try:
+            filters['user_id'] = int(user_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"user_id must be an integer, got '{user_id}'")
+    if focus:
+        if focus not in dict(ChatSession.FOCUS_CHOICES):
+            raise ValueError(f"Unknown learning focus '{focus}'")
+        filters['focus'] = focus
+    return filters
+
+
+def record(values):
+    """One export row from values in ``MESSAGE_FIELDS`` order."""
+    pk, session_id, user_id, username, level, focus, role, content, created_at = values
+    return {
+        'id': pk,
+        'session_id': session_id,
+        'user_id': user_id,
+        'username': username,
+        'proficiency_level': level,
+        'learning_focus': focus,
+        'role': role,
+        'content': content,
+        'created_at': created_at.isoformat(),
+    }
+
+
+def hot_records(since=None, until=None, user_id=None, focus=None):
+    messages = ChatMessage.objects.all()
+    if since:
+        messages = messages.filter(created_at__gte=since)
+    if until:
+        messages = messages.filter(created_at__lt=until)
+    if user_id:
+        messages = messages.filter(session__user_id=user_id)
+    if focus:
+        messages = messages.filter(session__learning_focus=focus)
+    rows = messages.order_by('id').values_list(*MESSAGE_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    for values in rows:
+        yield record(values)
+
+
+def archived_records(since=None, until=None, user_id=None, focus=None):
+    archives = ChatArchive.objects.all()
+    if since:
+        archives = archives.filter(last_message_at__gte=since)
+    if until:
+        archives = archives.filter(session__created_at__lt=until)
+    if user_id:
+        archives = archives.filter(session__user_id=user_id)
+    if focus:
+        archives = archives.filter(session__learning_focus=focus)
+    rows = archives.order_by('session_id').values_list('codec', 'data', *SESSION_FIELDS)
+    for codec, data, *session in rows.iterator(chunk_size=ARCHIVE_CHUNK_SIZE):
+        for msg in unpack(ChatArchive(session_id=session[0], codec=codec, data=data)):
+            if (since and msg.created_at < since) or (until and msg.created_at >= until):
+                continue
+            yield record((msg.id, *session, msg.role, msg.content, msg.created_at))
+
+
+def export_records(**filters):
+    """Matching messages as dicts: archived sessions first, then the hot table by ID."""
+    yield from archived_records(**filters)
+    yield from hot_records(**filters)
+
+
+def ndjson_chunks(records, buffer_size=BUFFER_SIZE):
+    """UTF-8 NDJSON for ``records`` in chunks of about ``buffer_size`` bytes."""
+    buffer, size = [], 0
+    for row in records:
+        line = (json.dumps(row, ensure_ascii=False) + '\n').encode()
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of byte chunks incrementally."""
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
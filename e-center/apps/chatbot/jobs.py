@@ -0,0 +1,181 @@
+"""
+Database-backed queue for chat turns.
+
+``chat?job=1`` stores a ``ChatJob`` and returns at once; workers started
+with ``python manage.py run_chat_jobs`` claim jobs, run the turn and store
+the reply, and clients poll (or long-poll) ``/api/v1/chat/jobs/<id>/``.
+
+Claiming needs no broker:
+
+* A provider runs at most ``CHAT_JOB_CONCURRENCY`` jobs at once. Each
+  running job holds a numbered slot, and a unique constraint on
+  (provider, slot) among running jobs makes two workers racing for the
+  last slot fail cleanly instead of overshooting the limit.
+* Users are served fairly: the next job comes from the user with the
+  fewest running jobs (oldest waiting first), and nobody runs more than
+  ``CHAT_JOB_USER_CONCURRENCY`` at a time, which also keeps turns of one
+  session in order.
+* Rows are picked with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+  database supports it (PostgreSQL), and every claim is a conditional
+  ``UPDATE ... WHERE status = 'queued'``, so SQLite works too.
+"""
+import random
+import socket
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .llm import get_backend
+from .models import ChatJob
+from .turns import ChatTurn
+from .utils import generate_response
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_USER_CONCURRENCY = 1
+DEFAULT_TIMEOUT = 5 * 60  # seconds a job may run before it is retried
+DEFAULT_MAX_ATTEMPTS = 2
+FAIRNESS_WINDOW = 100  # users considered per claim
+
+
+def provider_limit(provider):
+    """Concurrent jobs allowed for ``provider``: an int for all, or a per-provider dict."""
+    limit = getattr(settings, 'CHAT_JOB_CONCURRENCY', DEFAULT_CONCURRENCY)
+    if isinstance(limit, dict):
+        return limit.get(provider, limit.get('default', DEFAULT_CONCURRENCY))
+    return limit
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{threading.current_thread().name}"
+
+
+def enqueue(session, user_message, created=False):
+    """Queue a turn of ``session`` for the current backend and return the job."""
+    return ChatJob.objects.create(
+        user_id=session.user_id,
+        session=session,
+        message=user_message,
+        new_session=created,
+        provider=get_backend().name,
+    )
+
+
+def claim(provider, worker=''):
+    """Mark the next fair job for ``provider`` as running and return it, or None."""
+    user_limit = getattr(settings, 'CHAT_JOB_USER_CONCURRENCY', DEFAULT_USER_CONCURRENCY)
+    queued = ChatJob.objects.filter(provider=provider, status=ChatJob.QUEUED)
+
+    with transaction.atomic():
+        running = list(
+            ChatJob.objects.filter(provider=provider, status=ChatJob.RUNNING).values_list('slot', 'user_id')
+        )
+        free_slots = sorted(set(range(provider_limit(provider))) - {slot for slot, _ in running})
+        if not free_slots:
+            return None
+
+        running_by_user = Counter(user_id for _, user_id in running)
+        heads = queued.values('user_id').annotate(waiting_since=Min('created_at')).order_by('waiting_since')
+        users = sorted(
+            (head for head in heads[:FAIRNESS_WINDOW] if running_by_user[head['user_id']] < user_limit),
+            key=lambda head: (running_by_user[head['user_id']], head['waiting_since']),
+        )
+
+        for head in users:
+            # Lock only the user's oldest job: skipping a locked head would hand
+            # out the next one and run two turns of a session out of order
+            head_id = (
+                queued.filter(user_id=head['user_id'])
+                .order_by('created_at', 'id')
+                .values_list('id', flat=True)
+                .first()
+            )
+            job = queued.filter(id=head_id).select_for_update(skip_locked=True).first()
+            if job is None:
+                continue  # Another worker holds or just took this user's next job
+
+            try:
+                with transaction.atomic():
+                    claimed = ChatJob.objects.filter(id=job.id, status=ChatJob.QUEUED).update(
+                        status=ChatJob.RUNNING,
+                        slot=random.choice(free_slots),
+                        started_at=timezone.now(),
+                        attempts=F('attempts') + 1,
+                        worker=worker,
+                    )
+            except IntegrityError:
+                return None  # Another worker took the slot; the caller polls again
+            if claimed:
+                job.refresh_from_db()
+                return job
+    return None
+
+
+def run(job):
+    """
+    Run a claimed job's turn and record the outcome. The outcome is only
+    recorded, and the turn only stored, if this claim still holds the job:
+    a slow worker whose job ``requeue_stale`` put back (and another worker
+    may have claimed again) discards its reply instead of storing the turn
+    twice. Returns the job as stored.
+    """
+    # The claim is identified by its attempt; a requeue and a new claim bump it
+    ours = ChatJob.objects.filter(pk=job.pk, status=ChatJob.RUNNING, attempts=job.attempts)
+    try:
+        session = job.session
+        turn = ChatTurn.load(session, job.message, job.new_session)
+        response = generate_response(turn.prompt, session, history=turn.history())
+        with transaction.atomic():
+            # Marking the job done first locks it, so a requeue waits for this commit
+            if ours.update(status=ChatJob.DONE, response=response, finished_at=timezone.now()):
+                assistant_message = turn.save(response)
+                ChatJob.objects.filter(pk=job.pk).update(assistant_message=assistant_message)
+            else:
+                print(f"Chat job {job.id} was taken back from this worker; discarding its reply")
+    except Exception as e:
+        import traceback
+        print(f"Error running chat job {job.id}: {e}")
+        print(traceback.format_exc())
+        ours.update(status=ChatJob.FAILED, error=str(e), finished_at=timezone.now())
+
+    job.refresh_from_db()
+    return job
+
+
+def run_next(provider, worker=''):
+    """Claim and run one job; returns it, or None if nothing could be claimed."""
+    job = claim(provider, worker)
+    return run(job) if job else None
+
+
+def requeue_stale(timeout=None, max_attempts=None):
+    """
+    Put jobs whose worker died back in the queue, or fail them after
+    ``max_attempts``. Returns ``(requeued, failed)``.
+    """
+    timeout = timeout or getattr(settings, 'CHAT_JOB_TIMEOUT', DEFAULT_TIMEOUT)
+    max_attempts = max_attempts or getattr(settings, 'CHAT_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    now = timezone.now()
+    stale = ChatJob.objects.filter(status=ChatJob.RUNNING, started_at__lt=now - timedelta(seconds=timeout))
+
+    requeued = stale.filter(attempts__lt=max_attempts).update(status=ChatJob.QUEUED, started_at=None, worker='')
+    failed = stale.update(status=ChatJob.FAILED, error='Timed out', finished_at=now)
+    return requeued, failed
+
+
+def job_payload(job):
+    """Public representation of a job for the poll endpoint."""
+    return {
+        'job_id': str(job.id),
+        'status': job.status,
+        'session_id': job.session_id,
+        'response': job.response if job.status == ChatJob.DONE else None,
+        'message_id': job.assistant_message_id,
+        'error': job.error or None,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,200 @@
+"""
+Rate limits and a global concurrency cap for LLM-backed chat endpoints.
+
+Rate limits are token buckets kept in the Django cache: one per client IP
+(``CHAT_RATE_IP``) and one per signed-in user (``CHAT_RATE_USER``), given
+as ``"<requests>/<sec|min|hour|day>"``. A bucket holds up to ``requests``
+tokens and refills at that rate, so short bursts pass while the sustained
+rate stays capped. Each bucket is stored as a single "theoretical arrival
+time" (GCRA), so a check is one ``get_many`` and, when allowed, one
+``set_many``. That read and write happen under a short per-bucket lock
+taken with ``cache.add``, so concurrent requests cannot both spend the
+same token.
+
+``CHAT_MAX_IN_FLIGHT`` caps LLM calls running at once across all workers.
+Each call holds one of that many cache slots, taken with ``cache.add`` and
+expiring after ``LLM_SLOT_TIMEOUT`` so a crashed worker cannot leak one.
+Async views hold it with ``allm_slot``, which keeps those cache calls off
+the event loop.
+
+Over-limit requests get HTTP 429 with a ``Retry-After`` header.
+"""
+import math
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from apps.core.utils import get_client_ip
+
+BUCKET_KEY = 'chatbot:rate:{}'
+BUCKET_LOCK_KEY = 'chatbot:rate_lock:{}'
+BUCKET_LOCK_TIMEOUT = 2  # seconds; a check holds the lock for two cache calls
+BUCKET_LOCK_WAIT = 0.005  # seconds between attempts
+BUCKET_LOCK_ATTEMPTS = 200
+SLOT_KEY = 'chatbot:llm_slot:{}'
+LLM_SLOT_TIMEOUT = 5 * 60  # seconds; longer than any single generation
+BUSY_RETRY_AFTER = 1  # seconds
+UNLIMITED = 'unlimited'  # slot handle when the cap is off
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+class LLMBusy(Exception):
+    """Raised when ``CHAT_MAX_IN_FLIGHT`` LLM calls are already running."""
+
+    def __init__(self, retry_after=BUSY_RETRY_AFTER):
+        super().__init__('Too many chats in progress, please retry shortly.')
+        self.retry_after = retry_after
+
+
+def parse_rate(rate):
+    """``'20/min'`` -> ``(20, 60)``; None or empty disables the limit."""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def request_buckets(request, user):
+    """``[(cache key, rate)]`` that apply to ``request`` made by ``user``."""
+    buckets = []
+    ip_rate = parse_rate(getattr(settings, 'CHAT_RATE_IP', None))
+    if ip_rate:
+        buckets.append((BUCKET_KEY.format(f'ip:{get_client_ip(request)}'), ip_rate))
+    user_rate = parse_rate(getattr(settings, 'CHAT_RATE_USER', None))
+    if user_rate and user.is_authenticated:
+        buckets.append((BUCKET_KEY.format(f'user:{user.pk}'), user_rate))
+    return buckets
+
+
+@contextmanager
+def bucket_locks(keys):
+    """
+    Hold the lock of every bucket in ``keys``, taken in sorted order so two
+    checks sharing buckets cannot deadlock. Yields False if a lock stayed
+    busy for ``BUCKET_LOCK_ATTEMPTS`` tries.
+    """
+    held = []
+    try:
+        for key in sorted(keys):
+            lock = BUCKET_LOCK_KEY.format(key)
+            for _ in range(BUCKET_LOCK_ATTEMPTS):
+                if cache.add(lock, 1, BUCKET_LOCK_TIMEOUT):
+                    held.append(lock)
+                    break
+                time.sleep(BUCKET_LOCK_WAIT)
+            else:
+                yield False
+                return
+        yield True
+    finally:
+        cache.delete_many(held)
+
+
+def take(buckets, now=None):
+    """
+    Take one token from every bucket, or from none of them. Returns 0 if
+    the request may proceed, otherwise the seconds until it would.
+    """
+    if not buckets:
+        return 0
+    with bucket_locks([key for key, _ in buckets]) as locked:
+        if not locked:
+            return BUCKET_LOCK_TIMEOUT
+        return take_locked(buckets, time.time() if now is None else now)
+
+
+def take_locked(buckets, now):
+    """``take`` with the bucket locks held."""
+    stored = cache.get_many([key for key, _ in buckets])
+
+    updates, wait = {}, 0
+    for key, (count, period) in buckets:
+        interval = period / count
+        arrival = max(stored.get(key, now), now)
+        # A full bucket lets ``count`` requests through back to back
+        wait = max(wait, arrival - now - (period - interval))
+        updates[key] = arrival + interval
+
+    if wait > 0:
+        return wait
+    cache.set_many(updates, math.ceil(max(rate[1] for _, rate in buckets)))
+    return 0
+
+
+def check_rate(request, user=None):
+    """
+    Seconds ``request`` must wait under the chat rate limits (0 to proceed).
+    Plain Django requests pass the ``user`` they authenticated.
+    """
+    return take(request_buckets(request, user or request.user))
+
+
+def retry_after(wait):
+    """Whole seconds for a ``Retry-After`` header."""
+    return max(1, math.ceil(wait))
+
+
+class ChatRateThrottle(BaseThrottle):
+    """DRF throttle applying the per-IP and per-user chat token buckets."""
+
+    def allow_request(self, request, view):
+        self.wait_time = check_rate(request)
+        return not self.wait_time
+
+    def wait(self):
+        # DRF truncates the wait for the Retry-After header; never advertise 0
+        return retry_after(self.wait_time)
+
+
+def acquire_llm_slot():
+    """Take a free in-flight slot and return its handle, or None if all are taken."""
+    limit = getattr(settings, 'CHAT_MAX_IN_FLIGHT', 0)
+    if not limit:
+        return UNLIMITED
+    token = uuid.uuid4().hex
+    start = random.randrange(limit)  # Spread workers over the slots
+    for offset in range(limit):
+        key = SLOT_KEY.format((start + offset) % limit)
+        if cache.add(key, token, LLM_SLOT_TIMEOUT):
+            return key, token
+    return None
+
+
+def release_llm_slot(slot):
+    """Give back a slot from ``acquire_llm_slot``; it may already have expired."""
+    if slot is None or slot == UNLIMITED:
+        return
+    key, token = slot
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+@contextmanager
+def llm_slot():
+    """Hold an in-flight slot for the duration of an LLM call; raises ``LLMBusy`` if none is free."""
+    slot = acquire_llm_slot()
+    if slot is None:
+        raise LLMBusy()
+    try:
+        yield
+    finally:
+        release_llm_slot(slot)
+
+
+@asynccontextmanager
+async def allm_slot():
+    """Async ``llm_slot``; taking and releasing the slot run off the event loop."""
+    slot = await sync_to_async(acquire_llm_slot)()
+    if slot is None:
+        raise LLMBusy()
+    try:
+        yield
+    finally:
+        await sync_to_async(release_llm_slot)(slot)
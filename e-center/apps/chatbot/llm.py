@@ -0,0 +1,372 @@
+"""
+LLM provider backends.
+
+Every chat code path talks to the model through an ``LLMBackend``:
+
+* ``GeminiBackend`` calls Google Gemini through ``google.generativeai``,
+  reusing configured model clients from the process-wide ``model_registry``.
+* ``FakeBackend`` answers in-process with deterministic text, a
+  configurable latency and token rate, and optional failure injection, so
+  the chat stack can be tested and load-tested without network access.
+
+``get_backend()`` returns the backend named by the ``LLM_BACKEND`` setting
+(``'gemini'``, ``'fake'`` or a dotted path to a backend class).
+
+A conversation is passed as ``history`` (Gemini-style ``{"role", "parts"}``
+dicts, oldest first) plus the new user ``message``.
+"""
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import google.generativeai as genai
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+CONNECTION_TEST_PROMPT = "Hello, please respond with 'API is working' if you can receive this message."
+
+
+class LLMError(Exception):
+    """Raised by a backend when the provider call fails."""
+
+
+class LLMBackend:
+    """Interface shared by all LLM providers."""
+    name = None
+    fallback_model_name = None  # passed as ``model_name`` to hedge a slow call
+
+    def generate(self, history, message, **options):
+        """Return the full reply to ``message``."""
+        raise NotImplementedError
+
+    def stream(self, history, message, **options):
+        """Yield the reply to ``message`` in text chunks."""
+        raise NotImplementedError
+
+    async def agenerate(self, history, message, **options):
+        """Async ``generate`` that does not block the event loop."""
+        raise NotImplementedError
+
+    def health_check(self):
+        """Return the provider's answer to a trivial prompt."""
+        return self.generate([], CONNECTION_TEST_PROMPT)
+
+    async def ahealth_check(self):
+        return await self.agenerate([], CONNECTION_TEST_PROMPT)
+
+    def warm(self):
+        """Prepare clients ahead of the first request; nothing to do by default."""
+
+
+class ModelRegistry:
+    """
+    Process-wide, thread-safe cache of ``genai.GenerativeModel`` clients
+    keyed by (model name, generation config, safety settings).
+
+    ``genai.configure`` throws away every API client, so it runs once per
+    API key instead of once per request; models keep their client and its
+    connection between requests. A model whose calls fail
+    ``max_failures`` times in a row is dropped and rebuilt (with a fresh
+    client) on next use.
+    """
+    max_failures = 3
+
+    def __init__(self):
+        self._models = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._api_key = None
+
+    @staticmethod
+    def key(model_name, generation_config=None, safety_settings=None):
+        return (
+            model_name,
+            tuple(sorted((generation_config or {}).items())),
+            tuple(tuple(sorted(setting.items())) for setting in safety_settings or ()),
+        )
+
+    def get(self, model_name, generation_config=None, safety_settings=None):
+        """The model for this configuration, built on first use."""
+        key = self.key(model_name, generation_config, safety_settings)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    self._configure()
+                    model = genai.GenerativeModel(
+                        model_name=model_name,
+                        generation_config=generation_config,
+                        safety_settings=safety_settings,
+                    )
+                    self._models[key] = model
+        return key, model
+
+    def _configure(self):
+        api_key = settings.GEMINI_API_KEY
+        if api_key != self._api_key:
+            genai.configure(api_key=api_key)
+            self._api_key = api_key
+            self._models.clear()  # Their clients belong to the old configuration
+
+    @contextmanager
+    def track(self, key):
+        """Count a call's outcome against the model at ``key``."""
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                failures = self._failures[key] = self._failures.get(key, 0) + 1
+                if failures >= self.max_failures:
+                    self._models.pop(key, None)
+                    self._failures.pop(key, None)
+                    self._api_key = None  # Reconfigure for a fresh client
+            raise
+        else:
+            if self._failures.get(key):
+                with self._lock:
+                    self._failures.pop(key, None)
+
+    def check(self):
+        """
+        Ping every registered model with a token count (no generation) and
+        drop the ones that fail. Returns ``{model name: error or None}``.
+        """
+        results = {}
+        for key, model in list(self._models.items()):
+            results.setdefault(key[0], None)  # One entry per model name
+            try:
+                with self.track(key):
+                    model.count_tokens("ping")
+            except Exception as e:
+                with self._lock:
+                    self._models.pop(key, None)
+                    self._failures.pop(key, None)
+                results[key[0]] = str(e)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return [
+                {'model': key[0], 'failures': self._failures.get(key, 0)}
+                for key in self._models
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._failures.clear()
+            self._api_key = None
+
+
+model_registry = ModelRegistry()
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via ``google.generativeai``."""
+    name = 'gemini'
+
+    model_name = 'models/gemini-pro-latest'
+    fallback_model_name = 'models/gemini-2.5-flash'
+
+    generation_config = {
+        "temperature": 0.7,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 2048,
+    }
+
+    safety_settings = [
+        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    ]
+
+    def get_model(self, model_name=None, fallback_model_name=None, generation_config=None):
+        """
+        ``(key, model)`` from the registry, falling back to the fallback
+        model if the model cannot be created.
+        """
+        config = generation_config or self.generation_config
+        try:
+            return model_registry.get(model_name or self.model_name, config, self.safety_settings)
+        except Exception as model_error:
+            print(f"Error creating Gemini model: {model_error}")
+            return model_registry.get(fallback_model_name or self.fallback_model_name, config, self.safety_settings)
+
+    def warm(self):
+        """Build the default and fallback models, e.g. at worker start."""
+        model_registry.get(self.model_name, self.generation_config, self.safety_settings)
+        model_registry.get(self.fallback_model_name, self.generation_config, self.safety_settings)
+        model_registry.get(self.model_name)
+
+    def contents(self, history, message):
+        return list(history) + [{"role": "user", "parts": [message]}]
+
+    def generate(self, history, message, **options):
+        key, model = self.get_model(**options)
+        with model_registry.track(key):
+            return model.generate_content(self.contents(history, message)).text
+
+    def stream(self, history, message, **options):
+        key, model = self.get_model(**options)
+        with model_registry.track(key):
+            response = model.generate_content(self.contents(history, message), stream=True)
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    yield text
+
+    async def agenerate(self, history, message, **options):
+        key, model = self.get_model(**options)
+        with model_registry.track(key):
+            response = await model.generate_content_async(self.contents(history, message))
+        return response.text
+
+    def health_check(self):
+        key, model = model_registry.get(self.model_name)
+        with model_registry.track(key):
+            return model.generate_content(CONNECTION_TEST_PROMPT).text
+
+    async def ahealth_check(self):
+        key, model = model_registry.get(self.model_name)
+        with model_registry.track(key):
+            response = await model.generate_content_async(CONNECTION_TEST_PROMPT)
+        return response.text
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic in-process model. Replies wait ``latency`` seconds for the
+    first token, then emit ``tokens_per_second`` words per second. A seeded
+    ``failure_rate`` share of calls raise ``LLMError(failure_message)``.
+
+    Configured with the ``LLM_FAKE_LATENCY``, ``LLM_FAKE_TOKENS_PER_SECOND``,
+    ``LLM_FAKE_FAILURE_RATE``, ``LLM_FAKE_FAILURE_MESSAGE`` and
+    ``LLM_FAKE_SEED`` settings unless given explicitly.
+    """
+    name = 'fake'
+
+    def __init__(self, latency=None, tokens_per_second=None, failure_rate=None, failure_message=None, seed=None):
+        self.latency = latency if latency is not None else getattr(settings, 'LLM_FAKE_LATENCY', 0.0)
+        self.tokens_per_second = (
+            tokens_per_second if tokens_per_second is not None
+            else getattr(settings, 'LLM_FAKE_TOKENS_PER_SECOND', 0)
+        )
+        self.failure_rate = failure_rate if failure_rate is not None else getattr(settings, 'LLM_FAKE_FAILURE_RATE', 0.0)
+        self.failure_message = failure_message or getattr(
+            settings, 'LLM_FAKE_FAILURE_MESSAGE', 'Fake backend failure'
+        )
+        self._random = random.Random(seed if seed is not None else getattr(settings, 'LLM_FAKE_SEED', 0))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def reply(self, message):
+        """The canned answer to ``message``."""
+        words = message.split()
+        topic = ' '.join(words[-8:]) if words else 'that'
+        return f"Great question! Let's practise English together. You asked about: {topic}"
+
+    def tokens(self, message):
+        words = self.reply(message).split(' ')
+        return [word if index == 0 else ' ' + word for index, word in enumerate(words)]
+
+    def token_delay(self):
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def maybe_fail(self):
+        with self._lock:
+            self.calls += 1
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+        if failed:
+            raise LLMError(self.failure_message)
+
+    def _enter(self):
+        self.maybe_fail()
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def generate(self, history, message, **options):
+        self._enter()
+        try:
+            tokens = self.tokens(message)
+            time.sleep(self.latency + self.token_delay() * len(tokens))
+            return ''.join(tokens)
+        finally:
+            self._leave()
+
+    def stream(self, history, message, **options):
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            for index, token in enumerate(self.tokens(message)):
+                if index:
+                    time.sleep(self.token_delay())
+                yield token
+        finally:
+            self._leave()
+
+    async def agenerate(self, history, message, **options):
+        self._enter()
+        try:
+            tokens = self.tokens(message)
+            await asyncio.sleep(self.latency + self.token_delay() * len(tokens))
+            return ''.join(tokens)
+        finally:
+            self._leave()
+
+    def health_check(self):
+        self.maybe_fail()
+        return 'API is working (fake backend)'
+
+    async def ahealth_check(self):
+        return self.health_check()
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'fake': FakeBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend selected by ``settings.LLM_BACKEND``."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'LLM_BACKEND', 'gemini')
+                backend_class = BACKENDS[name] if name in BACKENDS else import_string(name)
+                _backend = backend_class()
+    return _backend
+
+
+def warm_backend():
+    """Build the configured backend's clients; called when the app registry is ready."""
+    try:
+        get_backend().warm()
+    except Exception as e:
+        print(f"Error warming LLM backend: {e}")
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    """Pick up ``override_settings`` changes to the LLM configuration."""
+    global _backend
+    if setting == 'LLM_BACKEND' or setting.startswith('LLM_FAKE_'):
+        _backend = None
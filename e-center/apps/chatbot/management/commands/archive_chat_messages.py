@@ -0,0 +1,87 @@
+"""
+Management command to move the messages of idle chat sessions into compressed archives.
+Usage: python manage.py archive_chat_messages [--idle-days DAYS] [--batch-size N] [--limit N] [--dry-run]
+
+Each batch of sessions is archived in its own transaction, so the command
+can be stopped at any point and run again to resume where it left off.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.chatbot.archive import DEFAULT_IDLE_DAYS, archive_sessions, idle_sessions
+
+
+class Command(BaseCommand):
+    help = 'Archive the messages of chat sessions idle for a number of days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-days',
+            type=int,
+            default=getattr(settings, 'CHAT_ARCHIVE_IDLE_DAYS', DEFAULT_IDLE_DAYS),
+            help='Archive sessions without messages for this many days (default: CHAT_ARCHIVE_IDLE_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Sessions archived per transaction (default: 100)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Stop after archiving this many sessions',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many sessions would be archived',
+        )
+
+    def handle(self, *args, **options):
+        candidates = idle_sessions(options['idle_days'])
+        total = candidates.count()
+        if options['limit'] is not None:
+            total = min(total, options['limit'])
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✓ No idle sessions to archive'))
+            return
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f"Dry run - {total} sessions idle for {options['idle_days']}+ days would be archived."
+            ))
+            return
+
+        done = messages = raw = stored = 0
+        last_id = 0
+        started = time.monotonic()
+        try:
+            while done < total:
+                batch = list(
+                    candidates.filter(id__gt=last_id).values_list('id', flat=True)[:min(options['batch_size'], total - done)]
+                )
+                if not batch:
+                    break
+                archived, raw_bytes, stored_bytes = archive_sessions(batch)
+                done += len(batch)
+                messages += archived
+                raw += raw_bytes
+                stored += stored_bytes
+                last_id = batch[-1]
+                rate = done / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'  [{done}/{total}] {done * 100 // total}% - {messages} messages archived, '
+                    f'{raw / 1024:.0f} KB -> {stored / 1024:.0f} KB, {rate:.1f} sessions/s'
+                )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Interrupted after {done} sessions; run the command again to resume.'
+            ))
+            return
+
+        ratio = f' ({raw / stored:.1f}x smaller)' if stored else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Archived {messages} messages from {done} sessions{ratio}'
+        ))
@@ -0,0 +1,95 @@
+"""
+Management command to recompute the message counters stored on chat sessions.
+Usage: python manage.py backfill_session_activity [--user-id USER_ID] [--batch-size N] [--dry-run]
+
+``ChatSession.message_count``, ``last_message_at`` and
+``last_message_preview`` are kept up to date as turns are stored; this
+recomputes them from ``ChatMessage`` and ``ChatArchive`` (e.g. after
+messages were added or deleted in the admin) and reports the sessions that
+had drifted.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Left
+
+from apps.chatbot.models import PREVIEW_LENGTH, ChatArchive, ChatMessage, ChatSession
+
+ACTIVITY_FIELDS = ['message_count', 'last_message_at', 'last_message_preview']
+
+
+def with_fresh_activity(queryset):
+    """
+    Annotate each session with its counters as computed from its messages,
+    hot and archived. A fully archived session keeps its stored preview.
+    """
+    messages = ChatMessage.objects.filter(session=OuterRef('pk'))
+    newest = messages.order_by('-created_at', '-id')
+    archive = ChatArchive.objects.filter(session=OuterRef('pk'))
+    kept_preview = Case(When(archived_through__gt=0, then=F('last_message_preview')), default=Value(''))
+    return queryset.annotate(
+        fresh_count=(
+            Coalesce(Subquery(messages.order_by().values('session').annotate(n=Count('id')).values('n')), 0)
+            + Coalesce(Subquery(archive.values('message_count')), 0)
+        ),
+        fresh_at=Coalesce(Subquery(newest.values('created_at')[:1]), Subquery(archive.values('last_message_at'))),
+        fresh_preview=Coalesce(Left(Subquery(newest.values('content')[:1]), PREVIEW_LENGTH + 1), kept_preview),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recompute message counts and last-message previews stored on chat sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Only backfill sessions of this user',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Sessions read and updated per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without saving the recomputed counters',
+        )
+
+    def handle(self, *args, **options):
+        queryset = ChatSession.objects.order_by('id')
+        if options['user_id']:
+            queryset = queryset.filter(user_id=options['user_id'])
+
+        checked = drifted = 0
+        batch = []
+        for session in with_fresh_activity(queryset).iterator(chunk_size=options['batch_size']):
+            checked += 1
+            fresh = (session.fresh_count, session.fresh_at, session.fresh_preview)
+            if fresh == (session.message_count, session.last_message_at, session.last_message_preview):
+                continue
+            drifted += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'   session {session.id}: {session.message_count} -> {session.fresh_count} messages')
+            session.message_count, session.last_message_at, session.last_message_preview = fresh
+            batch.append(session)
+            if len(batch) >= options['batch_size']:
+                self.save(batch, options['dry_run'])
+                batch = []
+        self.save(batch, options['dry_run'])
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f'✓ {checked} sessions in sync'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️  {drifted} of {checked} sessions had drifted'))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - no changes saved.'))
+        elif drifted:
+            self.stdout.write(self.style.SUCCESS('Session activity backfilled!'))
+
+    def save(self, sessions, dry_run):
+        if sessions and not dry_run:
+            # bulk_update leaves updated_at alone, so session order is kept
+            ChatSession.objects.bulk_update(sessions, ACTIVITY_FIELDS)
@@ -0,0 +1,94 @@
+"""
+Load benchmark for the async chat views against a fake, fixed-latency LLM.
+Usage: python manage.py benchmark_async_chat [--concurrency 200] [--latency 1.0] [--endpoint simple-chat|chat] [--sync-workers 4]
+
+Fires ``--concurrency`` requests at once through Django's ASGI request
+handler and reports wall time and the peak number of LLM calls in flight.
+With ``--sync-workers`` the same load is also pushed through the DRF
+endpoint with that many threads, which is what a gunicorn sync deployment
+can serve concurrently.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from apps.chatbot.llm import get_backend
+from apps.chatbot.models import ChatSession
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent chats through the async views with a fake LLM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=200, help='Requests in flight at once')
+        parser.add_argument('--latency', type=float, default=1.0, help='Fake LLM latency in seconds')
+        parser.add_argument(
+            '--endpoint',
+            choices=['simple-chat', 'chat'],
+            default='simple-chat',
+            help='Which chat endpoint to load',
+        )
+        parser.add_argument(
+            '--sync-workers',
+            type=int,
+            default=0,
+            help='Also run the load through the sync DRF endpoint with this many worker threads',
+        )
+
+    def handle(self, *args, **options):
+        concurrency, latency = options['concurrency'], options['latency']
+        endpoint = options['endpoint']
+        payload = {'message': 'How do I use the present perfect?'}
+
+        # Every request comes from one client, so the chat rate limits and in-flight cap are off
+        with override_settings(
+            LLM_BACKEND='fake', LLM_FAKE_LATENCY=latency, LLM_FAKE_FAILURE_RATE=0,
+            CHAT_RATE_IP='', CHAT_RATE_USER='', CHAT_MAX_IN_FLIGHT=0,
+        ):
+            elapsed, responses = asyncio.run(self.run_async(f'/api/v1/chat/async/{endpoint}/', payload, concurrency))
+            self.report('async view', concurrency, latency, elapsed, responses)
+
+            if options['sync_workers']:
+                get_backend().peak_in_flight = 0
+                elapsed, responses = self.run_sync(
+                    f'/api/v1/chat/sessions/{endpoint}/', payload, concurrency, options['sync_workers']
+                )
+                self.report(f"sync view, {options['sync_workers']} workers", concurrency, latency, elapsed, responses)
+
+        if endpoint == 'chat':
+            # Drop the sessions the benchmark created
+            ChatSession.objects.filter(
+                id__in=[response.json()['session_id'] for response in responses if response.status_code == 200]
+            ).delete()
+
+    async def run_async(self, url, payload, concurrency):
+        client = AsyncClient()
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post(url, payload, content_type='application/json')
+            for _ in range(concurrency)
+        ])
+        return time.perf_counter() - started, responses
+
+    def run_sync(self, url, payload, concurrency, workers):
+        def post(_):
+            return Client().post(url, payload, content_type='application/json')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            responses = list(pool.map(post, range(concurrency)))
+        return time.perf_counter() - started, responses
+
+    def report(self, label, concurrency, latency, elapsed, responses):
+        ok = sum(response.status_code == 200 for response in responses)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {label}: {ok}/{concurrency} ok in {elapsed:.2f}s '
+            f'(LLM latency {latency:.2f}s, peak in-flight {get_backend().peak_in_flight}, '
+            f'{ok / elapsed:.0f} chats/s)'
+        ))
+        if ok < concurrency:
+            self.stdout.write(self.style.WARNING(f'⚠️  {concurrency - ok} requests failed'))
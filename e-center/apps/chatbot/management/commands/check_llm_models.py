@@ -0,0 +1,34 @@
+"""
+Health check for the Gemini model clients a worker builds at boot.
+Usage: python manage.py check_llm_models
+
+Warms the configured backend, then pings every registered model with a
+token count. Exits non-zero if any model is unreachable, so it can serve
+as a container health probe.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chatbot.llm import get_backend, model_registry
+
+
+class Command(BaseCommand):
+    help = 'Check that the configured Gemini models are reachable'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.warm()
+        if backend.name != 'gemini':
+            self.stdout.write(self.style.SUCCESS(f'✓ {backend.name} backend has no remote models to check'))
+            return
+
+        results = model_registry.check()
+        for model_name, error in results.items():
+            if error:
+                self.stdout.write(self.style.WARNING(f'⚠️  {model_name}: {error}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {model_name}'))
+
+        failed = sum(1 for error in results.values() if error)
+        if failed:
+            raise CommandError(f'{failed} of {len(results)} models are unreachable')
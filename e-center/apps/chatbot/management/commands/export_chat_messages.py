@@ -0,0 +1,99 @@
+"""
+Management command to stream chat messages to an NDJSON file for analytics.
+Usage: python manage.py export_chat_messages [--output PATH] [--gzip] [--since DATE] [--until DATE] [--user-id USER_ID] [--focus FOCUS]
+
+Rows are read with a database iterator and written as they arrive, so
+memory stays flat for any number of messages. Archived sessions are
+included. With ``--output -`` (the default) the export goes to stdout and
+the summary to stderr.
+"""
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chatbot.export import export_filters, export_records, ndjson_chunks
+from apps.chatbot.models import ChatSession
+
+PROGRESS_EVERY = 100000  # messages between progress lines
+
+
+class Command(BaseCommand):
+    help = 'Export chat messages as NDJSON (optionally gzipped) without loading them into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='-',
+            help='File to write, or - for stdout (default: -)',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Gzip the output',
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only messages created at or after this ISO date/datetime',
+        )
+        parser.add_argument(
+            '--until',
+            type=str,
+            help='Only messages created before this ISO date/datetime',
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Only messages of this user',
+        )
+        parser.add_argument(
+            '--focus',
+            type=str,
+            choices=[choice for choice, _ in ChatSession.FOCUS_CHOICES],
+            help='Only messages of sessions with this learning focus',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            filters = export_filters(options['since'], options['until'], options['user_id'], options['focus'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        to_stdout = options['output'] == '-'
+        # Keep stdout clean for the data when exporting to it
+        log = self.stderr if to_stdout else self.stdout
+        target = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        stream = gzip.GzipFile(fileobj=target, mode='wb') if options['gzip'] else target
+
+        started = time.monotonic()
+        exported = 0
+
+        def counted(records):
+            nonlocal exported
+            for row in records:
+                exported += 1
+                if exported % PROGRESS_EVERY == 0:
+                    log.write(f'  {exported} messages exported, {exported / (time.monotonic() - started):.0f}/s')
+                yield row
+
+        try:
+            for chunk in ndjson_chunks(counted(export_records(**filters))):
+                stream.write(chunk)
+        except KeyboardInterrupt:
+            log.write(self.style.WARNING(f'⚠️  Interrupted after {exported} messages; the output is incomplete.'))
+            return
+        finally:
+            if stream is not target:
+                stream.close()
+            if to_stdout:
+                target.flush()
+            else:
+                target.close()
+
+        destination = 'stdout' if to_stdout else options['output']
+        log.write(self.style.SUCCESS(
+            f'✓ Exported {exported} messages to {destination} in {time.monotonic() - started:.1f}s'
+        ))
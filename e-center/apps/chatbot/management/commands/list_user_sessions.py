@@ -5,7 +5,7 @@ Usage: python manage.py list_user_sessions [--user-id USER_ID] [--recent DAYS] [
 
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from apps.chatbot.models import ChatSession, ChatMessage
+from apps.chatbot.models import ChatSession
 from django.utils import timezone
 from datetime import timedelta
 import json
@@ -53,7 +53,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         try:
             # Build queryset
-            queryset = ChatSession.objects.select_related('user').prefetch_related('messages')
+            queryset = ChatSession.objects.select_related('user')
             
             # Apply filters
             if options['user_id']:
@@ -67,7 +67,7 @@ class Command(BaseCommand):
                 queryset = queryset.filter(updated_at__gte=since_date)
                 
             if options['active_only']:
-                queryset = queryset.filter(messages__isnull=False).distinct()
+                queryset = queryset.filter(message_count__gt=0)
             
             # Order by most recent
             queryset = queryset.order_by('-updated_at')
@@ -77,7 +77,7 @@ class Command(BaseCommand):
             total_messages = 0
             
             for session in queryset:
-                message_count = session.messages.count()
+                message_count = session.message_count
                 total_messages += message_count
                 
                 session_data = {
@@ -94,11 +94,10 @@ class Command(BaseCommand):
                 }
                 
                 if options['include_messages'] and message_count > 0:
-                    latest_message = session.messages.order_by('-created_at').first()
+                    # Stored on the session; no query per row
                     session_data['latest_message'] = {
-                        'role': latest_message.role,
-                        'content': latest_message.content[:100] + ('...' if len(latest_message.content) > 100 else ''),
-                        'created_at': latest_message.created_at,
+                        'content': session.last_message_excerpt + ('...' if session.last_message_truncated else ''),
+                        'created_at': session.last_message_at,
                     }
                 
                 sessions_data.append(session_data)
@@ -145,7 +144,7 @@ class Command(BaseCommand):
             
             if include_messages and 'latest_message' in session:
                 latest = session['latest_message']
-                self.stdout.write(f"      └─ Latest ({latest['role']}): {latest['content']}")
+                self.stdout.write(f"      └─ Latest: {latest['content']}")
                 self.stdout.write("")
 
     def output_json(self, sessions_data, total_messages):
@@ -177,7 +176,6 @@ class Command(BaseCommand):
             
             if 'latest_message' in session:
                 session_output['latest_message'] = {
-                    'role': session['latest_message']['role'],
                     'content': session['latest_message']['content'],
                     'created_at': session['latest_message']['created_at'].isoformat()
                 }
@@ -198,7 +196,7 @@ class Command(BaseCommand):
                  'Learning Focus', 'Message Count', 'Created At', 'Updated At']
         
         if any('latest_message' in session for session in sessions_data):
-            header.extend(['Latest Message Role', 'Latest Message Content', 'Latest Message Time'])
+            header.extend(['Latest Message Content', 'Latest Message Time'])
             
         writer.writerow(header)
         
@@ -220,11 +218,10 @@ class Command(BaseCommand):
             if 'latest_message' in session:
                 latest = session['latest_message']
                 row.extend([
-                    latest['role'],
                     latest['content'],
                     latest['created_at'].isoformat()
                 ])
             elif any('latest_message' in s for s in sessions_data):
-                row.extend(['', '', ''])
+                row.extend(['', ''])
                 
             writer.writerow(row)
\ No newline at end of file
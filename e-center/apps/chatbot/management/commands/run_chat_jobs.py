@@ -0,0 +1,88 @@
+"""
+Worker pool for queued chat turns (``POST /api/v1/chat/sessions/chat/?job=1``).
+Usage: python manage.py run_chat_jobs [--workers 4] [--provider gemini] [--poll 0.5] [--once]
+
+Each worker thread claims the next fair job for the provider, runs the
+turn and stores the reply. Jobs left running by a crashed worker are put
+back in the queue after CHAT_JOB_TIMEOUT seconds.
+"""
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.chatbot.jobs import provider_limit, requeue_stale, run_next, worker_name
+from apps.chatbot.llm import get_backend
+
+STALE_CHECK_INTERVAL = 30  # seconds
+
+
+class Command(BaseCommand):
+    help = 'Run background workers for queued chat turns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker threads (default: the provider concurrency limit)')
+        parser.add_argument('--provider', default=None, help='Provider to serve (default: LLM_BACKEND)')
+        parser.add_argument('--poll', type=float, default=0.5, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        provider = options['provider'] or get_backend().name
+        workers = options['workers'] or provider_limit(provider)
+        self.stop = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+
+        requeued, failed = requeue_stale()
+        if requeued or failed:
+            self.stdout.write(self.style.WARNING(f'⚠️  Requeued {requeued} and failed {failed} stale jobs'))
+
+        self.stdout.write(f'Serving {provider} jobs with {workers} workers...')
+        threads = [
+            threading.Thread(target=self.work, args=(provider, options), name=f'chat-job-{index}', daemon=True)
+            for index in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            last_check = time.monotonic()
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.2)
+                if not options['once'] and time.monotonic() - last_check > STALE_CHECK_INTERVAL:
+                    requeue_stale()
+                    last_check = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the running jobs finish...')
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {self.processed} jobs'))
+
+    def work(self, provider, options):
+        worker = worker_name()
+        try:
+            while not self.stop.is_set():
+                try:
+                    job = run_next(provider, worker)
+                except Exception as e:
+                    # E.g. a busy database; the job, if any, stays queued
+                    self.stderr.write(f'Error claiming a job ({worker}): {e}')
+                    self.stop.wait(options['poll'])
+                    continue
+                if job is None:
+                    if options['once']:
+                        return
+                    self.stop.wait(options['poll'])
+                    continue
+
+                with self.lock:
+                    self.processed += 1
+                style = self.style.SUCCESS if job.status == job.DONE else self.style.WARNING
+                self.stdout.write(style(f'{job.status}: job {job.id} ({worker})'))
+        finally:
+            connection.close()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0005_remove_chatmessage_chatbot_cha_session_24e989_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_through',
+            field=models.BigIntegerField(default=0, help_text='ID of the last message folded into the summary'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0006_chatsession_summary'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={'ordering': ['created_at', 'id']},
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Left
+
+BATCH_SIZE = 500
+
+
+def backfill_session_activity(apps, schema_editor):
+    ChatSession = apps.get_model('chatbot', 'ChatSession')
+    ChatMessage = apps.get_model('chatbot', 'ChatMessage')
+    messages = ChatMessage.objects.filter(session=OuterRef('pk'))
+    newest = messages.order_by('-created_at', '-id')
+    sessions = ChatSession.objects.annotate(
+        count=Coalesce(Subquery(messages.order_by().values('session').annotate(n=Count('id')).values('n')), 0),
+        newest_at=Subquery(newest.values('created_at')[:1]),
+        newest_preview=Coalesce(Left(Subquery(newest.values('content')[:1]), 100), models.Value('')),
+    ).filter(count__gt=0)
+
+    batch = []
+    for session in sessions.iterator(chunk_size=BATCH_SIZE):
+        session.message_count = session.count
+        session.last_message_at = session.newest_at
+        session.last_message_preview = session.newest_preview
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            ChatSession.objects.bulk_update(batch, ['message_count', 'last_message_at', 'last_message_preview'])
+            batch = []
+    ChatSession.objects.bulk_update(batch, ['message_count', 'last_message_at', 'last_message_preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0009_chatmessage_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', '-updated_at'], name='chat_session_user_recent'),
+        ),
+        migrations.RunPython(backfill_session_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0010_chat_session_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatArchive',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='chatbot.chatsession')),
+                ('codec', models.CharField(default='zlib', max_length=10)),
+                ('data', models.BinaryField()),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('raw_size', models.PositiveIntegerField(default=0, help_text='Size of the uncompressed JSON in bytes')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='archived_through',
+            field=models.BigIntegerField(default=0, help_text='ID of the last message moved to the archive'),
+        ),
+    ]
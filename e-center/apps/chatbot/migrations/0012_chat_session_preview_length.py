@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:56
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Left, Length
+
+
+def extend_full_previews(apps, schema_editor):
+    # Only previews cut at the old length may hide a longer message
+    ChatSession = apps.get_model('chatbot', 'ChatSession')
+    ChatMessage = apps.get_model('chatbot', 'ChatMessage')
+    newest = ChatMessage.objects.filter(session=OuterRef('pk')).order_by('-created_at', '-id')
+    ChatSession.objects.annotate(preview_length=Length('last_message_preview')).filter(preview_length=100).update(
+        last_message_preview=Coalesce(Left(Subquery(newest.values('content')[:1]), 101), F('last_message_preview')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0011_chat_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatsession',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=101),
+        ),
+        migrations.RunPython(extend_full_previews, migrations.RunPython.noop),
+    ]
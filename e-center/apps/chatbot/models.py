@@ -1,6 +1,12 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from apps.users.models import User
 
+PREVIEW_LENGTH = 100  # characters of the newest message shown in session lists
+
 
 class ChatSession(models.Model):
     """A session for chat conversations with Gemini AI."""
@@ -25,14 +31,58 @@ class ChatSession(models.Model):
     title = models.CharField(max_length=255, default="New Chat")
     proficiency_level = models.CharField(max_length=20, choices=PROFICIENCY_CHOICES, default='intermediate')
     learning_focus = models.CharField(max_length=20, choices=FOCUS_CHOICES, default='general')
+    # Rolling summary of the turns that no longer fit the history window
+    summary = models.TextField(blank=True, default='')
+    summary_through = models.BigIntegerField(default=0, help_text="ID of the last message folded into the summary")
+    # Kept up to date by ``add_messages``; reconcile with ``manage.py backfill_session_activity``
+    message_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # One character more than is shown, to tell whether the message was cut
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH + 1, blank=True, default='')
+    # Messages up to this ID live in the session's ChatArchive (see ``apps.chatbot.archive``)
+    archived_through = models.BigIntegerField(default=0, help_text="ID of the last message moved to the archive")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
 
+    @property
+    def last_message_excerpt(self):
+        """The first ``PREVIEW_LENGTH`` characters of the newest message."""
+        return self.last_message_preview[:PREVIEW_LENGTH]
+
+    @property
+    def last_message_truncated(self):
+        """Whether the newest message is longer than its excerpt."""
+        return len(self.last_message_preview) > PREVIEW_LENGTH
+
+    def add_messages(self, messages, update_fields=()):
+        """
+        Insert ``messages`` (oldest first) and, in the same transaction and
+        one UPDATE, bump the session's message count, record the newest
+        message and save ``update_fields``. Returns the inserted messages.
+        """
+        with transaction.atomic():
+            messages = ChatMessage.objects.bulk_create(messages)
+            newest = messages[-1]
+            self.updated_at = timezone.now()
+            self.last_message_at = newest.created_at
+            self.last_message_preview = newest.content[:PREVIEW_LENGTH + 1]
+            fields = [*update_fields, 'updated_at', 'last_message_at', 'last_message_preview']
+            ChatSession.objects.filter(pk=self.pk).update(
+                message_count=F('message_count') + len(messages),
+                **{field: getattr(self, field) for field in fields},
+            )
+        self.message_count += len(messages)  # Other writers may have added more meanwhile
+        return messages
+
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Session lists: one user's sessions, most recent first
+            models.Index(fields=['user', '-updated_at'], name='chat_session_user_recent'),
+        ]
 
 
 class ChatMessage(models.Model):
@@ -51,4 +101,75 @@ class ChatMessage(models.Model):
         return f"{self.role}: {self.content[:50]}..."
     
     class Meta:
-        ordering = ['created_at']
\ No newline at end of file
+        # Messages of one turn are bulk-created with near-identical timestamps
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Keyset pagination and history windows walk (created_at, id) per session
+            models.Index(fields=['session', 'created_at', 'id'], name='chat_message_keyset'),
+        ]
+
+class ChatArchive(models.Model):
+    """
+    A session's archived messages: one compressed JSON blob holding the
+    messages moved out of ``ChatMessage`` once the session went idle.
+    """
+    session = models.OneToOneField(ChatSession, on_delete=models.CASCADE, primary_key=True, related_name='archive')
+    codec = models.CharField(max_length=10, default='zlib')
+    data = models.BinaryField()
+    message_count = models.PositiveIntegerField(default=0)
+    raw_size = models.PositiveIntegerField(default=0, help_text="Size of the uncompressed JSON in bytes")
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Archive of session {self.session_id} ({self.message_count} messages)"
+
+
+class ChatJob(models.Model):
+    """A chat turn queued for a background worker (see ``apps.chatbot.jobs``)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_jobs')
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='jobs')
+    message = models.TextField()
+    new_session = models.BooleanField(default=False)
+    provider = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Concurrency slot held while running; unique per provider among running jobs
+    slot = models.PositiveSmallIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    response = models.TextField(blank=True)
+    assistant_message = models.ForeignKey(
+        ChatMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.status}: {self.message[:50]}"
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['provider', 'status', 'user', 'created_at'], name='chat_job_queue'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'slot'],
+                condition=models.Q(status='running'),
+                name='chat_job_running_slot',
+            ),
+        ]
@@ -0,0 +1,349 @@
+"""
+Circuit breaker and hedged requests around LLM calls.
+
+Chat code generates through ``guarded_generate``, ``aguarded_generate`` and
+``guarded_stream`` instead of calling the backend directly:
+
+* A ``CircuitBreaker`` per backend counts calls, errors and slow calls
+  (over ``LLM_CIRCUIT_SLOW_CALL`` seconds) in the Django cache, so every
+  worker shares one view of the provider. Once at least
+  ``LLM_CIRCUIT_MIN_CALLS`` calls in the last two ``LLM_CIRCUIT_WINDOW``
+  buckets show an error share of ``LLM_CIRCUIT_ERROR_RATE`` or a slow share
+  of ``LLM_CIRCUIT_SLOW_RATE``, the circuit opens: calls raise
+  ``CircuitOpen`` at once and callers answer with their usual apology.
+* After ``LLM_CIRCUIT_COOLDOWN`` seconds the circuit is half-open: one
+  worker runs ``test_gemini_connection`` as a probe and closes the circuit
+  if it succeeds or reopens it if not, while the others keep failing fast.
+* With ``LLM_HEDGE`` on, a call still running after this worker's p95
+  latency is raced against the same request to the backend's fallback
+  model (``gemini-2.5-flash`` for Gemini); the first reply wins. The hedge
+  holds its own ``CHAT_MAX_IN_FLIGHT`` slot until it finishes, so hedging
+  never pushes the provider past the cap; with no slot free the call is
+  simply not hedged.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .limits import acquire_llm_slot, release_llm_slot
+from .llm import LLMError, get_backend
+
+CIRCUIT_KEY = 'chatbot:circuit:{}:{}'
+PROBE_TIMEOUT = 60  # seconds a probe may take before another worker tries
+HEDGE_WORKERS = 64
+LATENCY_SAMPLES = 200
+
+DEFAULT_ERROR_RATE = 0.5
+DEFAULT_SLOW_RATE = 0.5
+DEFAULT_SLOW_CALL = 15.0  # seconds
+DEFAULT_MIN_CALLS = 10
+DEFAULT_WINDOW = 60  # seconds
+DEFAULT_COOLDOWN = 30  # seconds
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+
+hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='llm-hedge')
+
+
+class CircuitOpen(LLMError):
+    """Raised instead of calling a provider that is currently failing."""
+
+    def __init__(self):
+        super().__init__('The AI provider is failing; calls are skipped until it recovers.')
+
+
+class CircuitBreaker:
+    """Error-rate and slow-call circuit breaker for one backend, kept in the cache."""
+
+    def __init__(self, name):
+        self.name = name
+        self.window = getattr(settings, 'LLM_CIRCUIT_WINDOW', DEFAULT_WINDOW)
+
+    def key(self, part):
+        return CIRCUIT_KEY.format(self.name, part)
+
+    def counter_keys(self, bucket):
+        return [self.key(f'{bucket}:{field}') for field in ('calls', 'errors', 'slow')]
+
+    def bucket(self, now=None):
+        return int((time.time() if now is None else now) // self.window)
+
+    def state(self, now=None):
+        """``'closed'``, ``'open'`` or ``'half-open'``."""
+        open_until = cache.get(self.key('open_until'))
+        if open_until is None:
+            return 'closed'
+        return 'open' if (time.time() if now is None else now) < open_until else 'half-open'
+
+    def before_call(self):
+        """
+        Raise ``CircuitOpen`` if the call must not go out. Returns True if
+        this caller should run the half-open probe first.
+        """
+        state = self.state()
+        if state == 'closed':
+            return False
+        if state == 'half-open' and cache.add(self.key('probe'), 1, PROBE_TIMEOUT):
+            return True
+        raise CircuitOpen()
+
+    def after_probe(self, result):
+        """Close the circuit if the probe got an answer, otherwise reopen it."""
+        cache.delete(self.key('probe'))
+        if result.startswith('Connection failed'):
+            self.trip()
+            raise CircuitOpen()
+        self.close()
+
+    def allow(self):
+        """Raise ``CircuitOpen`` unless the call may go out, probing when half-open."""
+        if self.before_call():
+            from .utils import test_gemini_connection
+            self.after_probe(test_gemini_connection())
+
+    async def aallow(self):
+        """Async ``allow``."""
+        if self.before_call():
+            from .utils import atest_gemini_connection
+            self.after_probe(await atest_gemini_connection())
+
+    def record(self, duration, failed=False):
+        """Count a finished call; may open the circuit."""
+        bucket = self.bucket()
+        calls, errors, slow = self.counter_keys(bucket)
+        is_slow = duration > getattr(settings, 'LLM_CIRCUIT_SLOW_CALL', DEFAULT_SLOW_CALL)
+        self.incr(calls)
+        if failed:
+            self.incr(errors)
+        if is_slow:
+            self.incr(slow)
+        if failed or is_slow:
+            self.evaluate(bucket)
+
+    def incr(self, key):
+        # Two windows of history are read, so keep counters for a bit longer
+        if not cache.add(key, 1, self.window * 2 + 1):
+            try:
+                cache.incr(key)
+            except ValueError:  # Expired between add and incr
+                cache.set(key, 1, self.window * 2 + 1)
+
+    def counts(self, bucket=None):
+        """``(calls, errors, slow)`` over the current and previous window."""
+        bucket = self.bucket() if bucket is None else bucket
+        keys = self.counter_keys(bucket) + self.counter_keys(bucket - 1)
+        values = cache.get_many(keys)
+        totals = [values.get(key, 0) for key in keys]
+        return tuple(totals[index] + totals[index + 3] for index in range(3))
+
+    def evaluate(self, bucket):
+        calls, errors, slow = self.counts(bucket)
+        if calls < getattr(settings, 'LLM_CIRCUIT_MIN_CALLS', DEFAULT_MIN_CALLS):
+            return
+        if (errors / calls >= getattr(settings, 'LLM_CIRCUIT_ERROR_RATE', DEFAULT_ERROR_RATE)
+                or slow / calls >= getattr(settings, 'LLM_CIRCUIT_SLOW_RATE', DEFAULT_SLOW_RATE)):
+            self.trip()
+
+    def trip(self):
+        """Open the circuit for ``LLM_CIRCUIT_COOLDOWN`` seconds."""
+        cooldown = getattr(settings, 'LLM_CIRCUIT_COOLDOWN', DEFAULT_COOLDOWN)
+        print(f"LLM circuit for {self.name} opened for {cooldown}s")
+        cache.set(self.key('open_until'), time.time() + cooldown, None)
+
+    def close(self):
+        """Close the circuit and forget the failures that opened it."""
+        bucket = self.bucket()
+        cache.delete_many(
+            [self.key('open_until'), self.key('probe')] + self.counter_keys(bucket) + self.counter_keys(bucket - 1)
+        )
+
+    def stats(self):
+        calls, errors, slow = self.counts()
+        return {'backend': self.name, 'state': self.state(), 'calls': calls, 'errors': errors, 'slow': slow}
+
+
+class LatencyTracker:
+    """Recent successful call latencies per backend in this process."""
+
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.size = size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.size)).append(seconds)
+
+    def p95(self, name):
+        """The 95th percentile latency, or None until there are enough samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if len(samples) < getattr(settings, 'LLM_HEDGE_MIN_SAMPLES', DEFAULT_HEDGE_MIN_SAMPLES):
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+latencies = LatencyTracker()
+
+
+def hedge_delay(backend):
+    """Seconds to wait before hedging a call to ``backend``, or None to never hedge."""
+    if not getattr(settings, 'LLM_HEDGE', False) or not backend.fallback_model_name:
+        return None
+    return latencies.p95(backend.name)
+
+
+def timed(backend, call, *args, **options):
+    """Run ``call`` and add its latency to the tracker if it succeeds."""
+    started = time.monotonic()
+    result = call(*args, **options)
+    latencies.add(backend.name, time.monotonic() - started)
+    return result
+
+
+async def atimed(backend, call, *args, **options):
+    started = time.monotonic()
+    result = await call(*args, **options)
+    latencies.add(backend.name, time.monotonic() - started)
+    return result
+
+
+def slotted(slot, call, *args, **options):
+    """Run ``call`` and then give back the in-flight ``slot`` it was holding."""
+    try:
+        return call(*args, **options)
+    finally:
+        release_llm_slot(slot)
+
+
+async def aslotted(slot, call, *args, **options):
+    try:
+        return await call(*args, **options)
+    finally:
+        await sync_to_async(release_llm_slot)(slot)
+
+
+def hedged_generate(backend, history, message, **options):
+    """``backend.generate``, raced against the fallback model once it runs past p95."""
+    delay = hedge_delay(backend)
+    if delay is None:
+        return timed(backend, backend.generate, history, message, **options)
+
+    primary = hedge_executor.submit(timed, backend, backend.generate, history, message, **options)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    slot = acquire_llm_slot()
+    if slot is None:
+        return primary.result()  # Every slot is busy; a hedge would exceed the cap
+
+    hedge = hedge_executor.submit(
+        slotted, slot, backend.generate, history, message,
+        **{**options, 'model_name': backend.fallback_model_name}
+    )
+    pending, error = {primary, hedge}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()  # The other call finishes in the background
+            error = future.exception()
+    raise error
+
+
+async def ahedged_generate(backend, history, message, **options):
+    """Async ``hedged_generate``; the losing call is cancelled."""
+    delay = hedge_delay(backend)
+    if delay is None:
+        return await atimed(backend, backend.agenerate, history, message, **options)
+
+    primary = asyncio.ensure_future(atimed(backend, backend.agenerate, history, message, **options))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+    slot = await sync_to_async(acquire_llm_slot)()
+    if slot is None:
+        return await primary
+
+    hedge = asyncio.ensure_future(aslotted(
+        slot, backend.agenerate, history, message,
+        **{**options, 'model_name': backend.fallback_model_name}
+    ))
+    pending, error = {primary, hedge}, None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def guarded_generate(history, message, **options):
+    """``get_backend().generate`` behind the circuit breaker, hedged if enabled."""
+    backend = get_backend()
+    breaker = CircuitBreaker(backend.name)
+    breaker.allow()
+    started = time.monotonic()
+    try:
+        reply = hedged_generate(backend, history, message, **options)
+    except Exception:
+        breaker.record(time.monotonic() - started, failed=True)
+        raise
+    breaker.record(time.monotonic() - started)
+    return reply
+
+
+async def aguarded_generate(history, message, **options):
+    """Async ``guarded_generate``."""
+    backend = get_backend()
+    breaker = CircuitBreaker(backend.name)
+    await breaker.aallow()
+    started = time.monotonic()
+    try:
+        reply = await ahedged_generate(backend, history, message, **options)
+    except Exception:
+        breaker.record(time.monotonic() - started, failed=True)
+        raise
+    breaker.record(time.monotonic() - started)
+    return reply
+
+
+def guarded_stream(history, message, **options):
+    """
+    ``get_backend().stream`` behind the circuit breaker. The call counts as
+    slow by its time to first chunk, and as failed only if it fails before
+    producing any text. Streams are not hedged.
+    """
+    backend = get_backend()
+    breaker = CircuitBreaker(backend.name)
+    breaker.allow()
+    started = time.monotonic()
+    recorded = False
+    try:
+        with closing(backend.stream(history, message, **options)) as chunks:
+            for text in chunks:
+                if not recorded:
+                    breaker.record(time.monotonic() - started)
+                    recorded = True
+                yield text
+    except Exception:
+        if not recorded:
+            breaker.record(time.monotonic() - started, failed=True)
+        raise
+    if not recorded:
+        breaker.record(time.monotonic() - started)
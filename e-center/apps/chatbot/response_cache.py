@@ -0,0 +1,235 @@
+"""
+Semantic answer cache for session-less chats.
+
+Learners ask the same questions in many wordings ("what is present
+perfect?", "please explain what present perfect is"). Messages are
+normalized (casefolded, punctuation, grammar words and filler removed),
+cut into character shingles and reduced to a MinHash signature;
+locality-sensitive hashing over signature bands finds earlier questions
+whose estimated Jaccard similarity reaches ``SEMANTIC_CACHE_THRESHOLD``
+and reuses their answer.
+
+The grammar words learners ask about (articles, prepositions, forms of
+"be", modals ...) are often the whole difference between two questions
+("is a used before vowels?" / "is an used before vowels?"), so they are
+not fuzzy-matched: the set of them in a message must match exactly, as
+part of the entry's scope.
+
+Entries are scoped by (proficiency level, learning focus), expire after
+``SEMANTIC_CACHE_TTL`` seconds and are evicted least-recently-used beyond
+``SEMANTIC_CACHE_SIZE``. The cache lives in process memory: signatures
+are looked up by band, which the shared Django cache cannot do. Each
+server worker process therefore has its own cache, and a question is only
+answered from the cache by the worker that stored it (or a near-duplicate
+of it); the hit rate and ``stats()`` are per worker.
+
+Only ``simple_chat`` uses it. Answers inside a session depend on the
+conversation so far and are never cached.
+"""
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULT_SIZE = 1000
+DEFAULT_TTL = 6 * 60 * 60  # seconds
+DEFAULT_THRESHOLD = 0.9  # estimated Jaccard similarity of a near-duplicate
+
+NUM_PERM = 64
+BANDS = 16  # 4 rows per band: pairs above ~0.5 similarity usually share a band
+SHINGLE_SIZE = 3
+MIN_CONTENT_WORDS = 2
+
+# Words that are themselves grammar topics; a message's set of them must match exactly
+GRAMMAR_WORDS = frozenset("""
+a an the some any much many few little
+about above across after at before behind below between by during for from in into of off on onto
+over since through till to toward towards under until up with within without
+am is are was were be been being have has had do does did
+can could may might must shall should will would ought
+than then that which who whom whose this these those
+""".split())
+# Filler learners wrap around a topic
+STOPWORDS = frozenset("""
+and as but how i if it its me my or our please so their them there to us we what when where why you your
+describe define definition difference explain explanation example examples give help know mean meaning
+rule rules show teach tell tense understand use used using word
+""".split())
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_ROWS = NUM_PERM // BANDS
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def words_of(text):
+    return _PUNCTUATION.sub(' ', text.casefold()).split()
+
+
+def grammar_words(text):
+    """The sorted grammar words of ``text``; part of its cache scope."""
+    return tuple(sorted(set(words_of(text)) & GRAMMAR_WORDS))
+
+
+def normalize(text):
+    """
+    Casefold, strip punctuation and drop grammar words and filler.
+    Questions made almost only of them ("a or an?") keep every word.
+    """
+    words = words_of(text)
+    content = [word for word in words if word not in STOPWORDS and word not in GRAMMAR_WORDS]
+    return ' '.join(content if len(content) >= MIN_CONTENT_WORDS else words)
+
+
+def shingles(text):
+    """Character ``SHINGLE_SIZE``-grams of ``text``."""
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """MinHash signature of the normalized ``text``."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for shingle in shingles(normalize(text))
+    ]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / NUM_PERM
+
+
+def bands(sig):
+    return [sig[i:i + _ROWS] for i in range(0, NUM_PERM, _ROWS)]
+
+
+class SemanticCache:
+    """Thread-safe LRU of answers keyed by (scope, MinHash signature)."""
+
+    def __init__(self, max_entries=DEFAULT_SIZE, ttl=DEFAULT_TTL, threshold=DEFAULT_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()  # (scope, signature) -> (response, expires_at)
+        self._buckets = defaultdict(set)  # (scope, band index, band) -> entry keys
+        self._lock = threading.Lock()
+        self.hits = self.near_hits = self.misses = 0
+        self.evictions = self.expirations = 0
+
+    def get(self, text, scope=()):
+        """The cached answer to ``text`` or a near-duplicate of it, else None."""
+        if not self.max_entries:
+            return None
+        scope, sig = (scope, grammar_words(text)), signature(text)
+        now = time.monotonic()
+        with self._lock:
+            key, exact = (scope, sig), True
+            if key not in self._entries:
+                key, exact = self._nearest(scope, sig), False
+            if key is not None and self._entries[key][1] <= now:
+                self._remove(key)
+                self.expirations += 1
+                key = None
+            if key is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if not exact:
+                self.near_hits += 1
+            return self._entries[key][0]
+
+    def set(self, text, response, scope=()):
+        if not self.max_entries:
+            return
+        key = ((scope, grammar_words(text)), signature(text))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, time.monotonic() + self.ttl)
+            for index, band in enumerate(bands(key[1])):
+                self._buckets[(scope, index, band)].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _nearest(self, scope, sig):
+        candidates = set()
+        for index, band in enumerate(bands(sig)):
+            candidates |= self._buckets.get((scope, index, band), set())
+        best, best_score = None, self.threshold
+        for key in candidates:
+            score = similarity(sig, key[1])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def _remove(self, key):
+        del self._entries[key]
+        scope, sig = key
+        for index, band in enumerate(bands(sig)):
+            bucket = self._buckets[(scope, index, band)]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[(scope, index, band)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.hits = self.near_hits = self.misses = 0
+            self.evictions = self.expirations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """The process-wide cache configured by the ``SEMANTIC_CACHE_*`` settings."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(
+                    max_entries=getattr(settings, 'SEMANTIC_CACHE_SIZE', DEFAULT_SIZE),
+                    ttl=getattr(settings, 'SEMANTIC_CACHE_TTL', DEFAULT_TTL),
+                    threshold=getattr(settings, 'SEMANTIC_CACHE_THRESHOLD', DEFAULT_THRESHOLD),
+                )
+    return _cache
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    """Rebuild the cache when ``override_settings`` changes its configuration."""
+    global _cache
+    if setting.startswith('SEMANTIC_CACHE_'):
+        _cache = None
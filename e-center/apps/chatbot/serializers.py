@@ -22,6 +22,20 @@ class ChatSessionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
         
 
+class ChatSessionListSerializer(serializers.ModelSerializer):
+    """
+    Lightweight session for lists: the newest message as a preview and the
+    message count, stored on the session, instead of every message.
+    """
+    last_message_preview = serializers.CharField(source='last_message_excerpt', read_only=True)
+
+    class Meta:
+        model = ChatSession
+        fields = ['id', 'title', 'proficiency_level', 'learning_focus', 'created_at', 'updated_at',
+                  'message_count', 'last_message_at', 'last_message_preview']
+        read_only_fields = fields
+
+
 class ChatRequestSerializer(serializers.Serializer):
     """Serializer for chat requests to the AI model."""
     message = serializers.CharField(required=True)
@@ -36,6 +50,19 @@ class ChatRequestSerializer(serializers.Serializer):
     )
     
 
+class SimpleChatContextSerializer(serializers.Serializer):
+    """Optional learning context of a session-less chat; also scopes its answer cache."""
+    proficiency_level = serializers.ChoiceField(choices=ChatSession.PROFICIENCY_CHOICES, required=False)
+    learning_focus = serializers.ChoiceField(choices=ChatSession.FOCUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        # Either part of the context implies the session defaults for the other
+        if attrs:
+            attrs.setdefault('proficiency_level', ChatSession._meta.get_field('proficiency_level').default)
+            attrs.setdefault('learning_focus', ChatSession._meta.get_field('learning_focus').default)
+        return attrs
+
+
 class ChatResponseSerializer(serializers.Serializer):
     """Serializer for responses from the AI model."""
     response = serializers.CharField()
@@ -1,9 +1,36 @@
-from django.test import TestCase
+import gzip
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 from apps.users.models import User
-from apps.chatbot.models import ChatSession, ChatMessage
+from apps.chatbot.archive import archived_messages, decode
+from apps.chatbot.context import SUMMARY_LOCK_KEY, build_history, estimate_tokens, run_summary, summarize_session
+from apps.chatbot.jobs import claim, enqueue, requeue_stale, run, run_next
+from apps.chatbot.limits import acquire_llm_slot, release_llm_slot, take
+from apps.chatbot.llm import FakeBackend, LLMError, ModelRegistry, get_backend
+from apps.chatbot.models import ChatArchive, ChatJob, ChatSession, ChatMessage
+from apps.chatbot.resilience import CircuitBreaker, aguarded_generate, guarded_generate, latencies
+from apps.chatbot.turns import ChatTurn
+from apps.chatbot.response_cache import get_response_cache
+from apps.chatbot.utils import error_message, generate_response, generate_response_stream, system_message
 import json
 
 class ChatbotAPITests(TestCase):
@@ -123,4 +150,1123 @@ class ChatbotAPITests(TestCase):
         """Test accessing chat sessions without authentication"""
         self.client.force_authenticate(user=None)
         response = self.client.get(self.sessions_url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class FakeStream:
+    """
+    Streaming stub standing in for the model: yields ``chunks`` with
+    ``delay`` seconds between them and remembers whether it was closed.
+    """
+    def __init__(self, chunks, delay=0.05):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+
+    def __call__(self, prompt, session=None, history=None):
+        return self.generate()
+
+    def generate(self):
+        try:
+            for index, chunk in enumerate(self.chunks):
+                if index:
+                    time.sleep(self.delay)
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def parse_events(payload):
+    """Split a Server-Sent Events body into ``(event, data)`` pairs."""
+    events = []
+    for block in payload.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class ChatStreamingTests(TestCase):
+    """
+    Test case for streaming chat replies as Server-Sent Events.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()  # Rate-limit buckets and LLM slots live in the cache
+        self.user = User.objects.create_user(
+            username='streamer', email='streamer@example.com', password='testpassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/v1/chat/sessions/chat/?stream=1'
+
+    def test_first_token_arrives_before_the_reply_is_finished(self):
+        """Test time-to-first-token is independent of the reply length"""
+        fake = FakeStream(['Hello', ', ', 'world', '!'], delay=0.05)
+        with patch('apps.chatbot.views.generate_response_stream', fake):
+            started = time.monotonic()
+            response = self.client.post(self.url, {'message': 'Say hello please'}, format='json')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+            chunks = iter(response.streaming_content)
+            received = [next(chunks).decode()]
+            while 'event: delta' not in received[-1]:
+                received.append(next(chunks).decode())
+            time_to_first_token = time.monotonic() - started
+            received.extend(chunk.decode() for chunk in chunks)
+            total = time.monotonic() - started
+
+        self.assertLess(time_to_first_token, 0.05)
+        self.assertGreaterEqual(total, 0.15)
+
+        events = parse_events(''.join(received))
+        self.assertEqual([event for event, _ in events], ['start', 'delta', 'delta', 'delta', 'delta', 'done'])
+        done = events[-1][1]
+        self.assertEqual(done['response'], 'Hello, world!')
+        message = ChatMessage.objects.get(id=done['message_id'])
+        self.assertEqual((message.role, message.content), ('assistant', 'Hello, world!'))
+        self.assertEqual(message.session.title, 'Say hello please')
+
+    def test_client_disconnect_stops_the_model_and_keeps_the_partial_reply(self):
+        """Test closing the response mid-stream closes the model stream"""
+        fake = FakeStream(['Hello', ', ', 'world', '!'], delay=0)
+        with patch('apps.chatbot.views.generate_response_stream', fake):
+            response = self.client.post(self.url, {'message': 'Say hello please'}, format='json')
+            chunks = iter(response.streaming_content)
+            next(chunks)  # start
+            next(chunks)  # first delta
+            response.close()
+
+        self.assertTrue(fake.closed)
+        replies = ChatMessage.objects.filter(role='assistant')
+        self.assertEqual([reply.content for reply in replies], ['Hello'])
+
+    def test_empty_reply_still_ends_with_done(self):
+        """Test a model stream with no text ends with done and no message id"""
+        with patch('apps.chatbot.views.generate_response_stream', FakeStream([])):
+            response = self.client.post(self.url, {'message': 'Say nothing'}, format='json')
+            events = parse_events(b''.join(response.streaming_content).decode())
+
+        self.assertEqual([event for event, _ in events], ['start', 'done'])
+        self.assertIsNone(events[-1][1]['message_id'])
+        self.assertEqual(list(ChatMessage.objects.values_list('role', flat=True)), ['user'])
+
+    async def test_asgi_sends_each_event_as_it_is_produced(self):
+        """Test the stream is not buffered under ASGI: the first delta arrives before the model finishes"""
+        fake = FakeStream(['Hello', ', ', 'world', '!'], delay=0.05)
+        with patch('apps.chatbot.views.generate_response_stream', fake):
+            response = await self.async_client.post(
+                self.url, {'message': 'Say hello please'}, content_type='application/json'
+            )
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            received = [(await anext(chunks)).decode()]
+            while 'event: delta' not in received[-1]:
+                received.append((await anext(chunks)).decode())
+            self.assertFalse(fake.closed)
+            received.extend([chunk.decode() async for chunk in chunks])
+
+        events = parse_events(''.join(received))
+        self.assertEqual(events[-1][0], 'done')
+        self.assertEqual(events[-1][1]['response'], 'Hello, world!')
+
+
+@override_settings(LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=0)
+class AsyncChatViewTests(TestCase):
+    """
+    Test case for the async chat endpoints.
+    """
+    def setUp(self):
+        cache.clear()  # Rate-limit buckets and LLM slots live in the cache
+
+    async def test_simple_chat(self):
+        """Test the async simple chat answers without a session"""
+        response = await self.async_client.post(
+            '/api/v1/chat/async/simple-chat/', {'message': 'Hi'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['response'], FakeBackend().reply('Hi'))
+
+    async def test_llm_slot_is_taken_off_the_event_loop(self):
+        """Test the async chat paths take and release LLM slots in a worker thread"""
+        threads = []
+
+        def acquire():
+            threads.append(threading.get_ident())
+            return acquire_llm_slot()
+
+        loop_thread = threading.get_ident()
+        with patch('apps.chatbot.limits.acquire_llm_slot', side_effect=acquire):
+            for url, message in (('simple-chat', 'Why do we say "an hour"?'), ('chat', 'Hello')):
+                response = await self.async_client.post(
+                    f'/api/v1/chat/async/{url}/', {'message': message}, content_type='application/json'
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(loop_thread, threads)
+
+    async def test_chat_stores_both_messages(self):
+        """Test the async chat creates a session and stores the exchange"""
+        response = await self.async_client.post(
+            '/api/v1/chat/async/chat/', {'message': 'How are you today?'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        session = await ChatSession.objects.aget(id=response.json()['session_id'])
+        self.assertEqual(session.title, 'How are you today?')
+        roles = [message.role async for message in session.messages.all()]
+        self.assertEqual(roles, ['user', 'assistant'])
+
+    async def test_connection_check(self):
+        """Test the async connection check reports success"""
+        response = await self.async_client.get('/api/v1/chat/async/test/')
+        self.assertEqual(response.json()['status'], 'success')
+
+
+class FakeBackendTests(TestCase):
+    """
+    Test case for the in-process fake LLM backend.
+    """
+    def test_reply_is_deterministic(self):
+        """Test the fake backend answers the same prompt the same way"""
+        backend = FakeBackend(latency=0)
+        self.assertEqual(backend.generate([], 'What is a noun?'), backend.generate([], 'What is a noun?'))
+        self.assertIn('What is a noun?', backend.generate([], 'What is a noun?'))
+
+    def test_stream_yields_the_reply_in_tokens(self):
+        """Test streamed tokens join up to the full reply"""
+        backend = FakeBackend(latency=0)
+        tokens = list(backend.stream([], 'Explain articles'))
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(''.join(tokens), backend.reply('Explain articles'))
+
+    def test_failure_injection(self):
+        """Test a failure rate of 1 makes every call raise"""
+        backend = FakeBackend(latency=0, failure_rate=1, failure_message='provider down')
+        with self.assertRaisesMessage(LLMError, 'provider down'):
+            backend.generate([], 'Hi')
+
+    @override_settings(LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=1)
+    def test_chat_helpers_handle_backend_failure(self):
+        """Test provider failures become the friendly chat error"""
+        self.assertIsInstance(get_backend(), FakeBackend)
+        self.assertEqual(generate_response('Hi'), error_message(LLMError()))
+        self.assertEqual(''.join(generate_response_stream('Hi')), error_message(LLMError()))
+
+
+@override_settings(LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=0, SEMANTIC_CACHE_SIZE=2)
+class SemanticResponseCacheTests(TestCase):
+    """
+    Test case for the simple-chat answer cache.
+    """
+    url = '/api/v1/chat/sessions/simple-chat/'
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()  # Rate-limit buckets and LLM slots live in the cache
+        # Class-level settings build the singletons once; start each test clean
+        get_response_cache().clear()
+        get_backend().calls = 0
+
+    def ask(self, message, **context):
+        response = self.client.post(self.url, {'message': message, **context}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['response']
+
+    def test_near_duplicate_questions_share_an_answer(self):
+        """Test rephrasings of a question are answered from the cache"""
+        first = self.ask('What is present perfect?')
+        self.assertEqual(self.ask('Please explain what present perfect is.'), first)
+        self.assertEqual(get_backend().calls, 1)
+        stats = get_response_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_different_topics_miss(self):
+        """Test related but different questions are not conflated"""
+        self.ask('What is present perfect?')
+        self.ask('What is present perfect continuous?')
+        self.ask('Difference between a and an')
+        self.ask('Difference between a and the')
+        self.assertEqual(get_backend().calls, 4)
+
+    def test_questions_about_grammar_words_are_not_conflated(self):
+        """Test questions differing only in the grammar words they ask about miss"""
+        pairs = [
+            ('Is a used before vowels?', 'Is an used before vowels?'),
+            ('What is the difference between in and on for time?', 'What is the difference between in and at for time?'),
+            ('When do we use was and were in past simple sentences?', 'When do we use is and are in past simple sentences?'),
+        ]
+        for first, second in pairs:
+            with self.subTest(first=first):
+                get_backend().calls = 0
+                self.assertNotEqual(self.ask(first), self.ask(second))
+                self.assertEqual(get_backend().calls, 2)
+
+    def test_scoped_by_level_and_focus(self):
+        """Test the same question at another level is generated again"""
+        self.ask('What is present perfect?', proficiency_level='beginner')
+        self.ask('What is present perfect?', proficiency_level='advanced')
+        self.ask('What is present perfect?', proficiency_level='advanced', learning_focus='general')
+        self.assertEqual(get_backend().calls, 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the cache keeps only the most recently used answers"""
+        self.ask('What is present perfect?')
+        self.ask('What are irregular verbs?')
+        self.ask('What is present perfect?')
+        self.ask('How do modal verbs work?')
+        self.ask('What is present perfect?')
+        self.ask('What are irregular verbs?')
+        self.assertEqual(get_backend().calls, 4)
+        self.assertEqual(get_response_cache().stats()['evictions'], 2)
+
+    def test_entries_expire(self):
+        """Test answers past their TTL are generated again"""
+        self.ask('What is present perfect?')
+        with patch('apps.chatbot.response_cache.time.monotonic', return_value=time.monotonic() + 7 * 60 * 60):
+            self.ask('What is present perfect?')
+        self.assertEqual(get_backend().calls, 2)
+        self.assertEqual(get_response_cache().stats()['expirations'], 1)
+
+    @override_settings(LLM_FAKE_FAILURE_RATE=1)
+    def test_failures_are_not_cached(self):
+        """Test an error reply is not stored for later requests"""
+        self.ask('What is present perfect?')
+        self.assertEqual(get_response_cache().stats()['entries'], 0)
+
+    def test_session_chats_bypass_the_cache(self):
+        """Test chats inside a session are always generated"""
+        self.ask('What is present perfect?')
+        self.client.force_authenticate(User.objects.create_user(
+            username='learner', email='learner@example.com', password='testpassword123'
+        ))
+        response = self.client.post('/api/v1/chat/sessions/chat/', {'message': 'What is present perfect?'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_backend().calls, 2)
+        self.assertEqual(get_response_cache().stats()['hits'], 0)
+
+    def test_metrics_are_staff_only(self):
+        """Test only staff can read the cache metrics"""
+        url = self.url + 'cache/'
+        self.client.force_authenticate(User.objects.create_user(
+            username='learner', email='learner@example.com', password='testpassword123'
+        ))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user(
+            username='staff', email='staff@example.com', password='testpassword123', is_staff=True
+        ))
+        self.assertEqual(self.client.get(url).json()['max_entries'], 2)
+
+
+@override_settings(
+    LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=0,
+    CHAT_HISTORY_TOKEN_BUDGET=350, CHAT_HISTORY_MAX_MESSAGES=6,
+)
+class ChatHistoryWindowTests(TestCase):
+    """
+    Test case for the token-budgeted history window and rolling summary.
+    """
+    def setUp(self):
+        user = User.objects.create_user(username='talker', email='talker@example.com', password='testpassword123')
+        self.session = ChatSession.objects.create(user=user)
+        # About 100 estimated tokens each
+        self.messages = [
+            ChatMessage.objects.create(
+                session=self.session, role='user' if i % 2 == 0 else 'assistant', content=f'{i} ' + 'x' * 400
+            )
+            for i in range(10)
+        ]
+        cache.delete(SUMMARY_LOCK_KEY.format(self.session.id))
+
+    def test_window_fits_the_token_budget(self):
+        """Test only the newest messages within the budget are sent"""
+        with patch('apps.chatbot.context.schedule_summary') as schedule, self.assertNumQueries(1):
+            history = build_history(self.session, system_message())
+        self.assertEqual([entry['parts'][0][:1] for entry in history[1:]], ['7', '8', '9'])
+        schedule.assert_called_once_with(self.session.id, self.messages[6].id, after_commit=True)
+
+    @override_settings(CHAT_HISTORY_TOKEN_BUDGET=100000)
+    def test_window_is_capped_in_messages(self):
+        """Test a large budget still reads a bounded number of rows"""
+        with patch('apps.chatbot.context.schedule_summary') as schedule:
+            history = build_history(self.session, system_message())
+        self.assertEqual(len(history), 1 + 6)
+        schedule.assert_called_once_with(self.session.id, self.messages[3].id, after_commit=True)
+
+    def test_summary_is_computed_after_commit(self):
+        """Test dropped turns are summarized by the background worker"""
+        with patch('apps.chatbot.context.summary_executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                build_history(self.session, system_message())
+                executor.submit.assert_not_called()
+        executor.submit.assert_called_once_with(run_summary, self.session.id, self.messages[6].id)
+
+    def test_summary_replaces_dropped_turns(self):
+        """Test the stored summary is sent with the system prompt"""
+        self.assertTrue(summarize_session(self.session.id, self.messages[6].id))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary_through, self.messages[6].id)
+        self.assertFalse(summarize_session(self.session.id, self.messages[6].id))
+
+        # The summary counts against the budget
+        budget = 350 + estimate_tokens(self.session.summary)
+        with patch('apps.chatbot.context.schedule_summary') as schedule, \
+                override_settings(CHAT_HISTORY_TOKEN_BUDGET=budget):
+            history = build_history(self.session, system_message())
+        self.assertIn(self.session.summary, history[0]['parts'][0])
+        self.assertEqual(len(history), 1 + 3)
+        schedule.assert_not_called()
+
+
+@override_settings(LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=0)
+class ChatTurnQueryTests(TestCase):
+    """
+    Test case for the query budget of one chat turn.
+    """
+    url = '/api/v1/chat/sessions/chat/'
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()  # Rate-limit buckets and LLM slots live in the cache
+        self.user = User.objects.create_user(username='budget', email='budget@example.com', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+
+    def test_first_turn_query_budget(self):
+        """Test a new session costs an insert, one bulk insert and one update"""
+        # INSERT session, SAVEPOINT, INSERT messages, UPDATE session, RELEASE
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, {'message': 'How do I say hello?'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        session = ChatSession.objects.get(id=response.json()['session_id'])
+        self.assertEqual(session.title, 'How do I say hello?')
+        self.assertEqual([message.role for message in session.messages.all()], ['user', 'assistant'])
+
+    def test_follow_up_turn_query_budget(self):
+        """Test a follow-up reads the session and its window once each"""
+        session_id = self.client.post(self.url, {'message': 'How do I say hello?'}, format='json').json()['session_id']
+        payload = {'message': 'And goodbye?', 'session_id': session_id, 'learning_focus': 'conversation'}
+
+        # SELECT session, SELECT window, SAVEPOINT, INSERT messages, UPDATE session, RELEASE
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        session = ChatSession.objects.get(id=session_id)
+        self.assertEqual(session.learning_focus, 'conversation')
+        self.assertEqual(
+            [message.content for message in session.messages.filter(role='user')],
+            ['How do I say hello?', 'And goodbye?']
+        )
+
+
+@patch('apps.chatbot.llm.genai')
+class ModelRegistryTests(TestCase):
+    """
+    Test case for the process-wide Gemini model registry.
+    """
+    config = {'temperature': 0.7, 'top_p': 0.95}
+    safety = [{'category': 'HARM_CATEGORY_HARASSMENT', 'threshold': 'BLOCK_MEDIUM_AND_ABOVE'}]
+
+    def test_models_are_reused_per_configuration(self, genai):
+        """Test one model per (name, config, safety) and one configure call"""
+        genai.GenerativeModel.side_effect = lambda **kwargs: object()
+        registry = ModelRegistry()
+        _, first = registry.get('models/gemini-pro', self.config, self.safety)
+        _, again = registry.get('models/gemini-pro', dict(reversed(list(self.config.items()))), self.safety)
+        _, other = registry.get('models/gemini-pro', {'temperature': 0.2}, self.safety)
+        self.assertIs(first, again)
+        self.assertIsNot(first, other)
+        self.assertEqual(genai.configure.call_count, 1)
+
+    def test_concurrent_first_use_builds_one_model(self, genai):
+        """Test threads racing on a cold key share one model"""
+        genai.GenerativeModel.side_effect = lambda **kwargs: time.sleep(0.01) or object()
+        registry = ModelRegistry()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            models = list(pool.map(lambda _: registry.get('models/gemini-pro')[1], range(16)))
+        self.assertEqual(len({id(model) for model in models}), 1)
+        self.assertEqual(genai.GenerativeModel.call_count, 1)
+
+    def test_failing_model_is_rebuilt(self, genai):
+        """Test repeated failures drop the model and reconfigure the client"""
+        genai.GenerativeModel.side_effect = lambda **kwargs: object()
+        registry = ModelRegistry()
+        key, model = registry.get('models/gemini-pro')
+        for _ in range(registry.max_failures):
+            with self.assertRaises(RuntimeError), registry.track(key):
+                raise RuntimeError('unavailable')
+        self.assertEqual(registry.stats(), [])
+        self.assertIsNot(registry.get('models/gemini-pro')[1], model)
+        self.assertEqual(genai.configure.call_count, 2)
+
+    def test_health_check_drops_unreachable_models(self, genai):
+        """Test check() pings every model and evicts the broken ones"""
+        healthy, broken = Mock(), Mock()
+        broken.count_tokens.side_effect = RuntimeError('deadline exceeded')
+        genai.GenerativeModel.side_effect = [healthy, broken]
+        registry = ModelRegistry()
+        registry.get('models/gemini-pro')
+        registry.get('models/gemini-2.5-flash')
+        self.assertEqual(registry.check(), {'models/gemini-pro': None, 'models/gemini-2.5-flash': 'deadline exceeded'})
+        self.assertEqual([entry['model'] for entry in registry.stats()], ['models/gemini-pro'])
+
+
+@override_settings(
+    LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=0,
+    CHAT_JOB_CONCURRENCY=2, CHAT_JOB_USER_CONCURRENCY=1,
+)
+class ChatJobQueueTests(TestCase):
+    """
+    Test case for the database-backed chat job queue.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()  # Rate-limit buckets and LLM slots live in the cache
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='testpassword123')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='testpassword123')
+        self.carol = User.objects.create_user(username='carol', email='carol@example.com', password='testpassword123')
+
+    def enqueue_for(self, user, message='How are you today?'):
+        return enqueue(ChatSession.objects.create(user=user), message, created=True)
+
+    def test_chat_job_mode_returns_a_job_to_poll(self):
+        """Test ?job=1 queues the turn and the worker stores the reply"""
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.post('/api/v1/chat/sessions/chat/?job=1', {'message': 'Hello there!'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_url = f"/api/v1/chat/jobs/{response.json()['job_id']}/"
+        self.assertTrue(response.json()['poll_url'].endswith(job_url))
+        self.assertEqual(self.client.get(job_url).json()['status'], 'queued')
+
+        job = run_next('fake')
+        self.assertEqual(job.status, ChatJob.DONE)
+        payload = self.client.get(job_url + '?wait=5').json()
+        self.assertEqual(payload['status'], 'done')
+        self.assertIn('Hello there!', payload['response'])
+        session = ChatSession.objects.get(id=payload['session_id'])
+        self.assertEqual([message.role for message in session.messages.all()], ['user', 'assistant'])
+        self.assertEqual(session.messages.last().id, payload['message_id'])
+
+    def test_long_poll_wait_must_be_finite(self):
+        """Test nan, infinite and non-numeric waits are rejected and negative ones answer at once"""
+        self.client.force_authenticate(user=self.alice)
+        job = self.enqueue_for(self.alice)
+        job_url = f'/api/v1/chat/jobs/{job.id}/'
+        for wait in ('nan', 'inf', '-inf', 'soon'):
+            with self.subTest(wait=wait):
+                self.assertEqual(self.client.get(job_url, {'wait': wait}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(job_url, {'wait': '-5'})
+        self.assertEqual(response.json()['status'], 'queued')
+
+    def test_jobs_are_private(self):
+        """Test users cannot poll each other's jobs"""
+        job = self.enqueue_for(self.alice)
+        self.client.force_authenticate(user=self.bob)
+        response = self.client.get(f'/api/v1/chat/jobs/{job.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_provider_concurrency_is_bounded(self):
+        """Test no more jobs run at once than the provider allows"""
+        for user in (self.alice, self.bob, self.carol):
+            self.enqueue_for(user)
+        self.assertIsNotNone(claim('fake'))
+        self.assertIsNotNone(claim('fake'))
+        self.assertIsNone(claim('fake'))
+        running = ChatJob.objects.filter(status=ChatJob.RUNNING)
+        self.assertEqual(sorted(running.values_list('slot', flat=True)), [0, 1])
+
+    def test_users_are_served_fairly(self):
+        """Test a user with a backlog does not starve later users"""
+        first = [self.enqueue_for(self.alice) for _ in range(3)]
+        late = self.enqueue_for(self.bob)
+        self.assertEqual(claim('fake').id, first[0].id)
+        self.assertEqual(claim('fake').id, late.id)
+
+        run(ChatJob.objects.get(id=first[0].id))
+        self.assertEqual(claim('fake').id, first[1].id)
+
+    def test_stale_jobs_are_retried_then_failed(self):
+        """Test jobs abandoned by a dead worker go back to the queue once"""
+        job = self.enqueue_for(self.alice)
+        claim('fake')
+        ChatJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), (1, 0))
+
+        claim('fake')
+        ChatJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), (0, 1))
+        self.assertEqual(ChatJob.objects.get(id=job.id).status, ChatJob.FAILED)
+
+    def test_locked_head_job_holds_back_the_user(self):
+        """Test a worker never skips past another worker's locked job to the same user's next one"""
+        head = self.enqueue_for(self.alice, 'First question')
+        self.enqueue_for(self.alice, 'Second question')
+        later = self.enqueue_for(self.bob)
+
+        def skip_locked_head(queryset, *args, **kwargs):
+            # What SKIP LOCKED does while another worker holds the head row
+            return queryset.exclude(id=head.id)
+
+        with patch.object(QuerySet, 'select_for_update', skip_locked_head):
+            self.assertEqual(claim('fake').id, later.id)
+        self.assertEqual(ChatJob.objects.filter(user=self.alice, status=ChatJob.RUNNING).count(), 0)
+
+    def test_slow_worker_discards_a_requeued_job(self):
+        """Test a worker whose job was requeued and claimed again stores nothing"""
+        job = self.enqueue_for(self.alice)
+        slow = claim('fake')
+        ChatJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), (1, 0))
+        retry = claim('fake')
+
+        self.assertEqual(run(slow).status, ChatJob.RUNNING)
+        self.assertFalse(ChatMessage.objects.exists())
+        self.assertEqual(run(retry).status, ChatJob.DONE)
+        self.assertEqual(ChatMessage.objects.filter(session=job.session).count(), 2)
+
+        # A late run after the job finished changes nothing either
+        self.assertEqual(run(slow).status, ChatJob.DONE)
+        self.assertEqual(ChatMessage.objects.count(), 2)
+
+
+@override_settings(
+    LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=0, SEMANTIC_CACHE_SIZE=0,
+    CHAT_RATE_IP='', CHAT_RATE_USER='', CHAT_MAX_IN_FLIGHT=0,
+)
+class ChatRateLimitTests(TestCase):
+    """
+    Test case for chat rate limits and the in-flight LLM cap.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def simple_chat(self, message='What is present perfect?'):
+        return self.client.post('/api/v1/chat/sessions/simple-chat/', {'message': message}, format='json')
+
+    def test_bucket_allows_a_burst_then_refills(self):
+        """Test a bucket passes its capacity at once, then one request per interval"""
+        bucket = [('chatbot:rate:test', (3, 60))]
+        self.assertEqual([take(bucket, now=1000) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(take(bucket, now=1000), 20)
+        self.assertAlmostEqual(take(bucket, now=1010), 10)
+        self.assertEqual(take(bucket, now=1020), 0)
+
+    def test_denied_request_takes_no_tokens(self):
+        """Test a request refused by one bucket leaves the others untouched"""
+        take([('chatbot:rate:full', (1, 60))], now=1000)
+        both = [('chatbot:rate:free', (1, 60)), ('chatbot:rate:full', (1, 60))]
+        self.assertGreater(take(both, now=1000), 0)
+        self.assertEqual(take([('chatbot:rate:free', (1, 60))], now=1000), 0)
+
+    @override_settings(CHAT_RATE_IP='2/min')
+    def test_ip_limit_answers_429_with_retry_after(self):
+        """Test requests over the per-IP rate are throttled"""
+        self.assertEqual(self.simple_chat().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.simple_chat().status_code, status.HTTP_200_OK)
+        response = self.simple_chat()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+        other = self.client.post(
+            '/api/v1/chat/sessions/simple-chat/', {'message': 'Hi'}, format='json', REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    @override_settings(CHAT_RATE_USER='1/hour')
+    def test_user_limit_is_per_user(self):
+        """Test each signed-in user has their own bucket"""
+        alice = User.objects.create_user(username='alice', email='alice@example.com', password='testpassword123')
+        bob = User.objects.create_user(username='bob', email='bob@example.com', password='testpassword123')
+        self.client.force_authenticate(user=alice)
+        self.assertEqual(self.simple_chat().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.simple_chat().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.client.force_authenticate(user=bob)
+        self.assertEqual(self.simple_chat().status_code, status.HTTP_200_OK)
+
+    @override_settings(CHAT_MAX_IN_FLIGHT=1)
+    def test_in_flight_cap(self):
+        """Test chats are refused while every LLM slot is taken, and slots are given back"""
+        slot = acquire_llm_slot()
+        response = self.client.post('/api/v1/chat/sessions/chat/', {'message': 'Hello there!'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.simple_chat().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(ChatSession.objects.exists())
+
+        release_llm_slot(slot)
+        self.assertEqual(self.simple_chat().status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.client.post('/api/v1/chat/sessions/chat/', {'message': 'Hello there!'}, format='json').status_code,
+            status.HTTP_200_OK,
+        )
+        self.assertIsNotNone(acquire_llm_slot())
+
+    def test_concurrent_requests_cannot_overspend_a_bucket(self):
+        """Test a burst of simultaneous checks gets exactly the bucket's capacity"""
+        bucket = [('chatbot:rate:burst', (5, 60))]
+
+        def slow_get_many(cache, keys, version=None):
+            # Widen the gap between reading and writing the bucket
+            stored = BaseCache.get_many(cache, keys, version)
+            time.sleep(0.01)
+            return stored
+
+        with patch.object(LocMemCache, 'get_many', slow_get_many), ThreadPoolExecutor(max_workers=10) as pool:
+            waits = list(pool.map(lambda _: take(bucket, now=1000), range(20)))
+        self.assertEqual(waits.count(0), 5)
+
+    @override_settings(CHAT_MAX_IN_FLIGHT=1)
+    def test_unread_stream_gives_its_slot_back(self):
+        """Test closing a streamed chat that was never read releases its slot"""
+        response = self.client.post('/api/v1/chat/sessions/chat/?stream=1', {'message': 'Hello there!'}, format='json')
+        self.assertIsNone(acquire_llm_slot())
+        response.close()
+        self.assertIsNotNone(acquire_llm_slot())
+
+    @override_settings(CHAT_RATE_IP='1/min', CHAT_MAX_IN_FLIGHT=1)
+    async def test_async_endpoints_share_the_limits(self):
+        """Test the async twins apply the same rate limits and cap"""
+        url = '/api/v1/chat/async/simple-chat/'
+        response = await self.async_client.post(url, {'message': 'Hi'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await self.async_client.post(url, {'message': 'Hi'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '60')
+
+        with override_settings(CHAT_RATE_IP=''):
+            slot = acquire_llm_slot()
+            response = await self.async_client.post(
+                '/api/v1/chat/async/chat/', {'message': 'Hello there!'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertFalse(await ChatSession.objects.aexists())
+            release_llm_slot(slot)
+
+
+class FaultyBackend(FakeBackend):
+    """
+    Fault-injecting fake client: the primary model takes ``latency`` and
+    fails at ``failure_rate``, the fallback model always answers at once.
+    """
+    name = 'faulty'
+    fallback_model_name = 'fallback'
+
+    def generate(self, history, message, model_name=None, **options):
+        if model_name == self.fallback_model_name:
+            return 'fallback: ' + self.reply(message)
+        return super().generate(history, message, **options)
+
+    async def agenerate(self, history, message, model_name=None, **options):
+        if model_name == self.fallback_model_name:
+            return 'fallback: ' + self.reply(message)
+        return await super().agenerate(history, message, **options)
+
+
+@override_settings(
+    LLM_BACKEND='apps.chatbot.tests.FaultyBackend', LLM_CIRCUIT_MIN_CALLS=4,
+    LLM_CIRCUIT_COOLDOWN=60, LLM_HEDGE=False, LLM_HEDGE_MIN_SAMPLES=5,
+)
+class LLMCircuitBreakerTests(TestCase):
+    """
+    Test case for the circuit breaker and hedged requests around LLM calls.
+    """
+    def setUp(self):
+        cache.clear()
+        latencies.clear()
+        self.backend = get_backend()
+        self.backend.latency, self.backend.failure_rate, self.backend.calls = 0, 0, 0
+        self.breaker = CircuitBreaker('faulty')
+
+    def test_opens_on_errors_and_fails_fast(self):
+        """Test a failing provider trips the circuit and later calls skip it"""
+        self.backend.failure_rate = 1
+        replies = {generate_response('Hello there') for _ in range(4)}
+        self.assertEqual(replies, {error_message(Exception())})
+        self.assertEqual(self.breaker.state(), 'open')
+
+        started = time.monotonic()
+        self.backend.latency = 1
+        self.assertEqual(generate_response('Hello there'), error_message(Exception()))
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertEqual(self.backend.calls, 4)
+
+    @override_settings(LLM_CIRCUIT_SLOW_CALL=0.01)
+    def test_opens_on_slow_calls(self):
+        """Test replies slower than the latency threshold trip the circuit"""
+        self.backend.latency = 0.02
+        for _ in range(4):
+            self.assertEqual(generate_response('Hello there'), self.backend.reply('Hello there'))
+        self.assertEqual(self.breaker.state(), 'open')
+
+    def test_half_open_probe(self):
+        """Test one probe after the cooldown reopens or closes the circuit"""
+        with override_settings(LLM_CIRCUIT_COOLDOWN=0):
+            self.breaker.trip()
+        self.assertEqual(self.breaker.state(), 'half-open')
+
+        self.backend.failure_rate = 1
+        self.assertEqual(generate_response('Hello there'), error_message(Exception()))
+        self.assertEqual(self.backend.calls, 1)  # Only the probe went out
+        self.assertEqual(self.breaker.state(), 'open')
+
+        with override_settings(LLM_CIRCUIT_COOLDOWN=0):
+            self.breaker.trip()
+        self.backend.failure_rate = 0
+        self.assertEqual(generate_response('Hello there'), self.backend.reply('Hello there'))
+        self.assertEqual(self.backend.calls, 3)  # Probe, then the call itself
+        self.assertEqual(self.breaker.state(), 'closed')
+
+    @override_settings(LLM_HEDGE=True)
+    def test_slow_calls_are_hedged_to_the_fallback_model(self):
+        """Test a call running past p95 is answered by the fallback model"""
+        self.assertEqual(guarded_generate([], 'Hello there'), self.backend.reply('Hello there'))  # Too few samples
+        for _ in range(5):
+            latencies.add('faulty', 0.01)
+
+        self.backend.latency = 0.5
+        started = time.monotonic()
+        self.assertEqual(guarded_generate([], 'Hello there'), 'fallback: ' + self.backend.reply('Hello there'))
+        self.assertLess(time.monotonic() - started, 0.3)
+
+    @override_settings(LLM_HEDGE=True)
+    async def test_async_calls_are_hedged(self):
+        """Test the async path hedges too"""
+        for _ in range(5):
+            latencies.add('faulty', 0.01)
+        self.backend.latency = 0.5
+        reply = await aguarded_generate([], 'Hello there')
+        self.assertEqual(reply, 'fallback: ' + self.backend.reply('Hello there'))
+
+    @override_settings(LLM_HEDGE=True, CHAT_MAX_IN_FLIGHT=1)
+    def test_hedge_needs_a_free_slot(self):
+        """Test a hedge takes an in-flight slot, and is skipped when none is free"""
+        for _ in range(5):
+            latencies.add('faulty', 0.01)
+        self.backend.latency = 0.2
+        self.assertEqual(guarded_generate([], 'Hello there'), 'fallback: ' + self.backend.reply('Hello there'))
+        slot = acquire_llm_slot()
+        self.assertIsNotNone(slot)  # The hedge gave its slot back
+
+        self.assertEqual(guarded_generate([], 'Hello there'), self.backend.reply('Hello there'))
+        release_llm_slot(slot)
+
+
+class ChatMessagePaginationTests(TestCase):
+    """
+    Test case for keyset-paginated messages and the lightweight session list.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='pager', email='pager@example.com', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.session = ChatSession.objects.create(user=self.user, title='Long chat')
+        self.session.add_messages(
+            [ChatMessage(session=self.session, role='user', content=f'Message {index}') for index in range(1, 8)]
+        )
+        # Same timestamp for all, so pages are told apart by id alone
+        ChatMessage.objects.filter(session=self.session).update(created_at=timezone.now())
+        self.url = f'/api/v1/chat/sessions/{self.session.id}/messages/'
+
+    def page(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        return data, [message['content'] for message in data['results']]
+
+    def test_before_cursor_walks_back_to_the_first_message(self):
+        """Test pages go from newest to oldest with constant queries"""
+        data, contents = self.page(page_size=3)
+        self.assertEqual(contents, ['Message 5', 'Message 6', 'Message 7'])
+        self.assertTrue(data['has_older'])
+
+        with self.assertNumQueries(2):
+            data, contents = self.page(page_size=3, before=data['before'])
+        self.assertEqual(contents, ['Message 2', 'Message 3', 'Message 4'])
+
+        data, contents = self.page(page_size=3, before=data['before'])
+        self.assertEqual(contents, ['Message 1'])
+        self.assertEqual((data['has_older'], data['before']), (False, None))
+
+    def test_after_cursor_fetches_new_messages(self):
+        """Test polling with the after cursor returns only messages added since"""
+        data, _ = self.page()
+        cursor = data['after']
+        data, contents = self.page(after=cursor)
+        self.assertEqual((contents, data['after']), ([], cursor))
+
+        ChatMessage.objects.create(session=self.session, role='assistant', content='Message 8')
+        data, contents = self.page(after=cursor)
+        self.assertEqual(contents, ['Message 8'])
+        self.assertFalse(data['has_newer'])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get(self.url, {'before': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_session_list_is_lightweight(self):
+        """Test sessions are listed with a preview and count, not their messages"""
+        ChatSession.objects.create(user=self.user, title='Empty chat')
+        self.session.add_messages([ChatMessage(session=self.session, role='assistant', content='x' * 500)])
+
+        with self.assertNumQueries(2):  # Count and page
+            response = self.client.get('/api/v1/chat/sessions/')
+        sessions = {session['title']: session for session in response.json()['results']}
+        self.assertNotIn('messages', sessions['Long chat'])
+        self.assertEqual(sessions['Long chat']['message_count'], 8)
+        self.assertEqual(sessions['Long chat']['last_message_preview'], 'x' * 100)
+        self.assertEqual((sessions['Empty chat']['message_count'], sessions['Empty chat']['last_message_preview']), (0, ''))
+
+    def test_listed_preview_is_marked_only_when_cut(self):
+        """Test the session listing adds ... only for messages longer than the preview"""
+        def latest(content):
+            self.session.add_messages([ChatMessage(session=self.session, role='assistant', content=content)])
+            out = StringIO()
+            call_command('list_user_sessions', '--format', 'json', '--include-messages', '--user-id', str(self.user.id), stdout=out)
+            return json.loads(out.getvalue())['sessions'][0]['latest_message']['content']
+
+        self.assertEqual(latest('x' * 100), 'x' * 100)
+        self.assertEqual(latest('y' * 101), 'y' * 100 + '...')
+
+    def test_turns_keep_the_session_counters(self):
+        """Test storing a turn updates the count and newest message in the same write"""
+        turn = ChatTurn.load(self.session, 'One more question')
+        reply = turn.save('One more answer')
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.message_count, 9)
+        self.assertEqual((self.session.last_message_at, self.session.last_message_preview), (reply.created_at, 'One more answer'))
+
+    def test_backfill_repairs_drift(self):
+        """Test the backfill command recomputes counters from the messages"""
+        ChatMessage.objects.filter(content='Message 7').delete()
+        ChatSession.objects.create(user=self.user, title='Empty chat', message_count=3)
+        out = StringIO()
+        call_command('backfill_session_activity', stdout=out)
+        self.assertIn('2 of 2 sessions had drifted', out.getvalue())
+
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.message_count, self.session.last_message_preview), (6, 'Message 6'))
+        self.assertEqual(ChatSession.objects.get(title='Empty chat').message_count, 0)
+        call_command('backfill_session_activity', stdout=out)
+        self.assertIn('2 sessions in sync', out.getvalue())
+
+
+class ChatArchiveTests(TestCase):
+    """
+    Test case for archiving idle sessions' messages.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()  # Decoded archives are cached
+        self.user = User.objects.create_user(username='archivist', email='archivist@example.com', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        self.idle = self.chat('Idle chat', 5)
+        self.active = self.chat('Active chat', 2)
+        self.make_idle(self.idle)
+
+    def chat(self, title, count, start=1):
+        session = ChatSession.objects.create(user=self.user, title=title)
+        self.add(session, count, start)
+        return session
+
+    def add(self, session, count, start=1):
+        session.add_messages([
+            ChatMessage(session=session, role='user' if index % 2 else 'assistant', content=f'Message {index} ✓')
+            for index in range(start, start + count)
+        ])
+
+    def make_idle(self, session):
+        ChatSession.objects.filter(id=session.id).update(last_message_at=timezone.now() - timedelta(days=365))
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_chat_messages', *args, stdout=out)
+        return out.getvalue()
+
+    def contents(self, session, **params):
+        data = self.client.get(f'/api/v1/chat/sessions/{session.id}/messages/', params).json()
+        return data, [message['content'] for message in data['results']]
+
+    def test_idle_sessions_move_to_the_archive(self):
+        """Test idle messages leave the hot table but read back the same"""
+        before = self.client.get(f'/api/v1/chat/sessions/{self.idle.id}/messages/').json()
+        self.assertIn('Archived 5 messages from 1 sessions', self.archive())
+
+        self.assertFalse(ChatMessage.objects.filter(session=self.idle).exists())
+        self.assertEqual(ChatMessage.objects.filter(session=self.active).count(), 2)
+        archive = ChatArchive.objects.get(session=self.idle)
+        self.assertEqual(archive.message_count, 5)
+        self.assertLess(len(archive.data), archive.raw_size)
+        self.assertEqual(self.client.get(f'/api/v1/chat/sessions/{self.idle.id}/messages/').json(), before)
+        self.assertIn('No idle sessions', self.archive())
+
+    def test_pages_run_from_hot_rows_into_the_archive(self):
+        """Test cursors cross from new messages into archived ones and back"""
+        self.archive()
+        self.idle.refresh_from_db()
+        self.add(self.idle, 3, start=6)
+
+        data, contents = self.contents(self.idle, page_size=4)
+        self.assertEqual(contents, ['Message 5 ✓', 'Message 6 ✓', 'Message 7 ✓', 'Message 8 ✓'])
+        first_page = data
+        data, contents = self.contents(self.idle, page_size=4, before=data['before'])
+        self.assertEqual(contents, ['Message 1 ✓', 'Message 2 ✓', 'Message 3 ✓', 'Message 4 ✓'])
+        self.assertFalse(data['has_older'])
+        data, contents = self.contents(self.idle, page_size=2, after=data['after'])
+        self.assertEqual(contents, ['Message 5 ✓', 'Message 6 ✓'])
+        self.assertTrue(data['has_newer'])
+
+        # Going idle again appends the new messages to the same archive
+        self.make_idle(self.idle)
+        self.archive()
+        self.assertEqual(ChatArchive.objects.get(session=self.idle).message_count, 8)
+        self.assertEqual(self.contents(self.idle, page_size=4)[1], [item['content'] for item in first_page['results']])
+
+    def test_pages_decode_the_archive_once(self):
+        """Test paging through an archive decompresses it on the first page only"""
+        self.archive()
+        with patch('apps.chatbot.archive.decode', wraps=decode) as decoded:
+            data, contents = self.contents(self.idle, page_size=2)
+            self.assertEqual(contents, ['Message 4 ✓', 'Message 5 ✓'])
+            data, contents = self.contents(self.idle, page_size=2, before=data['before'])
+            self.assertEqual(contents, ['Message 2 ✓', 'Message 3 ✓'])
+        self.assertEqual(decoded.call_count, 1)
+
+        # Appending to the archive moves ``archived_through`` and so the cache key
+        self.idle.refresh_from_db()
+        self.add(self.idle, 1, start=6)
+        self.make_idle(self.idle)
+        self.archive()
+        self.assertEqual(self.contents(self.idle, page_size=2)[1], ['Message 5 ✓', 'Message 6 ✓'])
+
+    @override_settings(LLM_BACKEND='fake', LLM_FAKE_LATENCY=0, LLM_FAKE_FAILURE_RATE=0, CHAT_HISTORY_MAX_MESSAGES=3)
+    def test_resumed_session_keeps_its_archived_context(self):
+        """Test the window and the summary of a resumed session read its archived messages"""
+        self.archive()
+        self.idle.refresh_from_db()
+        self.add(self.idle, 1, start=6)
+        turn = ChatTurn.load(self.idle, 'Back again')
+        self.assertEqual(
+            [msg.content for msg in turn.window], ['Message 4 ✓', 'Message 5 ✓', 'Message 6 ✓']
+        )
+        archived = archived_messages(self.idle)
+        self.assertEqual(turn.dropped_through, archived[2].id)
+
+        self.assertTrue(summarize_session(self.idle.id, turn.dropped_through))
+        self.idle.refresh_from_db()
+        self.assertEqual(self.idle.summary_through, archived[2].id)
+
+    def test_runs_resume_where_they_stopped(self):
+        """Test a limited run archives some sessions and the next run the rest"""
+        self.make_idle(self.active)
+        self.assertIn('[1/1]', self.archive('--limit', '1'))
+        self.assertEqual(ChatArchive.objects.count(), 1)
+        self.assertIn('[1/1]', self.archive())
+        self.assertEqual(ChatArchive.objects.count(), 2)
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_archived_session_continues_the_conversation(self):
+        """Test a turn in an archived session is not treated as the first one"""
+        self.archive()
+        self.idle.refresh_from_db()
+        turn = ChatTurn.load(self.idle, 'Back again')
+        self.assertEqual(turn.prompt, 'Back again')
+        turn.save('Welcome back')
+        self.idle.refresh_from_db()
+        self.assertEqual(self.idle.message_count, 7)
+
+        out = StringIO()
+        call_command('backfill_session_activity', stdout=out)
+        self.assertIn('2 sessions in sync', out.getvalue())
+
+
+class ChatExportTests(TestCase):
+    """
+    Test case for the streaming NDJSON export of chat messages.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(username='analyst', email='analyst@example.com', password='testpassword123', is_staff=True)
+        self.learner = User.objects.create_user(username='learner', email='learner@example.com', password='testpassword123')
+        self.client.force_authenticate(user=self.staff)
+        self.grammar = self.chat(self.learner, 'grammar', ['Is it "fewer" or "less"?', 'Fewer, for countable nouns.'])
+        self.writing = self.chat(self.staff, 'writing', ['Check my essay ✍️'])
+        self.old = self.chat(self.learner, 'grammar', ['An old question', 'An old answer'])
+        ChatSession.objects.filter(id=self.old.id).update(last_message_at=timezone.now() - timedelta(days=365))
+        call_command('archive_chat_messages', stdout=StringIO())
+
+    def chat(self, user, focus, contents):
+        session = ChatSession.objects.create(user=user, learning_focus=focus)
+        session.add_messages([
+            ChatMessage(session=session, role='user' if index % 2 == 0 else 'assistant', content=content)
+            for index, content in enumerate(contents)
+        ])
+        return session
+
+    def export(self, **params):
+        response = self.client.get('/api/v1/chat/sessions/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content)
+        return response, body
+
+    def rows(self, body):
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    def test_exports_hot_and_archived_messages(self):
+        """Test every message is exported once, joined to its session and user"""
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = self.rows(body)
+        self.assertEqual([row['content'] for row in rows], [
+            'An old question', 'An old answer',
+            'Is it "fewer" or "less"?', 'Fewer, for countable nouns.', 'Check my essay ✍️',
+        ])
+        self.assertEqual(rows[2]['username'], 'learner')
+        self.assertEqual(rows[2]['learning_focus'], 'grammar')
+        self.assertEqual(rows[2]['session_id'], self.grammar.id)
+
+    def test_filters(self):
+        """Test the user, focus and date filters, including on archived messages"""
+        _, body = self.export(user_id=self.learner.id, focus='grammar')
+        self.assertEqual(len(self.rows(body)), 4)
+        _, body = self.export(focus='writing')
+        self.assertEqual([row['session_id'] for row in self.rows(body)], [self.writing.id])
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+        _, body = self.export(since=tomorrow)
+        self.assertEqual(body, b'')
+        _, body = self.export(until=tomorrow)
+        self.assertEqual(len(self.rows(body)), 5)
+
+    def test_gzip(self):
+        """Test the gzipped export decompresses to the plain one"""
+        _, plain = self.export()
+        response, body = self.export(gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('chat-messages.ndjson.gz', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(body), plain)
+
+    async def test_asgi_streams_the_export(self):
+        """Test the export is an async body under ASGI, so it is sent as it is read"""
+        _, plain = await sync_to_async(self.export)()
+        await self.async_client.aforce_login(self.staff)
+        for params, decode in (({}, bytes), ({'gzip': '1'}, gzip.decompress)):
+            response = await self.async_client.get('/api/v1/chat/sessions/export/', params)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+            self.assertEqual(decode(body), plain)
+
+    def test_staff_only_and_invalid_filters(self):
+        """Test learners cannot export and bad filters are rejected"""
+        self.assertEqual(self.client.get('/api/v1/chat/sessions/export/', {'since': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/chat/sessions/export/', {'focus': 'cooking'}).status_code, 400)
+        self.client.force_authenticate(user=self.learner)
+        self.assertEqual(self.client.get('/api/v1/chat/sessions/export/').status_code, 403)
+
+    def test_command_writes_gzipped_file(self):
+        """Test the management command matches the endpoint"""
+        _, plain = self.export(user_id=self.learner.id)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.ndjson.gz')
+            out = StringIO()
+            call_command('export_chat_messages', '--output', path, '--gzip', '--user-id', str(self.learner.id), stdout=out)
+            with gzip.open(path, 'rb') as exported:
+                self.assertEqual(exported.read(), plain)
+        self.assertIn('Exported 4 messages', out.getvalue())
@@ -0,0 +1,82 @@
+"""
+One chat turn as a single unit of work.
+
+A turn reads the session's history window once, derives everything else
+(whether the session is new, the prompt, the model history) from that, and
+writes the user message and the reply with one ``bulk_create`` plus one
+session update (settings, message count, newest message) inside a
+transaction:
+
+    turn = ChatTurn.load(session, user_message, created)
+    reply = generate_response(turn.prompt, session, history=turn.history())
+    assistant_message = turn.save(reply)
+"""
+from asgiref.sync import sync_to_async
+
+from .context import aload_window, history_from, load_window
+from .models import ChatMessage
+from .utils import system_message
+
+SESSION_FIELDS = ['title', 'proficiency_level', 'learning_focus']
+
+
+class ChatTurn:
+    """A user message and its reply in ``session``."""
+
+    def __init__(self, session, user_message, window=(), dropped_through=0):
+        self.session = session
+        self.user_message = user_message
+        self.window = list(window)
+        self.dropped_through = dropped_through
+        # Nothing stored yet, and nothing summarized or archived away either
+        self.is_new = not self.window and not session.summary_through and not session.archived_through
+
+    @classmethod
+    def load(cls, session, user_message, created=False):
+        """Load the turn's state; a session created for this turn has no messages to read."""
+        if created:
+            return cls(session, user_message)
+        return cls(session, user_message, *load_window(session))
+
+    @classmethod
+    async def aload(cls, session, user_message, created=False):
+        """Async ``load`` using the async ORM."""
+        if created:
+            return cls(session, user_message)
+        return cls(session, user_message, *await aload_window(session))
+
+    @property
+    def prompt(self):
+        """The prompt for the model; the first message of a session carries the learning context."""
+        if self.is_new:
+            return (
+                f"[English level: {self.session.proficiency_level}, Focus: {self.session.learning_focus}] "
+                + self.user_message
+            )
+        return self.user_message
+
+    def history(self, after_commit=True):
+        """History sent with the prompt: system prompt (and summary), then the window."""
+        return history_from(self.session, system_message(), self.window, self.dropped_through, after_commit)
+
+    def save(self, reply):
+        """
+        Store the turn: the user message and ``reply`` (if any), then the
+        session's title, learning settings, timestamp and message counters.
+        Returns the stored reply, or None.
+        """
+        session = self.session
+        messages = [ChatMessage(session=session, role='user', content=self.user_message)]
+        if reply:
+            messages.append(ChatMessage(session=session, role='assistant', content=reply))
+
+        # Name new sessions after their first message
+        if session.title == "New Chat" and len(self.user_message) > 5:
+            session.title = self.user_message[:50] + ("..." if len(self.user_message) > 50 else "")
+
+        messages = session.add_messages(messages, update_fields=SESSION_FIELDS)
+        return messages[-1] if reply else None
+
+    async def asave(self, reply):
+        """Async ``save``; Django has no async transactions, so it runs in a thread."""
+        return await sync_to_async(self.save)(reply)
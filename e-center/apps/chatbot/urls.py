@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import ChatSessionViewSet
 
 app_name = 'chatbot'
@@ -9,4 +10,10 @@ router.register(r'sessions', ChatSessionViewSet, basename='chatsession')
 
 urlpatterns = [
     path('', include(router.urls)),
-]
\ No newline at end of file
+    # Non-blocking variants of the LLM-bound actions for ASGI deployments
+    path('async/chat/', async_views.chat, name='async-chat'),
+    path('async/simple-chat/', async_views.simple_chat, name='async-simple-chat'),
+    path('async/test/', async_views.test, name='async-test'),
+    # Queued chat turns (``sessions/chat/?job=1``); ``?wait=N`` long-polls
+    path('jobs/<uuid:job_id>/', async_views.job_detail, name='chat-job'),
+]
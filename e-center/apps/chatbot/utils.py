@@ -1,7 +1,13 @@
 import google.generativeai as genai
 import re
 import random
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from .context import abuild_history, build_history
+from .llm import get_backend
+from .limits import LLMBusy, allm_slot, llm_slot
+from .resilience import CircuitOpen, aguarded_generate, guarded_generate, guarded_stream
+from .response_cache import get_response_cache
 from .models import ChatMessage
 from .templates import EXERCISE_TEMPLATES, LESSON_PLANS, TEACHING_METHODOLOGIES
 from .exercise_generator import detect_exercise_request, generate_exercise, generate_lesson_plan, get_teaching_methodology_recommendation
@@ -18,12 +24,9 @@ def initialize_genai():
         return False
 
 def test_gemini_connection():
-    """Test the connection to Gemini API."""
+    """Test the connection to the configured LLM backend."""
     try:
-        initialize_genai()
-        model = genai.GenerativeModel('models/gemini-pro-latest')
-        response = model.generate_content("Hello, please respond with 'API is working' if you can receive this message.")
-        return response.text
+        return get_backend().health_check()
     except Exception as e:
         import traceback
         print(f"Test connection failed: {e}")
@@ -31,19 +34,15 @@ def test_gemini_connection():
         return f"Connection failed: {str(e)}"
 
 
-def get_chat_history(session):
-    """Convert chat messages to format expected by Gemini."""
-    messages = []
-    
-    for msg in session.messages.all():
-        # Convert 'assistant' role to 'model' as required by Gemini
-        role = "model" if msg.role == "assistant" else "user"
-        messages.append({
-            "role": role,
-            "parts": [msg.content]
-        })
-    
-    return messages
+async def atest_gemini_connection():
+    """Async variant of ``test_gemini_connection``; does not block the event loop."""
+    try:
+        return await get_backend().ahealth_check()
+    except Exception as e:
+        import traceback
+        print(f"Test connection failed: {e}")
+        print(traceback.format_exc())
+        return f"Connection failed: {str(e)}"
 
 
 # System prompt for English teaching
@@ -65,146 +64,266 @@ Answer short as long as possible.
 """
 
 
-def generate_response(user_message, session=None):
-    """Generate a response from Gemini AI with English teaching focus."""
-    initialize_genai()
+GREETING = "Hello! I'm Teacher Emma, your English language tutor. How can I help you learn English today?"
+
+MODEL_ACKNOWLEDGEMENT = "I understand. I'll act as Teacher Emma, an English language tutor focused on helping Turkmen speakers learn English."
+
+
+def prepare_message(user_message, session=None, proficiency_level=None, learning_focus=None):
+    """
+    Turn the user's message into the prompt sent to the model. The learning
+    context comes from ``session`` or, for session-less chats, the explicit
+    level and focus.
+    """
+    # Check if this is a request for a specific exercise or lesson plan
+    is_exercise, is_lesson = False, False
+    
+    # Process the message to detect if it's a request for an exercise
+    exercise_results = detect_exercise_request(user_message)
+    
+    # Check what type of request it is
+    if exercise_results[0]:  # Exercise request
+        is_exercise = True
+        exercise_type = exercise_results[1]
+        level = exercise_results[2]
+        # Generate an exercise based on the detected type and level
+        enhanced_message = generate_exercise(exercise_type, level)
+        print(f"Generated exercise request for {exercise_type} at {level} level")
+    elif len(exercise_results) > 1 and exercise_results[1]:  # Lesson plan request
+        is_lesson = True
+        if len(exercise_results) > 3:
+            lesson_type = exercise_results[2]
+            topic = exercise_results[3]
+            enhanced_message = generate_lesson_plan(lesson_type, topic)
+        else:
+            lesson_type = exercise_results[2]
+            enhanced_message = generate_lesson_plan(lesson_type)
+        print(f"Generated lesson plan for {lesson_type}")
+    else:
+        # Regular message - use as is
+        enhanced_message = user_message
     
+    # If user asks for teaching methodology
+    if "teaching method" in user_message.lower() or "methodology" in user_message.lower():
+        methodology_info = get_teaching_methodology_recommendation()
+        # Add this to the message for the model to elaborate on
+        enhanced_message = f"{user_message}\n\nConsider discussing this methodology: {methodology_info}"
+    
+    if session:
+        proficiency_level, learning_focus = session.proficiency_level, session.learning_focus
+    
+    # Add proficiency level and learning focus context if available.
+    # Exercises and lesson plans have already been adapted.
+    if proficiency_level and learning_focus and not (is_exercise or is_lesson):
+        enhanced_message = (
+            f"[Context: User is at {proficiency_level} level focusing on {learning_focus}] "
+            f"{enhanced_message}"
+        )
+    
+    return enhanced_message
+
+
+def system_message():
+    return {
+        "role": "user",
+        "parts": ["You are an English teaching assistant. Please follow these instructions: " + ENGLISH_TEACHER_PROMPT]
+    }
+
+
+def conversation(enhanced_message, session=None):
+    """Return ``(history, message)`` for the backend, greeting new sessions."""
+    # If starting a new chat session
+    if session and not session.archived_through and not session.messages.exists():
+        # Greet in the stored history, but keep the system prompt out of it
+        session.add_messages([ChatMessage(session=session, role="assistant", content=GREETING)])
+        return [system_message()], enhanced_message
+    
+    # If we have an existing session with history: a token-budgeted window
+    # of recent messages, with older turns folded into the session summary
+    if session:
+        return build_history(session, system_message()), enhanced_message
+    
+    # One-off response with system prompt
+    return one_off_history(), enhanced_message
+
+
+async def aconversation(enhanced_message, session=None):
+    """Async ``conversation`` using the async ORM."""
+    if session and not session.archived_through and not await session.messages.aexists():
+        await sync_to_async(session.add_messages)([ChatMessage(session=session, role="assistant", content=GREETING)])
+        return [system_message()], enhanced_message
+    
+    if session:
+        return await abuild_history(session, system_message()), enhanced_message
+    
+    return one_off_history(), enhanced_message
+
+
+def one_off_history():
+    """History for a session-less request: system prompt and acknowledgement."""
+    return [system_message(), {"role": "model", "parts": [MODEL_ACKNOWLEDGEMENT]}]
+
+
+def error_message(error):
+    """User-facing text for a failed generation."""
+    # More specific error messages based on the type of exception
+    if "api_key" in str(error).lower() or "authentication" in str(error).lower():
+        return "I'm sorry, there appears to be an issue with the API authentication. Please contact support."
+    elif "quota" in str(error).lower() or "limit" in str(error).lower():
+        return "I'm sorry, we've reached our API usage limit. Please try again later."
+    elif "model" in str(error).lower() and "not found" in str(error).lower():
+        return "I'm sorry, the AI model is currently unavailable. Please try again later."
+    else:
+        return "I'm sorry, I'm having trouble responding right now. Please try again later."
+
+
+def generate_response(user_message, session=None, history=None):
+    """
+    Generate a response from Gemini AI with English teaching focus. Chat
+    turns pass the ``history`` they already loaded (see ``ChatTurn``).
+    """
     try:
-        # Check if this is a request for a specific exercise or lesson plan
-        is_exercise, is_lesson, exercise_type, level = False, False, None, None
-        
-        # Process the message to detect if it's a request for an exercise
-        exercise_results = detect_exercise_request(user_message)
-        
-        # Check what type of request it is
-        if exercise_results[0]:  # Exercise request
-            is_exercise = True
-            exercise_type = exercise_results[1]
-            level = exercise_results[2]
-            # Generate an exercise based on the detected type and level
-            enhanced_message = generate_exercise(exercise_type, level)
-            print(f"Generated exercise request for {exercise_type} at {level} level")
-        elif len(exercise_results) > 1 and exercise_results[1]:  # Lesson plan request
-            is_lesson = True
-            if len(exercise_results) > 3:
-                lesson_type = exercise_results[2]
-                topic = exercise_results[3]
-                enhanced_message = generate_lesson_plan(lesson_type, topic)
-            else:
-                lesson_type = exercise_results[2]
-                enhanced_message = generate_lesson_plan(lesson_type)
-            print(f"Generated lesson plan for {lesson_type}")
+        if history is None:
+            history, message = conversation(prepare_message(user_message, session), session)
         else:
-            # Regular message - use as is
-            enhanced_message = user_message
-        
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 2048,
-        }
-        
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        ]
-        
-        try:
-            model = genai.GenerativeModel(
-                model_name='models/gemini-pro-latest',
-                generation_config=generation_config,
-                safety_settings=safety_settings,
-            )
-        except Exception as model_error:
-            print(f"Error creating Gemini model: {model_error}")
-            # Try fallback model if main model fails
-            model = genai.GenerativeModel(
-                model_name='models/gemini-2.5-flash',
-                generation_config=generation_config,
-                safety_settings=safety_settings,
-            )
-        
-        # If user asks for teaching methodology
-        if "teaching method" in user_message.lower() or "methodology" in user_message.lower():
-            methodology_info = get_teaching_methodology_recommendation()
-            # Add this to the message for the model to elaborate on
-            enhanced_message = f"{user_message}\n\nConsider discussing this methodology: {methodology_info}"
-        
-        # Add proficiency level and learning focus context if available in the session
-        if session:
-            proficiency = session.proficiency_level
-            focus = session.learning_focus
-            
-            # Add a hint about the user's level and focus to help model adapt its response
-            if is_exercise or is_lesson:
-                # For exercises and lesson plans, we've already adapted the message
-                pass
-            else:
-                # For regular messages, add context about the user's profile
-                enhanced_message = f"[Context: User is at {proficiency} level focusing on {focus}] {enhanced_message}"
-        
-        # If starting a new chat session
-        if session and not session.messages.exists():
-            # Add system prompt as first message
-            ChatMessage.objects.create(
-                session=session,
-                role="assistant",
-                content="Hello! I'm Teacher Emma, your English language tutor. How can I help you learn English today?"
-            )
-            
-            # Use system prompt but don't save it to history
-            messages = [{
-                "role": "user",
-                "parts": ["You are an English teaching assistant. Please follow these instructions: " + ENGLISH_TEACHER_PROMPT]
-            }]
-            
-            chat = model.start_chat(history=messages)
-            response = chat.send_message(enhanced_message)
-        
-        # If we have an existing session with history
-        elif session and session.messages.exists():
-            # Get existing chat history
-            chat_history = get_chat_history(session)
-            
-            # Insert system prompt at the beginning of history
-            chat_history.insert(0, {
-                "role": "user",
-                "parts": ["You are an English teaching assistant. Please follow these instructions: " + ENGLISH_TEACHER_PROMPT]
-            })
-            
-            # Start chat with history including system prompt
-            chat = model.start_chat(history=chat_history)
-            response = chat.send_message(enhanced_message)
+            message = prepare_message(user_message, session)
+        return guarded_generate(history, message)
+    except CircuitOpen as e:
+        return error_message(e)  # Open circuit: fail fast, no traceback per request
+    except Exception as e:
+        import traceback
+        print(f"Error generating response: {e}")
+        print(traceback.format_exc())
+        return error_message(e)
+
+
+async def agenerate_response(user_message, session=None, history=None):
+    """
+    Async ``generate_response`` for the ASGI chat views: the event loop
+    keeps serving other requests while the model is thinking.
+    """
+    try:
+        if history is None:
+            history, message = await aconversation(prepare_message(user_message, session), session)
         else:
-            # One-off response with system prompt
-            messages = [{
-                "role": "user",
-                "parts": ["You are an English teaching assistant. Please follow these instructions: " + ENGLISH_TEACHER_PROMPT]
-            }, {
-                "role": "model",
-                "parts": ["I understand. I'll act as Teacher Emma, an English language tutor focused on helping Turkmen speakers learn English."]
-            }, {
-                "role": "user",
-                "parts": [enhanced_message]
-            }]
-            
-            response = model.generate_content(messages)
-            
-        return response.text
+            message = prepare_message(user_message, session)
+        return await aguarded_generate(history, message)
+    except CircuitOpen as e:
+        return error_message(e)  # Open circuit: fail fast, no traceback per request
     except Exception as e:
         import traceback
         print(f"Error generating response: {e}")
         print(traceback.format_exc())
-        
-        # More specific error messages based on the type of exception
-        if "api_key" in str(e).lower() or "authentication" in str(e).lower():
-            return "I'm sorry, there appears to be an issue with the API authentication. Please contact support."
-        elif "quota" in str(e).lower() or "limit" in str(e).lower():
-            return "I'm sorry, we've reached our API usage limit. Please try again later."
-        elif "model" in str(e).lower() and "not found" in str(e).lower():
-            return "I'm sorry, the AI model is currently unavailable. Please try again later."
+        return error_message(e)
+
+
+def is_cacheable(user_message):
+    """Exercises, lesson plans and methodology tips are meant to vary between requests."""
+    is_exercise, is_lesson = detect_exercise_request(user_message)[:2]
+    lowered = user_message.lower()
+    return not (is_exercise or is_lesson or "teaching method" in lowered or "methodology" in lowered)
+
+
+class SimpleQuestion:
+    """
+    A session-less question: the answer cached for an earlier near-identical
+    question at the same level and focus, and the prompt to generate one.
+    """
+
+    def __init__(self, user_message, proficiency_level=None, learning_focus=None):
+        self.user_message = user_message
+        self.proficiency_level = proficiency_level
+        self.learning_focus = learning_focus
+        self.scope = (proficiency_level or '', learning_focus or '')
+        self.cacheable = is_cacheable(user_message)
+
+    def cached(self):
+        """The cached answer, or None."""
+        if not self.cacheable:
+            return None
+        return get_response_cache().get(self.user_message, self.scope)
+
+    def prompt(self):
+        """``(history, message)`` for the model."""
+        return one_off_history(), prepare_message(self.user_message, None, self.proficiency_level, self.learning_focus)
+
+    def remember(self, response):
+        if self.cacheable:
+            get_response_cache().set(self.user_message, response, self.scope)
+
+
+def failed_response(e):
+    """Log a failed generation and return the apology shown instead."""
+    if not isinstance(e, CircuitOpen):  # Open circuit: fail fast, no traceback per request
+        import traceback
+        print(f"Error generating response: {e}")
+        print(traceback.format_exc())
+    return error_message(e)
+
+
+def generate_simple_response(user_message, proficiency_level=None, learning_focus=None):
+    """
+    Session-less ``generate_response`` that reuses the answer to an earlier
+    near-identical question at the same level and focus. Failed generations
+    are not cached. Raises ``LLMBusy`` if a model call is needed while
+    ``CHAT_MAX_IN_FLIGHT`` calls are already running.
+    """
+    question = SimpleQuestion(user_message, proficiency_level, learning_focus)
+    cached = question.cached()
+    if cached is not None:
+        return cached
+
+    try:
+        history, message = question.prompt()
+        with llm_slot():
+            response = guarded_generate(history, message)
+    except LLMBusy:
+        raise
+    except Exception as e:
+        return failed_response(e)
+    question.remember(response)
+    return response
+
+
+async def agenerate_simple_response(user_message, proficiency_level=None, learning_focus=None):
+    """Async ``generate_simple_response``."""
+    question = SimpleQuestion(user_message, proficiency_level, learning_focus)
+    cached = question.cached()
+    if cached is not None:
+        return cached
+
+    try:
+        history, message = question.prompt()
+        async with allm_slot():
+            response = await aguarded_generate(history, message)
+    except LLMBusy:
+        raise
+    except Exception as e:
+        return failed_response(e)
+    question.remember(response)
+    return response
+
+
+def generate_response_stream(user_message, session=None, history=None):
+    """
+    Stream a response from the LLM as text chunks, as soon as the model
+    produces them. Closing the generator stops reading from the model.
+    """
+    produced = False
+    try:
+        if history is None:
+            history, message = conversation(prepare_message(user_message, session), session)
         else:
-            return "I'm sorry, I'm having trouble responding right now. Please try again later."
\ No newline at end of file
+            message = prepare_message(user_message, session)
+        for text in guarded_stream(history, message):
+            produced = True
+            yield text
+    except CircuitOpen as e:
+        yield error_message(e)  # Nothing has been produced before the breaker check
+    except Exception as e:
+        import traceback
+        print(f"Error streaming response: {e}")
+        print(traceback.format_exc())
+        # Once text has been sent there is nothing sensible to append
+        if not produced:
+            yield error_message(e)
@@ -5,6 +5,8 @@ import time
 import logging
 from django.conf import settings
 from django.core.cache import cache
+from .context import build_history
+from .llm import get_backend
 from .models import ChatMessage
 from .templates import EXERCISE_TEMPLATES, LESSON_PLANS, TEACHING_METHODOLOGIES
 from .exercise_generator import detect_exercise_request, generate_exercise, generate_lesson_plan, get_teaching_methodology_recommendation
@@ -40,10 +42,7 @@ def test_gemini_connection():
         return cached_result
     
     try:
-        initialize_genai()
-        model = genai.GenerativeModel('models/gemini-pro-latest')
-        response = model.generate_content("Hello, please respond with 'API is working' if you can receive this message.")
-        result = response.text
+        result = get_backend().health_check()
         
         # Cache successful connection for 5 minutes
         cache.set(cache_key, result, 300)
@@ -59,30 +58,6 @@ def test_gemini_connection():
         return error_msg
 
 
-def get_chat_history(session):
-    """Convert chat messages to format expected by Gemini with caching."""
-    cache_key = f'chat_history_{session.id}_{session.updated_at.timestamp()}'
-    cached_history = cache.get(cache_key)
-    
-    if cached_history:
-        return cached_history
-    
-    messages = []
-    
-    # Use select_related to avoid N+1 queries
-    for msg in session.messages.all():
-        # Convert 'assistant' role to 'model' as required by Gemini
-        role = "model" if msg.role == "assistant" else "user"
-        messages.append({
-            "role": role,
-            "parts": [msg.content]
-        })
-    
-    # Cache history for 5 minutes
-    cache.set(cache_key, messages, 300)
-    return messages
-
-
 # System prompt for English teaching (cached)
 def get_english_teacher_prompt():
     """Get the English teacher prompt with caching."""
@@ -137,47 +112,18 @@ When asked, you can provide complete lesson plans on specific topics.
     return prompt
 
 
-def get_cached_model():
-    """Get or create a cached Gemini model instance."""
-    cache_key = 'gemini_model_instance'
-    
-    # Don't cache the actual model object as it's not serializable
-    # Instead, create it fresh each time but with optimized settings
-    
-    generation_config = {
+# Faster, shorter replies than the default backend settings; these options
+# only apply to the Gemini backend
+MODEL_OPTIONS = {
+    'model_name': 'models/gemini-2.5-flash',  # Use faster flash model
+    'fallback_model_name': 'models/gemini-pro',
+    'generation_config': {
         "temperature": 0.7,
         "top_p": 0.95,
         "top_k": 40,
         "max_output_tokens": 1024,  # Reduced for faster responses
-    }
-    
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-    ]
-    
-    try:
-        model = genai.GenerativeModel(
-            model_name='models/gemini-2.5-flash',  # Use faster flash model
-            generation_config=generation_config,
-            safety_settings=safety_settings,
-        )
-        return model
-    except Exception as model_error:
-        logger.error(f"Error creating Gemini model: {model_error}")
-        # Try fallback model if main model fails
-        try:
-            model = genai.GenerativeModel(
-                model_name='models/gemini-pro',
-                generation_config=generation_config,
-                safety_settings=safety_settings,
-            )
-            return model
-        except Exception as fallback_error:
-            logger.error(f"Fallback model also failed: {fallback_error}")
-            raise Exception("Unable to initialize any Gemini model")
+    },
+}
 
 
 def generate_response(user_message, session=None):
@@ -193,8 +139,6 @@ def generate_response(user_message, session=None):
             logger.info("Returning cached response")
             return cached_response
     
-    initialize_genai()
-    
     try:
         # Check if this is a request for a specific exercise or lesson plan
         is_exercise, is_lesson, exercise_type, level = False, False, None, None
@@ -224,9 +168,6 @@ def generate_response(user_message, session=None):
             # Regular message - use as is
             enhanced_message = user_message
         
-        # Get optimized model instance
-        model = get_cached_model()
-        
         # If user asks for teaching methodology
         if "teaching method" in user_message.lower() or "methodology" in user_message.lower():
             methodology_info = get_teaching_methodology_recommendation()
@@ -246,51 +187,27 @@ def generate_response(user_message, session=None):
         # Get the system prompt
         system_prompt = get_english_teacher_prompt()
         
-        # If starting a new chat session
+        system_message = {
+            "role": "user",
+            "parts": [f"You are an English teaching assistant. Please follow these instructions: {system_prompt}"]
+        }
+        
+        # If starting a new chat session, send only the system prompt
         if session and not session.messages.exists():
-            # Use system prompt but don't save it to history
-            messages = [{
-                "role": "user",
-                "parts": [f"You are an English teaching assistant. Please follow these instructions: {system_prompt}"]
-            }]
-            
-            chat = model.start_chat(history=messages)
-            response = chat.send_message(enhanced_message)
+            history = [system_message]
         
-        # If we have an existing session with history
-        elif session and session.messages.exists():
-            # Get existing chat history (cached)
-            chat_history = get_chat_history(session)
-            
-            # Limit history to last 10 messages for performance
-            if len(chat_history) > 10:
-                chat_history = chat_history[-10:]
-            
-            # Insert system prompt at the beginning of history
-            chat_history.insert(0, {
-                "role": "user",
-                "parts": [f"You are an English teaching assistant. Please follow these instructions: {system_prompt}"]
-            })
-            
-            # Start chat with history including system prompt
-            chat = model.start_chat(history=chat_history)
-            response = chat.send_message(enhanced_message)
+        # If we have an existing session with history: a token-budgeted
+        # window of recent messages, older turns folded into the summary
+        elif session:
+            history = build_history(session, system_message)
         else:
             # One-off response with system prompt
-            messages = [{
-                "role": "user",
-                "parts": [f"You are an English teaching assistant. Please follow these instructions: {system_prompt}"]
-            }, {
+            history = [system_message, {
                 "role": "model",
                 "parts": ["I understand. I'll act as Teacher Emma, an English language tutor focused on helping Turkmen speakers learn English."]
-            }, {
-                "role": "user",
-                "parts": [enhanced_message]
             }]
-            
-            response = model.generate_content(messages)
         
-        response_text = response.text
+        response_text = get_backend().generate(history, enhanced_message, **MODEL_OPTIONS)
         
         # Cache the response for 10 minutes if it's from a session
         if session:
@@ -1,17 +1,39 @@
+import json
+from contextlib import closing
+
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled, ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 
-from .models import ChatSession, ChatMessage
+from apps.core.pagination import KeysetPagination
+from apps.core.utils import streamed_content
+
+from .archive import archived_messages
+from .export import export_filters, export_records, gzip_chunks, ndjson_chunks
+from .jobs import enqueue, job_payload
+from .limits import ChatRateThrottle, LLMBusy, acquire_llm_slot, release_llm_slot
+from .models import ChatMessage, ChatSession
 from .serializers import (
+    ChatSessionListSerializer,
     ChatSessionSerializer,
     ChatMessageSerializer,
     ChatRequestSerializer,
-    ChatResponseSerializer
+    ChatResponseSerializer,
+    SimpleChatContextSerializer
 )
-from .utils import generate_response, test_gemini_connection
+from .response_cache import get_response_cache
+from .turns import ChatTurn
+from .utils import generate_response, generate_response_stream, generate_simple_response, test_gemini_connection
+
+
+def server_sent_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 class ChatSessionViewSet(viewsets.ModelViewSet):
@@ -25,17 +47,93 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
         """Return chat sessions for the authenticated user."""
         return ChatSession.objects.filter(user=self.request.user)
     
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ChatSessionListSerializer
+        return ChatSessionSerializer
+    
+    
     def perform_create(self, serializer):
         """Save the user when creating a chat session."""
         serializer.save(user=self.request.user)
     
+    def get_chat_user(self, request):
+        """The authenticated user, or a shared test user for anonymous chats."""
+        from apps.users.models import User
+        if request.user.is_authenticated:
+            return request.user
+        
+        # Use a test user or create one if needed
+        test_user, created = User.objects.get_or_create(
+            username='test_user',
+            defaults={
+                'email': 'test@example.com',
+                'first_name': 'Test',
+                'last_name': 'User'
+            }
+        )
+        if created:
+            test_user.set_password('testpassword123')
+            test_user.save()
+        return test_user
+    
+    def get_chat_session(self, user, data):
+        """
+        Return ``(session, created)`` for the requested session, retuned to
+        the requested level and focus (saved with the turn), or a new one.
+        ``(None, False)`` if not found.
+        """
+        session_id = data.get('session_id')
+        proficiency_level = data.get('proficiency_level')
+        learning_focus = data.get('learning_focus')
+        
+        if session_id:
+            try:
+                session = ChatSession.objects.get(id=session_id, user=user)
+            except ChatSession.DoesNotExist:
+                return None, False
+            
+            # Update proficiency and focus if provided
+            if proficiency_level:
+                session.proficiency_level = proficiency_level
+            if learning_focus:
+                session.learning_focus = learning_focus
+            return session, False
+        
+        # Create new session with optional proficiency and focus
+        session_data = {
+            'user': user,
+        }
+        if proficiency_level:
+            session_data['proficiency_level'] = proficiency_level
+        if learning_focus:
+            session_data['learning_focus'] = learning_focus
+        return ChatSession.objects.create(**session_data), True
+    
     @extend_schema(
         request=ChatRequestSerializer,
         responses={200: ChatResponseSerializer},
-        description="Send a message to Gemini AI and get a response.",
+        parameters=[
+            OpenApiParameter(
+                name="stream",
+                description="Set to 1 to receive the reply as Server-Sent Events while it is generated",
+                required=False,
+                type=bool,
+            ),
+            OpenApiParameter(
+                name="job",
+                description="Set to 1 to queue the turn and get a job id to poll at /api/v1/chat/jobs/<id>/ (202)",
+                required=False,
+                type=bool,
+            ),
+        ],
+        description=(
+            "Send a message to Gemini AI and get a response. "
+            "Over the per-user/per-IP rate limit, or while too many chats are in progress, answers 429 with Retry-After."
+        ),
         methods=["POST"],
     )
-    @action(detail=False, methods=['post'], permission_classes=[])
+    @action(detail=False, methods=['post'], permission_classes=[], throttle_classes=[ChatRateThrottle])
     def chat(self, request):
         """Send a message to Gemini AI and get a response."""
         serializer = ChatRequestSerializer(data=request.data)
@@ -44,104 +142,105 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             
         user_message = serializer.validated_data['message']
-        session_id = serializer.validated_data.get('session_id')
-        proficiency_level = serializer.validated_data.get('proficiency_level')
-        learning_focus = serializer.validated_data.get('learning_focus')
+        user = self.get_chat_user(request)
         
-        # Get a user - either the authenticated user or create a test user
-        from apps.users.models import User
-        if request.user.is_authenticated:
-            user = request.user
-        else:
-            # Use a test user or create one if needed
-            test_user, created = User.objects.get_or_create(
-                username='test_user',
-                defaults={
-                    'email': 'test@example.com',
-                    'first_name': 'Test',
-                    'last_name': 'User'
-                }
-            )
-            if created:
-                test_user.set_password('testpassword123')
-                test_user.save()
-            user = test_user
+        queued = request.query_params.get('job') in ('1', 'true')
         
-        # Get or create a session
-        if session_id:
-            try:
-                session = ChatSession.objects.get(id=session_id, user=user)
-                
-                # Update proficiency and focus if provided
-                if proficiency_level:
-                    session.proficiency_level = proficiency_level
-                if learning_focus:
-                    session.learning_focus = learning_focus
-                if proficiency_level or learning_focus:
-                    session.save()
-                
-            except ChatSession.DoesNotExist:
+        # Queued turns are bounded by the job workers; direct ones need an in-flight
+        # slot, taken before the session so a refused chat creates none
+        slot = None
+        if not queued:
+            slot = acquire_llm_slot()
+            if slot is None:
+                busy = LLMBusy()
+                raise Throttled(wait=busy.retry_after, detail=str(busy))
+        
+        try:
+            # Get or create a session
+            session, created = self.get_chat_session(user, serializer.validated_data)
+            if session is None:
+                release_llm_slot(slot)
                 return Response(
                     {"error": "Chat session not found"}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
-        else:
-            # Create new session with optional proficiency and focus
-            session_data = {
-                'user': user,
-            }
-            if proficiency_level:
-                session_data['proficiency_level'] = proficiency_level
-            if learning_focus:
-                session_data['learning_focus'] = learning_focus
-                
-            session = ChatSession.objects.create(**session_data)
-        
-        # Customize user message with learning context if it's the first message
-        if not session.messages.exists():
-            # Enhance the first message with learning context
-            context_prefix = f"[English level: {session.proficiency_level}, Focus: {session.learning_focus}] "
-            enhanced_message = context_prefix + user_message
             
-            # Save original user message
-            user_chat_message = ChatMessage.objects.create(
-                session=session,
-                role='user',
-                content=user_message
-            )
+            if queued:
+                return self.enqueue_turn(request, session, user_message, created)
             
-            # Generate response with enhanced context
-            ai_response = generate_response(enhanced_message, session)
-        else:
-            # For subsequent messages, use normal flow
-            user_chat_message = ChatMessage.objects.create(
-                session=session,
-                role='user',
-                content=user_message
+            # Read the session's history once; the turn is written in one go at the end
+            turn = ChatTurn.load(session, user_message, created)
+        except Exception:
+            release_llm_slot(slot)
+            raise
+        
+        if request.query_params.get('stream') in ('1', 'true'):
+            # Also give the slot back if the response is closed without being read
+            response = StreamingHttpResponse(
+                streamed_content(request, self.stream_reply(turn, slot), on_close=lambda: release_llm_slot(slot)),
+                content_type='text/event-stream'
             )
-            
-            # Generate response from Gemini
-            ai_response = generate_response(user_message, session)
-        
-        # Save the AI response
-        assistant_message = ChatMessage.objects.create(
-            session=session,
-            role='assistant',
-            content=ai_response
-        )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the events
+            return response
         
-        # Update the session title if it's a new session
-        if session.title == "New Chat" and len(user_message) > 5:
-            # Use the first few words of the user's message as the title
-            title = user_message[:50] + ("..." if len(user_message) > 50 else "")
-            session.title = title
-            session.save()
+        # Generate response from Gemini
+        try:
+            ai_response = generate_response(turn.prompt, session, history=turn.history())
+        finally:
+            release_llm_slot(slot)
+        assistant_message = turn.save(ai_response)
         
         # Return the response
         return Response({
             'response': ai_response,
             'session_id': session.id,
-            'message_id': assistant_message.id,
+            'message_id': assistant_message.id if assistant_message else None,
+            'proficiency_level': session.proficiency_level,
+            'learning_focus': session.learning_focus
+        })
+    
+    def enqueue_turn(self, request, session, user_message, created):
+        """Queue the turn for a ``run_chat_jobs`` worker and answer 202 with the job to poll."""
+        if not created:
+            # Keep a requested level/focus change; the worker reloads the session
+            session.save(update_fields=['proficiency_level', 'learning_focus', 'updated_at'])
+        job = enqueue(session, user_message, created)
+        payload = job_payload(job)
+        payload['poll_url'] = request.build_absolute_uri(reverse('chatbot:chat-job', args=[job.id]))
+        return Response(payload, status=status.HTTP_202_ACCEPTED)
+    
+    def stream_reply(self, turn, slot=None):
+        """
+        Yield the reply as Server-Sent Events: ``start``, one ``delta`` per
+        chunk from the model, then ``done`` once the turn is stored (with a
+        null ``message_id`` if the model produced no text). If the
+        client goes away mid-stream, the model stream is closed and the turn
+        is stored with the part the client already received. The in-flight
+        ``slot`` is released as soon as the model stream ends.
+        """
+        session = turn.session
+        yield server_sent_event('start', {'session_id': session.id})
+        
+        parts = []
+        try:
+            with closing(generate_response_stream(turn.prompt, session, history=turn.history())) as chunks:
+                try:
+                    for text in chunks:
+                        parts.append(text)
+                        yield server_sent_event('delta', {'text': text})
+                except GeneratorExit:
+                    turn.save(''.join(parts))
+                    raise
+        finally:
+            release_llm_slot(slot)
+        
+        ai_response = ''.join(parts)
+        assistant_message = turn.save(ai_response)
+        yield server_sent_event('done', {
+            'response': ai_response,
+            'session_id': session.id,
+            'message_id': assistant_message.id if assistant_message else None,
             'proficiency_level': session.proficiency_level,
             'learning_focus': session.learning_focus
         })
@@ -162,17 +261,28 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         responses={200: ChatMessageSerializer(many=True)},
-        description="Get messages for a specific chat session.",
+        parameters=[
+            OpenApiParameter(name="before", description="Cursor: load the messages before this page", required=False, type=str),
+            OpenApiParameter(name="after", description="Cursor: load the messages added since this page", required=False, type=str),
+            OpenApiParameter(name="page_size", description="Messages per page (default 50, at most 200)", required=False, type=int),
+        ],
+        description=(
+            "Get messages for a specific chat session, newest page first (oldest first within a page). "
+            "Follow `before` to scroll back and `after` to fetch new messages."
+        ),
         methods=["GET"],
     )
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], pagination_class=KeysetPagination)
     def messages(self, request, pk=None):
-        """Get all messages for a specific chat session."""
+        """Get a page of messages for a specific chat session."""
         try:
-            session = self.get_queryset().get(pk=pk)
-            messages = session.messages.all()
-            serializer = ChatMessageSerializer(messages, many=True)
-            return Response(serializer.data)
+            session = self.get_queryset().only('id', 'archived_through').get(pk=pk)
+            # Messages of idle sessions may have moved to the archive; pages run on into them
+            page = self.paginator.paginate_queryset(
+                ChatMessage.objects.filter(session=session), request, view=self, prefix=archived_messages(session)
+            )
+            serializer = ChatMessageSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         except ChatSession.DoesNotExist:
             return Response(
                 {"error": "Chat session not found"}, 
@@ -180,12 +290,20 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
             )
     
     @extend_schema(
-        request={"type": "object", "properties": {"message": {"type": "string"}}},
+        request={"type": "object", "properties": {
+            "message": {"type": "string"},
+            "proficiency_level": {"type": "string", "enum": [c[0] for c in ChatSession.PROFICIENCY_CHOICES]},
+            "learning_focus": {"type": "string", "enum": [c[0] for c in ChatSession.FOCUS_CHOICES]},
+        }},
         responses={200: {"type": "object", "properties": {"response": {"type": "string"}}}},
-        description="Simple chat without sessions - just send a message and get a response.",
+        description=(
+            "Simple chat without sessions - just send a message and get a response. "
+            "Answers to near-identical questions at the same level and focus are served from a cache. "
+            "Over the per-user/per-IP rate limit, or while too many chats are in progress, answers 429 with Retry-After."
+        ),
         methods=["POST"],
     )
-    @action(detail=False, methods=['post'], url_path='simple-chat', permission_classes=[])
+    @action(detail=False, methods=['post'], url_path='simple-chat', permission_classes=[], throttle_classes=[ChatRateThrottle])
     def simple_chat(self, request):
         """Simple chat without sessions - fast and stateless."""
         user_message = request.data.get('message', '').strip()
@@ -196,17 +314,71 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        context = SimpleChatContextSerializer(data=request.data)
+        if not context.is_valid():
+            return Response(context.errors, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
             # Generate response directly without session
-            ai_response = generate_response(user_message, session=None)
+            ai_response = generate_simple_response(user_message, **context.validated_data)
             
             return Response({
                 'response': ai_response,
                 'message': user_message,
                 'timestamp': __import__('datetime').datetime.now().isoformat()
             })
+        except LLMBusy as e:
+            raise Throttled(wait=e.retry_after, detail=str(e))
         except Exception as e:
             return Response(
                 {"error": f"Failed to generate response: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+    
+    @extend_schema(
+        responses={200: {"type": "object", "properties": {
+            "entries": {"type": "integer"},
+            "hits": {"type": "integer"},
+            "near_hits": {"type": "integer"},
+            "misses": {"type": "integer"},
+            "hit_rate": {"type": "number"},
+        }}},
+        description="Hit-rate metrics of this worker's simple-chat answer cache (staff only).",
+        methods=["GET"],
+    )
+    @action(detail=False, methods=['get'], url_path='simple-chat/cache', permission_classes=[IsAdminUser])
+    def simple_chat_cache(self, request):
+        """Answer cache statistics for this worker process."""
+        return Response(get_response_cache().stats())
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='since', type=str, description='Only messages created at or after this ISO date/datetime'),
+            OpenApiParameter(name='until', type=str, description='Only messages created before this ISO date/datetime'),
+            OpenApiParameter(name='user_id', type=int, description='Only messages of this user'),
+            OpenApiParameter(name='focus', type=str, description='Only messages of sessions with this learning focus'),
+            OpenApiParameter(name='gzip', type=bool, description='Gzip the export'),
+        ],
+        responses={200: {"type": "string", "description": "NDJSON, one message per line"}},
+        description="Stream every matching chat message, archived ones included, as NDJSON (staff only).",
+        methods=["GET"],
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream chat messages for analytics without loading them into memory."""
+        params = request.query_params
+        try:
+            filters = export_filters(params.get('since'), params.get('until'), params.get('user_id'), params.get('focus'))
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)})
+        
+        chunks = ndjson_chunks(export_records(**filters))
+        filename = 'chat-messages.ndjson'
+        if params.get('gzip') in ('1', 'true'):
+            response = StreamingHttpResponse(streamed_content(request, gzip_chunks(chunks)), content_type='application/gzip')
+            filename += '.gz'
+        else:
+            response = StreamingHttpResponse(streamed_content(request, chunks), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -1,7 +1,13 @@
 """
 Custom pagination classes
 """
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from bisect import bisect_left, bisect_right
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -68,4 +74,102 @@ class SmallResultsSetPagination(PageNumberPagination):
             'current_page': self.page.number,
             'page_size': self.page_size,
             'results': data
-        })
\ No newline at end of file
+        })
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on ``(ordering_field, id)`` for feeds that
+    are read from the newest end, like chat messages.
+
+    Without a cursor the newest page is returned; ``?before=<cursor>`` walks
+    back to older rows and ``?after=<cursor>`` fetches rows added since.
+    Each page is one indexed range query, so its cost does not grow with
+    the number of rows in front of it. Rows are returned oldest first.
+
+    ``prefix`` takes rows kept outside the queryset that all sort before
+    it (e.g. archived messages), oldest first; pages run on into them.
+    """
+    ordering_field = 'created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def encode_cursor(self, row):
+        position = f"{getattr(row, self.ordering_field).isoformat()}|{row.pk}"
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+            position = parse_datetime(value), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def row_key(self, row):
+        return getattr(row, self.ordering_field), row.pk
+
+    def paginate_queryset(self, queryset, request, view=None, prefix=()):
+        size = self.get_page_size(request)
+        field = self.ordering_field
+        before, after = request.query_params.get('before'), request.query_params.get('after')
+        prefix_keys = [self.row_key(row) for row in prefix]
+
+        if after:
+            value, pk = self.decode_cursor(after)
+            rows = list(prefix[bisect_right(prefix_keys, (value, pk)):][:size + 1])
+            rows += list(
+                queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+                .order_by(field, 'pk')[:size + 1 - len(rows)]
+            )
+            self.has_newer, self.has_older = len(rows) > size, True
+            rows = rows[:size]
+        else:
+            end = len(prefix)
+            if before:
+                value, pk = self.decode_cursor(before)
+                queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+                end = bisect_left(prefix_keys, (value, pk))
+            rows = list(queryset.order_by(f'-{field}', '-pk')[:size + 1])
+            missing = size + 1 - len(rows)
+            rows += prefix[max(0, end - missing):end][::-1]
+            self.has_older, self.has_newer = len(rows) > size, bool(before)
+            rows = rows[:size][::-1]
+
+        self.page = rows
+        # Echo an ``after`` cursor on an empty page so clients can keep polling
+        self.before = self.encode_cursor(rows[0]) if rows and self.has_older else None
+        self.after = self.encode_cursor(rows[-1]) if rows else after
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'before': self.before,
+            'after': self.after,
+            'has_older': self.has_older,
+            'has_newer': self.has_newer,
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        cursor = {'type': 'string', 'nullable': True}
+        return {
+            'type': 'object',
+            'properties': {
+                'before': cursor,
+                'after': cursor,
+                'has_older': {'type': 'boolean'},
+                'has_newer': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
@@ -1,3 +1,48 @@
-from django.test import TestCase
+from django.core.handlers.asgi import ASGIHandler
+from django.http import StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase
 
-# Create your tests here.
+from .utils import AsyncStreamedContent, StreamedContent, streamed_content
+
+
+class StreamedContentTests(SimpleTestCase):
+    """
+    Test case for streaming response bodies under WSGI and ASGI.
+    """
+    def setUp(self):
+        self.log = []
+        self.closed = []
+
+    def chunks(self):
+        for index in range(3):
+            self.log.append(f'produced {index}')
+            yield f'chunk {index}'.encode()
+
+    async def send(self, message):
+        if message['type'] == 'http.response.body' and message.get('body'):
+            self.log.append('sent')
+
+    def test_picks_the_iterator_for_the_server(self):
+        """Test WSGI requests get a sync body and ASGI requests an async one"""
+        self.assertIsInstance(streamed_content(RequestFactory().get('/'), self.chunks()), StreamedContent)
+        self.assertNotIsInstance(streamed_content(RequestFactory().get('/'), self.chunks()), AsyncStreamedContent)
+        self.assertIsInstance(streamed_content(AsyncRequestFactory().get('/'), self.chunks()), AsyncStreamedContent)
+
+    async def test_asgi_sends_each_chunk_as_it_is_produced(self):
+        """Test the ASGI handler sends chunks one by one instead of buffering the body"""
+        content = streamed_content(AsyncRequestFactory().get('/'), self.chunks(), on_close=lambda: self.closed.append(1))
+        response = StreamingHttpResponse(content)
+        self.assertTrue(response.is_async)
+        await ASGIHandler().send_response(response, self.send)
+        self.assertEqual(self.log, ['produced 0', 'sent', 'produced 1', 'sent', 'produced 2', 'sent'])
+        self.assertEqual(self.closed, [1])
+
+    def test_close_runs_callback_without_iterating(self):
+        """Test closing a response that was never read still runs the callback once"""
+        response = StreamingHttpResponse(streamed_content(
+            RequestFactory().get('/'), self.chunks(), on_close=lambda: self.closed.append(1)
+        ))
+        response.close()
+        response.close()
+        self.assertEqual(self.closed, [1])
+        self.assertEqual(self.log, [])
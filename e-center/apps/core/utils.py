@@ -3,6 +3,8 @@ Core utilities and helper functions
 """
 import os
 import uuid
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.utils.text import slugify
 
 
@@ -56,4 +58,62 @@ def format_file_size(size_in_bytes):
         if size_in_bytes < 1024.0:
             return f"{size_in_bytes:.1f} {unit}"
         size_in_bytes /= 1024.0
-    return f"{size_in_bytes:.1f} PB"
\ No newline at end of file
+    return f"{size_in_bytes:.1f} PB"
+
+
+class StreamedContent:
+    """
+    Body for a ``StreamingHttpResponse`` served over WSGI: iterates
+    ``chunks`` and, on ``close()``, closes them and runs ``on_close`` (which
+    also happens when the response is never iterated).
+    """
+    def __init__(self, chunks, on_close=None):
+        self.chunks = chunks
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        try:
+            close = getattr(self.chunks, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            if self.on_close is not None:
+                on_close, self.on_close = self.on_close, None
+                on_close()
+
+
+class AsyncStreamedContent(StreamedContent):
+    """
+    ``StreamedContent`` for ASGI. Django collects a sync iterator into a list
+    before sending a byte under ASGI, so each chunk is pulled from the sync
+    iterator on the sync thread instead and sent as soon as it exists.
+    """
+    __iter__ = None  # Django must take this as an async iterator
+
+    def __aiter__(self):
+        return self.pull()
+
+    async def pull(self):
+        iterator = iter(self.chunks)
+        done = object()
+        try:
+            while True:
+                chunk = await sync_to_async(next)(iterator, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            await sync_to_async(self.close)()
+
+
+def streamed_content(request, chunks, on_close=None):
+    """
+    Wrap the sync iterable ``chunks`` as a ``StreamingHttpResponse`` body
+    that streams without buffering on the server handling ``request``.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return AsyncStreamedContent(chunks, on_close)
+    return StreamedContent(chunks, on_close)
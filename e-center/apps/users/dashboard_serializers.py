@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from django.core.cache import cache
 from django.db.models import Count, Sum, Q
 from apps.center.models import Grammar, VideoLesson, TurkmenEnglishWord, Category
+from apps.center.progress import read_progress
+from apps.center.stats import read_author_stats, read_totals
 from .models import User
 
 
@@ -30,14 +33,35 @@ class UserDashboardSerializer(serializers.Serializer):
     # Teacher statistics (for teachers)
     created_content = serializers.SerializerMethodField()
     
+    @property
+    def totals(self):
+        if not hasattr(self, '_totals'):
+            self._totals = read_totals()
+        return self._totals
+    
+    @property
+    def progress(self):
+        if not hasattr(self, '_progress'):
+            self._progress = read_progress(self.instance)
+        return self._progress
+    
+    def _progress_for(self, content_type):
+        completed = self.progress.get(content_type, 0)
+        total = self.totals[content_type]
+        return {
+            'completed': completed,
+            'total': total,
+            'percentage': round(completed * 100 / total, 1) if total else 0
+        }
+    
     def get_total_grammar_lessons(self, obj):
-        return Grammar.objects.count()
+        return self.totals['grammar']
     
     def get_total_video_lessons(self, obj):
-        return VideoLesson.objects.count()
+        return self.totals['video']
     
     def get_total_vocabulary_words(self, obj):
-        return TurkmenEnglishWord.objects.count()
+        return self.totals['vocabulary']
     
     def get_categories(self, obj):
         categories = Category.objects.annotate(
@@ -47,41 +71,25 @@ class UserDashboardSerializer(serializers.Serializer):
         return categories
     
     def get_completed_grammar(self, obj):
-        # Placeholder for student progress - would be linked to a Progress model
         if obj.role != 'student':
             return None
-        
-        # This would typically link to a Progress or Completion model
-        # For now, return placeholder data
-        return {
-            'completed': 0,
-            'total': Grammar.objects.count(),
-            'percentage': 0
-        }
+        return self._progress_for('grammar')
     
     def get_completed_videos(self, obj):
-        # Placeholder for student progress - would be linked to a Progress model
         if obj.role != 'student':
             return None
-        
-        # This would typically link to a Progress or Completion model
-        return {
-            'completed': 0,
-            'total': VideoLesson.objects.count(),
-            'percentage': 0
-        }
+        return self._progress_for('video')
     
     def get_vocabulary_mastered(self, obj):
-        # Placeholder for student progress - would be linked to a Progress model
         if obj.role != 'student':
             return None
         
-        total = TurkmenEnglishWord.objects.count()
+        progress = self._progress_for('vocabulary')
         return {
-            'completed': 0,
-            'mastered': 0,  # Keep for backward compatibility
-            'total': total,
-            'percentage': 0
+            'completed': progress['completed'],
+            'mastered': progress['completed'],  # Keep for backward compatibility
+            'total': progress['total'],
+            'percentage': progress['percentage']
         }
     
     def get_created_content(self, obj):
@@ -89,41 +97,72 @@ class UserDashboardSerializer(serializers.Serializer):
         if obj.role != 'teacher':
             return None
         
-        grammar_count = Grammar.objects.filter(created_by=obj).count()
-        video_count = VideoLesson.objects.filter(created_by=obj).count()
-        vocabulary_count = TurkmenEnglishWord.objects.filter(created_by=obj).count()
-        
-        total_content = grammar_count + video_count + vocabulary_count
-        
-        # Get content by status
-        published_grammar = Grammar.objects.filter(created_by=obj, status='published').count()
-        published_videos = VideoLesson.objects.filter(created_by=obj, status='published').count()
-        published_vocabulary = TurkmenEnglishWord.objects.filter(created_by=obj, status='published').count()
-        
-        draft_grammar = Grammar.objects.filter(created_by=obj, status='draft').count()
-        draft_videos = VideoLesson.objects.filter(created_by=obj, status='draft').count()
-        draft_vocabulary = TurkmenEnglishWord.objects.filter(created_by=obj, status='draft').count()
-        
-        return {
-            'total': total_content,
-            'grammar': {
-                'total': grammar_count,
-                'published': published_grammar,
-                'draft': draft_grammar
-            },
-            'videos': {
-                'total': video_count,
-                'published': published_videos,
-                'draft': draft_videos
-            },
-            'vocabulary': {
-                'total': vocabulary_count,
-                'published': published_vocabulary,
-                'draft': draft_vocabulary
+        # One indexed read of the per-author counters kept by apps.center.signals
+        counts = read_author_stats(obj)
+
+        created = {}
+        for key, content_type in (('grammar', 'grammar'), ('videos', 'video'), ('vocabulary', 'vocabulary')):
+            by_status = counts.get(content_type, {})
+            created[key] = {
+                'total': sum(by_status.values()),
+                'published': by_status.get('published', 0),
+                'draft': by_status.get('draft', 0)
             }
+
+        return {
+            'total': sum(item['total'] for item in created.values()),
+            **created
         }
 
 
+SYSTEM_STATS_CACHE_KEY = 'dashboard:system_stats'
+SYSTEM_STATS_TTL = 60  # seconds
+
+
+def _content_aggregates(model, levels=()):
+    """Totals by status (and optionally level) for one content table in one query."""
+    aggregates = {
+        'total': Count('id'),
+        'published': Count('id', filter=Q(status='published')),
+        'draft': Count('id', filter=Q(status='draft')),
+    }
+    for level in levels:
+        aggregates[level] = Count('id', filter=Q(level=level))
+    return model.objects.aggregate(**aggregates)
+
+
+def get_system_stats():
+    """
+    System-wide counts, one conditional-aggregation query per table.
+    Cached for a short TTL and dropped by ``apps.users.signals`` whenever a
+    user or content row changes.
+    """
+    stats = cache.get(SYSTEM_STATS_CACHE_KEY)
+    if stats is not None:
+        return stats
+
+    levels = ('beginner', 'intermediate', 'advanced')
+    stats = {
+        'users': User.objects.aggregate(
+            total=Count('id'),
+            students=Count('id', filter=Q(role='student')),
+            teachers=Count('id', filter=Q(role='teacher')),
+            admins=Count('id', filter=Q(role='admin')),
+            active=Count('id', filter=Q(is_active=True)),
+            verified=Count('id', filter=Q(is_verified=True)),
+        ),
+        'grammar': _content_aggregates(Grammar),
+        'videos': _content_aggregates(VideoLesson, levels),
+        'vocabulary': _content_aggregates(TurkmenEnglishWord, levels),
+    }
+    cache.set(SYSTEM_STATS_CACHE_KEY, stats, SYSTEM_STATS_TTL)
+    return stats
+
+
+def invalidate_system_stats():
+    cache.delete(SYSTEM_STATS_CACHE_KEY)
+
+
 class SystemDashboardSerializer(serializers.Serializer):
     """
     Serializer for system-wide dashboard data (for admins).
@@ -138,88 +177,53 @@ class SystemDashboardSerializer(serializers.Serializer):
     # Content statistics
     content_stats = serializers.SerializerMethodField()
     
+    @property
+    def stats(self):
+        if not hasattr(self, '_stats'):
+            self._stats = get_system_stats()
+        return self._stats
+    
     def get_total_users(self, obj):
-        return User.objects.count()
+        return self.stats['users']['total']
     
     def get_total_content(self, obj):
-        grammar_count = Grammar.objects.count()
-        video_count = VideoLesson.objects.count()
-        vocabulary_count = TurkmenEnglishWord.objects.count()
-        return grammar_count + video_count + vocabulary_count
+        stats = self.stats
+        return stats['grammar']['total'] + stats['videos']['total'] + stats['vocabulary']['total']
     
     def get_user_stats(self, obj):
-        # User counts by role
-        students_count = User.objects.filter(role='student').count()
-        teachers_count = User.objects.filter(role='teacher').count()
-        admins_count = User.objects.filter(role='admin').count()
-        
-        # Active users
-        active_users = User.objects.filter(is_active=True).count()
-        
-        # Verified users
-        verified_users = User.objects.filter(is_verified=True).count()
-        
+        users = self.stats['users']
         return {
             'by_role': {
-                'students': students_count,
-                'teachers': teachers_count,
-                'admins': admins_count
+                'students': users['students'],
+                'teachers': users['teachers'],
+                'admins': users['admins']
             },
-            'active_users': active_users,
-            'verified_users': verified_users
+            'active_users': users['active'],
+            'verified_users': users['verified']
         }
     
     def get_content_stats(self, obj):
-        # Grammar stats
-        grammar_count = Grammar.objects.count()
-        published_grammar = Grammar.objects.filter(status='published').count()
-        draft_grammar = Grammar.objects.filter(status='draft').count()
-        
-        # Video stats
-        video_count = VideoLesson.objects.count()
-        published_videos = VideoLesson.objects.filter(status='published').count()
-        draft_videos = VideoLesson.objects.filter(status='draft').count()
-        
-        # Vocabulary stats
-        vocabulary_count = TurkmenEnglishWord.objects.count()
-        published_vocabulary = TurkmenEnglishWord.objects.filter(status='published').count()
-        draft_vocabulary = TurkmenEnglishWord.objects.filter(status='draft').count()
-        
-        # Count by level
-        beginner_count = (
-            VideoLesson.objects.filter(level='beginner').count() +
-            TurkmenEnglishWord.objects.filter(level='beginner').count()
-        )
-        
-        intermediate_count = (
-            VideoLesson.objects.filter(level='intermediate').count() +
-            TurkmenEnglishWord.objects.filter(level='intermediate').count()
-        )
-        
-        advanced_count = (
-            VideoLesson.objects.filter(level='advanced').count() +
-            TurkmenEnglishWord.objects.filter(level='advanced').count()
-        )
+        stats = self.stats
+        videos, vocabulary = stats['videos'], stats['vocabulary']
         
         return {
             'grammar': {
-                'total': grammar_count,
-                'published': published_grammar,
-                'draft': draft_grammar
+                'total': stats['grammar']['total'],
+                'published': stats['grammar']['published'],
+                'draft': stats['grammar']['draft']
             },
             'videos': {
-                'total': video_count,
-                'published': published_videos,
-                'draft': draft_videos
+                'total': videos['total'],
+                'published': videos['published'],
+                'draft': videos['draft']
             },
             'vocabulary': {
-                'total': vocabulary_count,
-                'published': published_vocabulary,
-                'draft': draft_vocabulary
+                'total': vocabulary['total'],
+                'published': vocabulary['published'],
+                'draft': vocabulary['draft']
             },
             'by_level': {
-                'beginner': beginner_count,
-                'intermediate': intermediate_count,
-                'advanced': advanced_count
+                level: videos[level] + vocabulary[level]
+                for level in ('beginner', 'intermediate', 'advanced')
             }
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,22 @@
+"""
+Signal handlers that keep cached dashboard data fresh.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.center.models import Grammar, TurkmenEnglishWord, VideoLesson
+from .dashboard_serializers import invalidate_system_stats
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Grammar)
+@receiver(post_delete, sender=Grammar)
+@receiver(post_save, sender=VideoLesson)
+@receiver(post_delete, sender=VideoLesson)
+@receiver(post_save, sender=TurkmenEnglishWord)
+@receiver(post_delete, sender=TurkmenEnglishWord)
+def invalidate_system_dashboard(sender, instance, **kwargs):
+    """Drop the cached system dashboard counts after any tracked write."""
+    invalidate_system_stats()
@@ -1,3 +1,222 @@
-from django.test import TestCase
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.center.models import Category, Grammar, ProgressEvent, TurkmenEnglishWord, VideoLesson
+from apps.center.progress import progress_buffer
+from .dashboard_serializers import UserDashboardSerializer
+from .models import User
+
+
+class SystemDashboardTests(TestCase):
+    """
+    Test case for the system dashboard endpoint.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = '/api/v1/auth/dashboard/system/'
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpassword123',
+            role='admin',
+            is_verified=True
+        )
+        self.client.force_authenticate(user=self.admin)
+        category = Category.objects.create(name='Tenses')
+        Grammar.objects.create(
+            created_by=self.admin, category=category, title='Past Simple', content='...', status='published'
+        )
+        TurkmenEnglishWord.objects.create(turkmen_word='Kitap', english_word='Book', level='beginner')
+
+    def test_dashboard_query_budget(self):
+        """Test one aggregate query per table, then none while cached"""
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_dashboard_counts_and_invalidation(self):
+        """Test the counts and that writes drop the cached copy"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total_users'], 1)
+        self.assertEqual(response.data['total_content'], 2)
+        self.assertEqual(response.data['user_stats']['by_role']['admins'], 1)
+        self.assertEqual(response.data['user_stats']['verified_users'], 1)
+        self.assertEqual(response.data['content_stats']['grammar']['published'], 1)
+        self.assertEqual(response.data['content_stats']['by_level']['beginner'], 1)
+
+        TurkmenEnglishWord.objects.create(turkmen_word='Ýol', english_word='Road', level='beginner', status='draft')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total_content'], 3)
+        self.assertEqual(response.data['content_stats']['vocabulary']['draft'], 1)
+        self.assertEqual(response.data['content_stats']['by_level']['beginner'], 2)
+
+
+class TeacherCreatedContentTests(TestCase):
+    """
+    Test case for the teacher's created-content counters.
+    """
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher',
+            email='teacher@example.com',
+            password='testpassword123',
+            role='teacher'
+        )
+        self.other = User.objects.create_user(
+            username='other', email='other@example.com', password='testpassword123', role='teacher'
+        )
+        category = Category.objects.create(name='Tenses')
+        self.lesson = Grammar.objects.create(
+            created_by=self.teacher, category=category, title='Past Simple', content='...', status='draft'
+        )
+        Grammar.objects.create(created_by=self.other, category=category, title='Future', content='...')
+        VideoLesson.objects.create(
+            created_by=self.teacher, title='Greetings', description='...', video_url='videos/lessons/g.mp4',
+            level='beginner', duration=60, status='published'
+        )
+        TurkmenEnglishWord.objects.create(
+            created_by=self.teacher, turkmen_word='Kitap', english_word='Book', status='published'
+        )
+
+    def created_content(self):
+        return UserDashboardSerializer().get_created_content(self.teacher)
+
+    def test_single_query(self):
+        """Test the created-content block is one indexed read"""
+        with self.assertNumQueries(1):
+            content = self.created_content()
+        self.assertEqual(content['total'], 3)
+        self.assertEqual(content['grammar'], {'total': 1, 'published': 0, 'draft': 1})
+        self.assertEqual(content['videos'], {'total': 1, 'published': 1, 'draft': 0})
+        self.assertEqual(content['vocabulary'], {'total': 1, 'published': 1, 'draft': 0})
+
+    def test_counters_follow_status_changes_and_deletes(self):
+        """Test publishing, reassigning and deleting move the counters"""
+        self.lesson.status = 'published'
+        self.lesson.save()
+        self.assertEqual(self.created_content()['grammar'], {'total': 1, 'published': 1, 'draft': 0})
+
+        self.lesson.created_by = self.other
+        self.lesson.save()
+        self.assertEqual(self.created_content()['grammar']['total'], 0)
+
+        TurkmenEnglishWord.objects.filter(created_by=self.teacher).delete()
+        content = self.created_content()
+        self.assertEqual(content['vocabulary']['total'], 0)
+        self.assertEqual(content['total'], 1)
+
+    def test_rebuild_reports_no_drift(self):
+        """Test the backfill agrees with the signal-maintained counters"""
+        from apps.center.stats import rebuild_author_stats
+
+        drift = rebuild_author_stats()
+        self.assertEqual(drift, {'grammar': [], 'video': [], 'vocabulary': []})
+
+
+@override_settings(PROGRESS_BUFFER_SIZE=100, PROGRESS_FLUSH_INTERVAL=0)
+class StudentProgressTests(TestCase):
+    """
+    Test case for buffered progress events and the student dashboard rollups.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            username='student', email='student@example.com', password='testpassword123', role='student'
+        )
+        self.client.force_authenticate(user=self.student)
+        teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='testpassword123', role='teacher'
+        )
+        category = Category.objects.create(name='Tenses')
+        self.lessons = [
+            Grammar.objects.create(created_by=teacher, category=category, title=f'Lesson {i}', content='...')
+            for i in range(4)
+        ]
+        self.word = TurkmenEnglishWord.objects.create(turkmen_word='Kitap', english_word='Book')
+
+    def post_events(self, events):
+        response = self.client.post('/api/v1/center/progress/', events, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response
+
+    def test_events_are_buffered_then_bulk_inserted(self):
+        """Test a batch of events is held in memory and written in one flush"""
+        self.post_events([
+            {'content_type': 'grammar', 'object_id': lesson.id, 'event': 'completed'}
+            for lesson in self.lessons[:2]
+        ])
+        self.assertEqual(ProgressEvent.objects.count(), 0)
+        self.assertEqual(progress_buffer.flush(), 2)
+        self.assertEqual(ProgressEvent.objects.count(), 2)
+
+    def test_failed_flush_keeps_events(self):
+        """Test a failing write still accepts the request and keeps the events for retry"""
+        events = [{'content_type': 'grammar', 'object_id': lesson.id, 'event': 'completed'} for lesson in self.lessons]
+        with override_settings(PROGRESS_BUFFER_SIZE=2), \
+                patch('apps.center.progress.ProgressEvent.objects.bulk_create', side_effect=DatabaseError('down')):
+            self.post_events(events)
+        self.assertEqual(len(progress_buffer), 4)
+        self.assertEqual(progress_buffer.flush(), 4)
+        self.assertEqual(ProgressEvent.objects.count(), 4)
+
+    def test_dashboard_reads_rollups(self):
+        """Test completions are counted once and shown on the dashboard"""
+        lesson = self.lessons[0]
+        self.post_events([
+            {'content_type': 'grammar', 'object_id': lesson.id, 'event': 'opened'},
+            {'content_type': 'grammar', 'object_id': lesson.id, 'event': 'completed'},
+            {'content_type': 'grammar', 'object_id': lesson.id, 'event': 'completed'},
+            {'content_type': 'grammar', 'object_id': 999999, 'event': 'completed'},
+            {'content_type': 'vocabulary', 'object_id': self.word.id, 'event': 'reviewed', 'score': 2},
+        ])
+        progress_buffer.flush()
+        self.post_events({'content_type': 'vocabulary', 'object_id': self.word.id, 'event': 'reviewed', 'score': 5})
+        progress_buffer.flush()
+
+        response = self.client.get('/api/v1/auth/dashboard/')
+        self.assertEqual(response.data['completed_grammar'], {'completed': 1, 'total': 4, 'percentage': 25.0})
+        self.assertEqual(response.data['completed_videos']['completed'], 0)
+        self.assertEqual(response.data['vocabulary_mastered']['mastered'], 1)
+        self.assertEqual(response.data['vocabulary_mastered']['percentage'], 100.0)
+
+
+@override_settings(PROGRESS_BUFFER_SIZE=100, PROGRESS_FLUSH_INTERVAL=0)
+class ProgressFlushIsolationTests(TransactionTestCase):
+    """
+    Test case for flushes holding events the database rejects. Foreign keys
+    are checked at commit, so this needs real transactions.
+    """
+    def setUp(self):
+        self.student = User.objects.create_user(
+            username='student', email='student@example.com', password='testpassword123', role='student'
+        )
+        gone = User.objects.create_user(username='gone', email='gone@example.com', password='testpassword123')
+        self.gone_id = gone.id
+        gone.delete()
+
+    def test_invalid_event_is_dropped_and_the_rest_written(self):
+        """Test one event of a deleted user does not hold back the batch"""
+        now = timezone.now()
+        events = [
+            ProgressEvent(user=self.student, content_type='grammar', object_id=i, event='opened', created_at=now)
+            for i in range(6)
+        ]
+        events.insert(3, ProgressEvent(
+            user_id=self.gone_id, content_type='grammar', object_id=3, event='opened', created_at=now
+        ))
+        progress_buffer.add(events)
+        with self.assertLogs('apps.center.progress', 'ERROR') as logs:
+            self.assertEqual(progress_buffer.flush(), 6)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(len(progress_buffer), 0)
+        self.assertEqual(ProgressEvent.objects.filter(user=self.student).count(), 6)
+        self.assertFalse(ProgressEvent.objects.filter(user_id=self.gone_id).exists())
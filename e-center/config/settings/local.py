@@ -40,6 +40,9 @@ if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
         'timeout': 20,
         # Enable foreign key constraints
         'init_command': "PRAGMA foreign_keys=ON;",
+        # Take the write lock at BEGIN so concurrent writers (e.g. run_chat_jobs
+        # workers) wait for the timeout instead of failing on lock upgrade
+        'transaction_mode': 'IMMEDIATE',
     }
 
 # Development specific apps
@@ -2,8 +2,16 @@
 """
 Performance monitoring script for the E-Learning backend optimizations.
 This script helps monitor the performance improvements without changing endpoints.
+
+To measure our own overhead rather than Gemini's, start the server with the
+in-process fake model and pass its latency here; it is subtracted from the
+chat timings:
+
+    LLM_BACKEND=fake LLM_FAKE_LATENCY=0.5 python manage.py runserver
+    python performance_monitor.py --llm-latency 0.5
 """
 
+import argparse
 import time
 import requests
 import statistics
@@ -11,12 +19,14 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 
 class PerformanceMonitor:
-    def __init__(self, base_url="http://localhost:8000"):
+    def __init__(self, base_url="http://localhost:8000", llm_latency=None):
         self.base_url = base_url
+        # Known per-call latency of the server's fake LLM backend, if any
+        self.llm_latency = llm_latency
         self.session = requests.Session()
         
-    def test_endpoint_performance(self, endpoint, method="GET", data=None, num_requests=10):
-        """Test the performance of a specific endpoint."""
+    def test_endpoint_performance(self, endpoint, method="GET", data=None, num_requests=10, llm_calls=0):
+        """Test the performance of a specific endpoint making ``llm_calls`` model calls per request."""
         print(f"\n🚀 Testing {method} {endpoint} with {num_requests} requests...")
         
         times = []
@@ -73,6 +83,11 @@ class PerformanceMonitor:
             print(f"   • Median response time: {median_time:.3f}s")
             print(f"   • Success rate: {(successful_requests/num_requests)*100:.1f}%")
             
+            overhead = None
+            if self.llm_latency is not None and llm_calls:
+                overhead = avg_time - self.llm_latency * llm_calls
+                print(f"   • Server overhead (excluding {llm_calls} x {self.llm_latency:.3f}s LLM): {overhead:.3f}s")
+            
             return {
                 'endpoint': endpoint,
                 'method': method,
@@ -82,7 +97,8 @@ class PerformanceMonitor:
                 'min_time': min_time,
                 'max_time': max_time,
                 'median_time': median_time,
-                'success_rate': (successful_requests/num_requests)*100
+                'success_rate': (successful_requests/num_requests)*100,
+                'overhead_time': overhead
             }
         
         return None
@@ -169,7 +185,7 @@ class PerformanceMonitor:
             "proficiency_level": "beginner",
             "learning_focus": "grammar"
         }
-        result = self.test_endpoint_performance("/api/v1/chat/sessions/chat/", "POST", chat_data, num_requests=8)
+        result = self.test_endpoint_performance("/api/v1/chat/sessions/chat/", "POST", chat_data, num_requests=8, llm_calls=1)
         if result:
             results.append(result)
         
@@ -230,7 +246,11 @@ class PerformanceMonitor:
 
 def main():
     """Main function to run performance tests."""
-    monitor = PerformanceMonitor()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--llm-latency', type=float, default=None,
+                        help="LLM_FAKE_LATENCY of a server running with LLM_BACKEND=fake")
+    args = parser.parse_args()
+    monitor = PerformanceMonitor(llm_latency=args.llm_latency)
     
     print("🔍 Starting Backend Performance Tests...")
     print("📝 Note: Make sure the Django server is running on localhost:8000")